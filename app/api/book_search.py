@@ -2,18 +2,45 @@
 
 import json
 import os
+import secrets
+from datetime import datetime
 
-import httpx
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from sqlalchemy.orm import Session
 
+from app import auth
+from app import models
+from app import schemas
+from app.database import get_db
+from app.services import enrichment
+from app.services import openlibrary_cache
 from app.services import openlibrary_service
+from app.services import search_cache
+from app.services.isbn import normalize_isbn
 from app.services.openlibrary_service import search_books
+from app.services.resilience import Deadline
+from app.services.resilience import UpstreamUnavailable
+from app.services.supersede import RequestCancelled
+from app.services.supersede import Supersede
 
 router = APIRouter(prefix="/api/books", tags=["book_api"])
 
+# Latest search per browser session; a new keystroke cancels the previous one
+searches_by_session = Supersede()
+
+
+def session_key(request: Request) -> str:
+    """Get an id for the browser session, starting one if needed."""
+    session_id = request.session.get("search_session")
+    if session_id is None:
+        session_id = request.session["search_session"] = secrets.token_urlsafe(16)
+    return session_id
+
 
 @router.get("/search", response_model=list[dict])
 async def search_books_endpoint(
+    request: Request,
     q: str,
     limit: int = 10,
     fetch_details: bool = False,
@@ -21,6 +48,10 @@ async def search_books_endpoint(
     """
     Search for books using the Open Library API.
 
+    The search is cancelled, together with the Open Library requests it
+    started, when the client disconnects or sends a newer search from the
+    same session.
+
     Args:
         q: The search query
         limit: Maximum number of results to return
@@ -32,14 +63,189 @@ async def search_books_endpoint(
     if not q:
         raise HTTPException(status_code=400, detail="Search query is required")
 
+    deadline = Deadline(openlibrary_service.SEARCH_DEADLINE)
     try:
-        results = await search_books(q, limit, fetch_details)
+        results = await searches_by_session.run(
+            session_key(request),
+            lambda: search_cache.search_books(q, limit, fetch_details, deadline=deadline),
+            is_disconnected=request.is_disconnected,
+        )
         return results
+    except RequestCancelled:
+        # Nobody reads this response; 499 is nginx's "client closed request"
+        return JSONResponse(status_code=499, content={"detail": "Search was cancelled"})
+    except UpstreamUnavailable as e:
+        raise HTTPException(status_code=503, detail=f"Open Library is unavailable: {e}") from e
     except Exception as e:
         error_msg = f"Error searching books: {str(e)}"
         raise HTTPException(status_code=500, detail=error_msg) from e
 
 
+@router.get("/search/stream")
+async def stream_search_books_endpoint(
+    q: str,
+    limit: int = 10,
+):
+    """
+    Search for books and stream the results as newline-delimited JSON.
+
+    The first line holds the plain search hits; each following line is a patch
+    with the page count, subjects and description of one hit as soon as they
+    are resolved, and the last line marks the end of the stream.
+
+    When the client goes away (the add-book form aborts the previous search
+    on every keystroke), the stream is cancelled and so is the enrichment
+    still running for it.
+
+    Args:
+        q: The search query
+        limit: Maximum number of results to return
+
+    Returns:
+        NDJSON stream of search events
+    """
+    if not q:
+        raise HTTPException(status_code=400, detail="Search query is required")
+
+    query = search_cache.normalize_query(q)
+
+    async def events():
+        try:
+            deadline = Deadline(openlibrary_service.SEARCH_DEADLINE)
+            async for event in openlibrary_service.stream_search_books(query, limit, deadline=deadline):
+                yield json.dumps(event) + "\n"
+        except Exception as e:
+            yield json.dumps({"type": "error", "detail": f"Error searching books: {str(e)}"}) + "\n"
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+
+@router.get("/isbn/{isbn}")
+async def isbn_lookup(isbn: str):
+    """
+    Look a book up by ISBN.
+
+    Args:
+        isbn: An ISBN-10 or ISBN-13, hyphens allowed
+
+    Returns:
+        Book data dictionary
+    """
+    normalized = normalize_isbn(isbn)
+    if normalized is None:
+        raise HTTPException(status_code=400, detail=f"Invalid ISBN: {isbn}")
+
+    deadline = Deadline(openlibrary_service.SEARCH_DEADLINE)
+    try:
+        book = await openlibrary_service.get_book_by_isbn(normalized, deadline=deadline)
+    except UpstreamUnavailable as e:
+        raise HTTPException(status_code=503, detail=f"Open Library is unavailable: {e}") from e
+    if book is None:
+        raise HTTPException(status_code=404, detail=f"No book found for ISBN {isbn}")
+    return book
+
+
+@router.post("/isbn/import")
+async def isbn_import(
+    payload: schemas.IsbnImport,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(auth.get_current_active_user),
+):
+    """
+    Add books to the current user's list from a list of ISBNs.
+
+    The ISBNs are looked up in batches, and every book found is added in one
+    transaction. Books the user already has (same title and author) and
+    ISBNs repeated in the list are skipped. Books still missing metadata are
+    queued for enrichment.
+
+    Returns:
+        The number of books created and one result per ISBN, with a status of
+        created, duplicate, invalid, not_found or error
+    """
+    normalized = [normalize_isbn(isbn) for isbn in payload.isbns]
+    deadline = Deadline(openlibrary_service.ISBN_IMPORT_DEADLINE)
+    found = await openlibrary_service.get_books_by_isbn(
+        [isbn for isbn in normalized if isbn], deadline=deadline
+    )
+
+    owned = {
+        (title.casefold(), author.casefold())
+        for title, author in db.query(models.Book.title, models.Book.author)
+        .filter(models.Book.user_id == current_user.id)
+    }
+    now = datetime.utcnow()
+    results = []
+    created = []
+    for isbn, normalized_isbn in zip(payload.isbns, normalized, strict=True):
+        result = {"isbn": isbn, "status": "created", "book_id": None, "title": None}
+        results.append(result)
+        if normalized_isbn is None:
+            result["status"] = "invalid"
+            continue
+        if normalized_isbn not in found:
+            result["status"] = "error"
+            continue
+        data = found[normalized_isbn]
+        if data is None:
+            result["status"] = "not_found"
+            continue
+        result["title"] = data["title"]
+        identity = (data["title"].casefold(), data["author"].casefold())
+        if identity in owned:
+            result["status"] = "duplicate"
+            continue
+        owned.add(identity)
+
+        book = models.Book(
+            title=data["title"][:255],
+            author=data["author"][:255],
+            status=payload.status,
+            user_id=current_user.id,
+            created_at=now,
+            updated_at=now,
+            start_date=now if payload.status == models.BookStatus.READING else None,
+            completion_date=now if payload.status == models.BookStatus.COMPLETED else None,
+            genres=[],
+            cover_url=None if data.get("cover_id") else data.get("cover_url"),
+        )
+        for field, value in enrichment.metadata_from_result(data).items():
+            setattr(book, field, value)
+        created.append((result, book))
+
+    db.add_all(book for _, book in created)
+    db.flush()
+    for result, book in created:
+        result["book_id"] = book.id
+        enrichment.enqueue(db, book, commit=False)
+    db.commit()
+    return {"created": len(created), "results": results}
+
+
+@router.get("/metrics")
+async def metrics():
+    """
+    Get counters for the Open Library caches, circuit breaker, rate limiter
+    and enrichment queue.
+
+    Returns:
+        Cache, single-flight, breaker, rate limiter and queue statistics
+    """
+    return {
+        "cache": openlibrary_cache.get_stats(),
+        "search_cache": search_cache.search_cache.get_stats(),
+        "single_flight": {
+            "searches": search_cache.searches_in_flight.get_stats(),
+            "resources": openlibrary_service.in_flight.get_stats(),
+        },
+        "circuit_breaker": openlibrary_service.breaker.get_stats(),
+        "rate_limiter": openlibrary_service.limiter.get_stats(),
+        "hedged_searches": openlibrary_service.search_providers.get_stats(),
+        "cancelled_searches": searches_by_session.get_stats(),
+        "enrichment": enrichment.get_stats(),
+    }
+
+
 @router.get("/dump-raw-response")
 async def dump_raw_response(q: str):
     """
@@ -56,11 +262,10 @@ async def dump_raw_response(q: str):
     
     try:
         # Make a direct API call to get the raw response
-        url = f"https://openlibrary.org/search.json?q={q}&limit=10"
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url)
-            response.raise_for_status()
-            data = response.json()
+        url = f"{openlibrary_service.OPENLIBRARY_URL}/search.json?q={q}&limit=10"
+        response = await openlibrary_service.get_client().get(url)
+        response.raise_for_status()
+        data = response.json()
         
         # Create a directory for dumps if it doesn't exist
         os.makedirs("api_dumps", exist_ok=True)
@@ -145,32 +350,31 @@ async def raw_api_response(q: str):
     
     try:
         # Make a direct API call to OpenLibrary
-        url = f"https://openlibrary.org/search.json?q={q}&limit=3"
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url)
-            response.raise_for_status()
-            data = response.json()
-            
-            # Extract page count fields from the response
-            page_count_fields = []
-            for doc in data.get("docs", [])[:3]:
-                page_info = {
-                    "title": doc.get("title"),
-                    "key": doc.get("key"),
-                    "has_number_of_pages": "number_of_pages" in doc,
-                    "number_of_pages_value": doc.get("number_of_pages"),
-                    "has_number_of_pages_median": "number_of_pages_median" in doc,
-                    "number_of_pages_median_value": doc.get("number_of_pages_median"),
-                    "has_pagination": "pagination" in doc,
-                    "pagination_value": doc.get("pagination"),
-                }
-                page_count_fields.append(page_info)
-            
-            return {
-                "query": q,
-                "page_count_fields": page_count_fields,
-                "raw_response": data
+        url = f"{openlibrary_service.OPENLIBRARY_URL}/search.json?q={q}&limit=3"
+        response = await openlibrary_service.get_client().get(url)
+        response.raise_for_status()
+        data = response.json()
+
+        # Extract page count fields from the response
+        page_count_fields = []
+        for doc in data.get("docs", [])[:3]:
+            page_info = {
+                "title": doc.get("title"),
+                "key": doc.get("key"),
+                "has_number_of_pages": "number_of_pages" in doc,
+                "number_of_pages_value": doc.get("number_of_pages"),
+                "has_number_of_pages_median": "number_of_pages_median" in doc,
+                "number_of_pages_median_value": doc.get("number_of_pages_median"),
+                "has_pagination": "pagination" in doc,
+                "pagination_value": doc.get("pagination"),
             }
+            page_count_fields.append(page_info)
+
+        return {
+            "query": q,
+            "page_count_fields": page_count_fields,
+            "raw_response": data
+        }
     except Exception as e:
         error_msg = f"Error fetching raw API response: {str(e)}"
         raise HTTPException(status_code=500, detail=error_msg) from e
@@ -188,11 +392,10 @@ async def test_page_count(q: str = "harry potter"):
         Detailed information about page count extraction
     """
     # First get raw search results
-    url = f"https://openlibrary.org/search.json?q={q}&limit=5"
-    async with httpx.AsyncClient() as client:
-        response = await client.get(url)
-        response.raise_for_status()
-        data = response.json()
+    url = f"{openlibrary_service.OPENLIBRARY_URL}/search.json?q={q}&limit=5"
+    response = await openlibrary_service.get_client().get(url)
+    response.raise_for_status()
+    data = response.json()
     
     # Process search results
     results = []
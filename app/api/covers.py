@@ -0,0 +1,55 @@
+"""Cover images proxied from Open Library and cached on disk."""
+
+import logging
+
+import httpx
+from fastapi import APIRouter
+from fastapi import HTTPException
+from fastapi import Request
+from fastapi.responses import Response
+from PIL import UnidentifiedImageError
+
+from app.services import cover_cache
+from app.services.resilience import UpstreamUnavailable
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/covers", tags=["covers"])
+
+
+@router.get("/{cover_id}-{size}")
+async def get_cover(request: Request, cover_id: int, size: str):
+    """
+    Serve an Open Library cover from the local cache.
+
+    Args:
+        cover_id: Open Library cover id
+        size: P (placeholder), S, M or L
+
+    Returns:
+        The image with immutable cache headers, or a neutral placeholder if
+        the cover does not exist or cannot be fetched right now
+    """
+    if size not in cover_cache.SIZES or cover_id <= 0:
+        raise HTTPException(status_code=404, detail="Cover not found")
+
+    try:
+        cover = await cover_cache.get_cover(cover_id, size)
+    except (httpx.HTTPError, UpstreamUnavailable, UnidentifiedImageError) as e:
+        logger.warning(f"Could not fetch cover {cover_id}: {e!r}")
+        return Response(
+            cover_cache.PLACEHOLDER_SVG,
+            media_type="image/svg+xml",
+            headers={"Cache-Control": "no-cache"},
+        )
+    if cover is None:
+        return Response(
+            cover_cache.PLACEHOLDER_SVG,
+            media_type="image/svg+xml",
+            headers={"Cache-Control": "public, max-age=86400"},
+        )
+
+    headers = {"ETag": cover.etag, "Cache-Control": cover_cache.IMMUTABLE_CACHE_CONTROL}
+    if request.headers.get("if-none-match") == cover.etag:
+        return Response(status_code=304, headers=headers)
+    return Response(cover.content, media_type=cover.media_type, headers=headers)
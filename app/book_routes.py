@@ -1,7 +1,9 @@
 """Book management routes for the book tracking app."""
 
+import hashlib
+from dataclasses import dataclass
 from datetime import datetime
-from collections import defaultdict
+from urllib.parse import urlencode
 
 from fastapi import APIRouter
 from fastapi import Depends
@@ -11,14 +13,145 @@ from fastapi import Request
 from fastapi import status as http_status
 from fastapi.responses import HTMLResponse
 from fastapi.responses import RedirectResponse
-from sqlalchemy import desc
+from sqlalchemy import case
+from sqlalchemy import func
+from sqlalchemy.orm import Query
 from sqlalchemy.orm import Session
+from sqlalchemy.sql.elements import ColumnElement
 
 from . import auth
+from . import catalog
+from . import fulltext
 from . import models
+from . import read_models
 from . import roles
 from .database import get_db
+from .pagination import InvalidCursor
+from .pagination import Ordering
+from .pagination import Page
+from .pagination import paginate
 from .roles import requires_permission
+from .services import enrichment
+
+# Orderings of the book list, by group_by. The second sort value of each is
+# the group header: the author, or the title's first letter, accented ones
+# included ("#" for titles not starting with a letter, which come last; see
+# database.title_group).
+_title_group = func.title_group(models.Book.title)
+LIST_ORDERINGS = {
+    "author": Ordering("author", (
+        (func.lower(models.Book.author), False),
+        (models.Book.author, False),
+        (models.Book.created_at, True),
+        (models.Book.id, True),
+    )),
+    "alphabetical": Ordering("alphabetical", (
+        (case((_title_group == "#", 1), else_=0), False),
+        (_title_group, False),
+        (models.Book.created_at, True),
+        (models.Book.id, True),
+    )),
+}
+
+
+# Order of the cards in a row of the home board: recently updated first
+BOARD_ORDERING = Ordering("updated", ((models.Book.updated_at, True), (models.Book.id, True)))
+
+
+@dataclass
+class BookGroup:
+    """The books of one group header on a page of the book list."""
+
+    key: str
+    books: list[read_models.BookCard]
+    # Whether the group started on an earlier page (so has its header already)
+    continued: bool = False
+    # Number of books in the whole group, across pages
+    count: int | None = None
+
+    @property
+    def dom_id(self) -> str:
+        return "group-" + hashlib.md5(self.key.encode()).hexdigest()[:12]
+
+
+def group_page(page: Page) -> list[BookGroup]:
+    """Split a page of the book list into its groups."""
+    groups: list[BookGroup] = []
+    previous = page.after[1] if page.after else None
+    for book, key in zip(page.items, page.keys, strict=True):
+        if not groups or groups[-1].key != key[1]:
+            groups.append(BookGroup(key[1], [], continued=not groups and key[1] == previous))
+        groups[-1].books.append(book)
+    return groups
+
+
+def count_groups(query: Query, ordering: Ordering, groups: list[BookGroup]) -> None:
+    """
+    Set the book counts of the groups whose header is on this page.
+
+    Counts come from one GROUP BY over the filtered query, so they cover the
+    books of later pages too.
+    """
+    keys = [group.key for group in groups if not group.continued]
+    if not keys:
+        return
+    key = ordering.columns[1][0]
+    counts = dict(
+        query.with_entities(key, func.count(models.Book.id)).filter(key.in_(keys)).group_by(key).all()
+    )
+    for group in groups:
+        if not group.continued:
+            group.count = counts.get(group.key, len(group.books))
+
+
+def ranked(ordering: Ordering, rank: ColumnElement, position: int) -> Ordering:
+    """The ordering with the full-text rank (best match first) at ``position``."""
+    columns = ordering.columns[:position] + ((rank, False),) + ordering.columns[position:]
+    return Ordering(f"{ordering.name}-ranked", columns)
+
+
+def board_query(
+    db: Session,
+    user: models.User,
+    title_filter: str | None = None,
+    author_filter: str | None = None,
+    notes_filter: str | None = None,
+    rating_filter: str | None = None,
+    genre_filter: str | None = None,
+) -> tuple[Query, Ordering]:
+    """
+    Query the cards of a user's books for the home board, with its filters applied.
+
+    Returns:
+        The query, and the order of the cards in a row: best text match
+        first when a text filter is used, then recently updated first
+    """
+    query = read_models.card_query(db).filter(models.Book.user_id == user.id)
+    query, rank = fulltext.filter_books(db, query, title_filter, author_filter, notes_filter)
+    if rating_filter:
+        try:
+            rating_value = int(rating_filter)
+            if rating_value == 0:
+                # Filter for books with no rating
+                query = query.filter(models.Book.rating.is_(None))
+            else:
+                query = query.filter(models.Book.rating == rating_value)
+        except (ValueError, TypeError):
+            # Invalid rating filter, ignore
+            pass
+    query = catalog.filter_by_genre(db, query, genre_filter)
+    return query, ranked(BOARD_ORDERING, rank, 0) if rank is not None else BOARD_ORDERING
+
+
+def board_row_url(
+    status: models.BookStatus, filters: dict[str, str | None], cursor: str | None = None
+) -> str:
+    """URL of the cards of a board row, keeping the board's filters."""
+    params = {name: value for name, value in filters.items() if value}
+    if cursor:
+        params["cursor"] = cursor
+    return f"/books/board/{status.name}?{urlencode(params)}"
+
 
 router = APIRouter(
     prefix="/books",
@@ -41,13 +174,21 @@ async def list_books(
     author_filter: str | None = None,
     notes_filter: str | None = None,
     rating_filter: str | None = None,
+    genre_filter: str | None = None,
     group_by: str | None = None,
+    cursor: str | None = None,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(auth.get_current_active_user),
 ):
-    """List all books for the current user with optional filtering and grouping."""
+    """
+    List the current user's books with optional filtering and grouping.
 
-    query = db.query(models.Book)
+    Books are shown a page at a time. The first page is part of the full
+    page; scrolling to the end of the list loads the next one, with
+    ``cursor``, as a fragment that continues the last group if it was cut.
+    """
+
+    query = read_models.card_query(db)
 
     # Filter by user unless they have permission to view all books
     if not roles.has_permission(current_user, "view_all_books"):
@@ -63,17 +204,8 @@ async def list_books(
                 status_code=400, detail="Invalid status filter"
             ) from None
 
-    # Apply title filter if provided
-    if title_filter:
-        query = query.filter(models.Book.title.ilike(f"%{title_filter}%"))
-
-    # Apply author filter if provided
-    if author_filter:
-        query = query.filter(models.Book.author.ilike(f"%{author_filter}%"))
-
-    # Apply notes filter if provided
-    if notes_filter:
-        query = query.filter(models.Book.notes.ilike(f"%{notes_filter}%"))
+    # Title, author and notes filters use the full-text index when there is one
+    query, rank = fulltext.filter_books(db, query, title_filter, author_filter, notes_filter)
 
     # Apply rating filter if provided
     if rating_filter and rating_filter.isdigit():
@@ -81,40 +213,50 @@ async def list_books(
         if 0 <= rating <= 3:  # Ensure rating is within valid range
             query = query.filter(models.Book.rating == rating)
 
-    books = query.order_by(desc(models.Book.created_at)).all()
+    query = catalog.filter_by_genre(db, query, genre_filter)
 
-    # Group books as requested
+    # Pages run through the groups in header order, best text match and then
+    # newest first within a group
     group_by = group_by or request.query_params.get("group_by", "alphabetical")
-    grouped_books = None
+    ordering = LIST_ORDERINGS.get(group_by, LIST_ORDERINGS["alphabetical"])
+    if rank is not None:
+        ordering = ranked(ordering, rank, 2)
+    try:
+        page = paginate(query, ordering, cursor, into=read_models.BookCard)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e)) from None
+    books = page.items
+    groups = group_page(page)
+    count_groups(query, ordering, groups)
+    snippets = fulltext.notes_snippets(db, [book.id for book in books], notes_filter)
     group_options = [
         ("author", "By Author"),
         ("alphabetical", "Alphabetically (A-Z)"),
     ]
-
-    if group_by == "author":
-        grouped_books = defaultdict(list)
-        for book in books:
-            grouped_books[book.author].append(book)
-        # Sort authors alphabetically
-        grouped_books = dict(sorted(grouped_books.items(), key=lambda x: x[0].lower()))
-    else:  # default and fallback to alphabetical
-        grouped_books = defaultdict(list)
-        for book in books:
-            first_letter = book.title[0].upper() if book.title else "#"
-            if not first_letter.isalpha():
-                first_letter = "#"
-            grouped_books[first_letter].append(book)
-        # Sort letters A-Z, then '#'
-        sorted_keys = sorted([k for k in grouped_books.keys() if k != "#"]) + (["#"] if "#" in grouped_books else [])
-        grouped_books = {k: grouped_books[k] for k in sorted_keys}
+    next_url = None
+    if page.next_cursor:
+        next_url = f"{request.url.path}?{urlencode({**request.query_params, 'cursor': page.next_cursor})}"
 
     templates = get_templates(request)
+    if cursor and "hx-request" in request.headers:
+        return templates.TemplateResponse(
+            "books/list_page.html",
+            {
+                "request": request,
+                "user": current_user,
+                "groups": groups,
+                "snippets": snippets,
+                "next_url": next_url,
+            },
+        )
     return templates.TemplateResponse(
         "books/list.html",
         {
             "request": request,
             "user": current_user,
-            "grouped_books": grouped_books,
+            "groups": groups,
+            "snippets": snippets,
+            "next_url": next_url,
             "group_by": group_by,
             "group_options": group_options,
             "books": books,  # still pass flat list for possible use
@@ -123,6 +265,8 @@ async def list_books(
             "author_filter": author_filter,
             "notes_filter": notes_filter,
             "rating_filter": rating_filter,
+            "genre_filter": genre_filter,
+            "genre_options": catalog.genre_names(db, current_user.id),
         },
     )
 
@@ -154,6 +298,64 @@ async def new_book_form(
     )
 
 
+@router.get("/board/{status_name}", response_class=HTMLResponse, response_model=None)
+async def board_row_page(
+    request: Request,
+    status_name: str,
+    cursor: str | None = None,
+    title_filter: str | None = None,
+    author_filter: str | None = None,
+    notes_filter: str | None = None,
+    rating_filter: str | None = None,
+    genre_filter: str | None = None,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(auth.get_current_active_user),
+):
+    """
+    Render cards of a home board row.
+
+    The board page only has the row headers; each row loads its first cards
+    from here once it is on screen, and the next ones, with ``cursor``, as it
+    scrolls sideways.
+    """
+    try:
+        book_status = models.BookStatus[status_name]
+    except KeyError:
+        raise HTTPException(status_code=400, detail="Invalid status") from None
+
+    query, ordering = board_query(
+        db, current_user, title_filter, author_filter, notes_filter, rating_filter, genre_filter
+    )
+    try:
+        page = paginate(
+            query.filter(models.Book.status == book_status), ordering, cursor, into=read_models.BookCard
+        )
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e)) from None
+    next_url = None
+    if page.next_cursor:
+        filters = {
+            "title_filter": title_filter,
+            "author_filter": author_filter,
+            "notes_filter": notes_filter,
+            "rating_filter": rating_filter,
+            "genre_filter": genre_filter,
+        }
+        next_url = board_row_url(book_status, filters, page.next_cursor)
+
+    templates = get_templates(request)
+    return templates.TemplateResponse(
+        "books/board_cards.html",
+        {
+            "request": request,
+            "status": book_status,
+            "books": page.items,
+            "snippets": fulltext.notes_snippets(db, [book.id for book in page.items], notes_filter),
+            "next_url": next_url,
+        },
+    )
+
+
 @router.post("/", response_model=None)
 @requires_permission("manage_own_books")
 async def create_book(
@@ -166,6 +368,8 @@ async def create_book(
     genres: str | None = Form(None),  # Will be a comma-separated string of genres
     publication_date: str | None = Form(None),
     page_count: str | None = Form(None),
+    cover_id: str | None = Form(None),
+    cover_url: str | None = Form(None),
     db: Session = Depends(get_db),
     current_user: models.User = Depends(auth.get_current_active_user),
 ):
@@ -199,6 +403,14 @@ async def create_book(
         except ValueError:
             # If not a valid integer, just ignore it
             pass
+
+    # Parse cover id if provided
+    parsed_cover_id = None
+    if cover_id and cover_id.strip():
+        try:
+            parsed_cover_id = int(cover_id)
+        except ValueError:
+            pass
             
     now = datetime.utcnow()
     book = models.Book(
@@ -213,13 +425,17 @@ async def create_book(
         start_date=now if book_status == models.BookStatus.READING else None,
         completion_date=now if book_status == models.BookStatus.COMPLETED else None,
         # New fields
-        genres=genres.split(',') if genres else [],
+        genres=catalog.split_genres(genres),
         publication_date=publication_date,
         page_count=parsed_page_count,
+        cover_id=parsed_cover_id,
+        cover_url=cover_url or None,
     )
     db.add(book)
     db.commit()
     db.refresh(book)
+    # Missing page count, genres or publication date are filled in later
+    enrichment.enqueue(db, book)
 
     return RedirectResponse(
         url="/books",
@@ -306,6 +522,8 @@ async def update_book(
     genres: str | None = Form(None),  # Will be a comma-separated string of genres
     publication_date: str | None = Form(None),
     page_count: str | None = Form(None),
+    cover_id: str | None = Form(None),
+    cover_url: str | None = Form(None),
     db: Session = Depends(get_db),
     current_user: models.User = Depends(auth.get_current_active_user),
 ):
@@ -365,17 +583,31 @@ async def update_book(
             # If not a valid integer, just ignore it
             pass
 
+    # Parse cover id if provided
+    parsed_cover_id = None
+    if cover_id and cover_id.strip():
+        try:
+            parsed_cover_id = int(cover_id)
+        except ValueError:
+            pass
+
     # Update book
     book.title = title
     book.author = author
     book.status = new_status
     book.notes = notes
     book.rating = parsed_rating
-    book.genres = genres.split(',') if genres else []
+    book.genres = catalog.split_genres(genres)
     book.publication_date = publication_date
     book.page_count = parsed_page_count
+    # Keep the cover unless the form sends the cover fields
+    if cover_id is not None:
+        book.cover_id = parsed_cover_id
+    if cover_url is not None:
+        book.cover_url = cover_url or None
     book.updated_at = datetime.utcnow()
     db.commit()
+    enrichment.enqueue(db, book)
 
     return RedirectResponse(
         url="/books",
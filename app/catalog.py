@@ -0,0 +1,143 @@
+"""Authors and genres normalized out of the books table.
+
+``Book.author`` and ``Book.genres`` (a JSON array) stay what the book form,
+the API and the enrichment write. On SQLite, triggers on ``books`` copy them
+into ``authors``, ``genres`` and ``book_genres`` on every insert and update,
+the same way ``books_fts`` is kept in step, so no write path has to know
+about these tables. Genre names are trimmed, as the form's comma-separated
+input used to be stored with the spaces around them (``split_genres`` now
+trims them before they are written).
+
+The genre filter looks books up through ``ix_book_genres_genre_book``.
+Other engines, or a database without the triggers, fall back to matching
+the JSON text, including names stored with the space that followed a comma.
+"""
+
+import json
+
+from sqlalchemy import String
+from sqlalchemy import cast
+from sqlalchemy import event
+from sqlalchemy import or_
+from sqlalchemy import select
+from sqlalchemy import text
+from sqlalchemy.orm import Query
+from sqlalchemy.orm import Session
+
+from . import models
+
+# Fills the tables from the row ``new`` of books
+_SYNC = """
+    INSERT OR IGNORE INTO genres(name)
+        SELECT trim(value) FROM json_each(CASE WHEN json_valid(new.genres) THEN new.genres END)
+        WHERE type = 'text' AND trim(value) != '';
+    INSERT OR IGNORE INTO book_genres(book_id, genre_id)
+        SELECT new.id, genres.id
+        FROM json_each(CASE WHEN json_valid(new.genres) THEN new.genres END) AS g
+        JOIN genres ON genres.name = trim(g.value)
+        WHERE g.type = 'text';
+    INSERT OR IGNORE INTO authors(name) SELECT trim(new.author) WHERE trim(new.author) != '';
+    UPDATE books SET author_id = (SELECT id FROM authors WHERE name = trim(new.author))
+        WHERE id = new.id;
+"""
+
+CREATE_STATEMENTS = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS books_catalog_insert AFTER INSERT ON books BEGIN
+        {_SYNC}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS books_catalog_update AFTER UPDATE OF author, genres ON books BEGIN
+        DELETE FROM book_genres WHERE book_id = old.id;
+        {_SYNC}
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS books_catalog_delete AFTER DELETE ON books BEGIN
+        DELETE FROM book_genres WHERE book_id = old.id;
+    END
+    """,
+]
+
+DROP_STATEMENTS = [
+    "DROP TRIGGER IF EXISTS books_catalog_insert",
+    "DROP TRIGGER IF EXISTS books_catalog_update",
+    "DROP TRIGGER IF EXISTS books_catalog_delete",
+]
+
+
+@event.listens_for(models.BookGenre.__table__, "after_create")
+def _create_triggers(target, connection, **kw):
+    # Databases made with create_all (tests) get the triggers too; migrations
+    # create them in production. book_genres is created after books and genres.
+    if connection.dialect.name == "sqlite":
+        for statement in CREATE_STATEMENTS:
+            connection.execute(text(statement))
+
+
+@event.listens_for(models.BookGenre.__table__, "before_drop")
+def _drop_triggers(target, connection, **kw):
+    if connection.dialect.name == "sqlite":
+        for statement in DROP_STATEMENTS:
+            connection.execute(text(statement))
+
+
+def is_available(db: Session) -> bool:
+    """Check whether the database keeps the genre tables up to date."""
+    if db.get_bind().dialect.name != "sqlite":
+        return False
+    return db.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = 'books_catalog_insert'")
+    ).first() is not None
+
+
+def split_genres(value: str | None) -> list[str]:
+    """Get the genre names out of the book form's comma-separated field."""
+    return [name.strip() for name in (value or "").split(",") if name.strip()]
+
+
+def filter_by_genre(db: Session, query: Query, genre: str | None) -> Query:
+    """
+    Keep the books that have a genre.
+
+    Args:
+        db: Database session
+        query: Query for ``models.Book`` or for its columns
+        genre: Name of the genre, as listed by ``genre_names``
+
+    Returns:
+        The filtered query, unchanged if ``genre`` is empty
+    """
+    genre = (genre or "").strip()
+    if not genre:
+        return query
+    if not is_available(db):
+        genres = cast(models.Book.genres, String)
+        # Books saved before split_genres have " Name" after the first genre
+        return query.filter(
+            or_(genres.contains(json.dumps(genre)), genres.contains(json.dumps(" " + genre)))
+        )
+    genre_id = select(models.Genre.id).where(models.Genre.name == genre).scalar_subquery()
+    book_ids = select(models.BookGenre.book_id).where(models.BookGenre.genre_id == genre_id)
+    return query.filter(models.Book.id.in_(book_ids))
+
+
+def genre_names(db: Session, user_id: int) -> list[str]:
+    """
+    Get the genres of a user's books, for the genre filter.
+
+    Returns:
+        The genre names in alphabetical order; empty without the genre tables
+    """
+    if not is_available(db):
+        return []
+    rows = db.execute(
+        select(models.Genre.name)
+        .join(models.BookGenre, models.BookGenre.genre_id == models.Genre.id)
+        .join(models.Book, models.Book.id == models.BookGenre.book_id)
+        .where(models.Book.user_id == user_id)
+        .distinct()
+        .order_by(models.Genre.name)
+    )
+    return list(rows.scalars())
@@ -1,8 +1,11 @@
 import logging
 import os
+import sqlite3
 
 from dotenv import load_dotenv
 from sqlalchemy import create_engine
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
@@ -28,6 +31,21 @@ connect_args = (
     {"check_same_thread": False} if SQLALCHEMY_DATABASE_URL.startswith("sqlite") else {}
 )
 
+
+def title_group(title: str | None) -> str:
+    """Group header of a title in the alphabetical book list: its first letter, or "#"."""
+    letter = title[0].upper() if title else "#"
+    return letter if letter.isalpha() else "#"
+
+
+@event.listens_for(Engine, "connect")
+def _register_functions(dbapi_connection, connection_record):
+    # SQLite's upper() only knows ASCII; the book list groups titles with
+    # title_group so that "Émile" goes under "É", not "#"
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        dbapi_connection.create_function("title_group", 1, title_group, deterministic=True)
+
+
 engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args=connect_args)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
@@ -0,0 +1,177 @@
+"""Full-text search over book titles, authors and notes.
+
+On SQLite, ``books_fts`` is an FTS5 index of ``books(title, author, notes)``.
+It stores no copy of the text (``content='books'``) and is kept in sync by
+triggers on ``books``. The title, author and notes filters become one MATCH
+on it, each word matching as a prefix. Results can be ranked with BM25, and
+matches in the notes get a highlighted snippet.
+
+Other engines, or a database without the index, fall back to ILIKE filters,
+which are unranked and have no snippets.
+"""
+
+import re
+
+from sqlalchemy import event
+from sqlalchemy import func
+from sqlalchemy import literal_column
+from sqlalchemy import select
+from sqlalchemy import text
+from sqlalchemy.orm import Query
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import column
+from sqlalchemy.sql import table
+from sqlalchemy.sql.elements import ColumnElement
+
+from . import models
+
+CREATE_STATEMENTS = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS books_fts USING fts5(
+        title, author, notes,
+        content='books', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS books_fts_insert AFTER INSERT ON books BEGIN
+        INSERT INTO books_fts(rowid, title, author, notes)
+        VALUES (new.id, new.title, new.author, new.notes);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS books_fts_delete AFTER DELETE ON books BEGIN
+        INSERT INTO books_fts(books_fts, rowid, title, author, notes)
+        VALUES ('delete', old.id, old.title, old.author, old.notes);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS books_fts_update AFTER UPDATE OF title, author, notes ON books BEGIN
+        INSERT INTO books_fts(books_fts, rowid, title, author, notes)
+        VALUES ('delete', old.id, old.title, old.author, old.notes);
+        INSERT INTO books_fts(rowid, title, author, notes)
+        VALUES (new.id, new.title, new.author, new.notes);
+    END
+    """,
+]
+
+DROP_STATEMENTS = [
+    "DROP TRIGGER IF EXISTS books_fts_insert",
+    "DROP TRIGGER IF EXISTS books_fts_delete",
+    "DROP TRIGGER IF EXISTS books_fts_update",
+    "DROP TABLE IF EXISTS books_fts",
+]
+
+# BM25 weights of the title, author and notes columns
+RANK_WEIGHTS = (10.0, 5.0, 1.0)
+
+# Snippets mark the matched words with these; see jinja_filters.highlight
+HIGHLIGHT_START = "\x02"
+HIGHLIGHT_END = "\x03"
+SNIPPET_TOKENS = 16
+
+books_fts = table("books_fts", column("rowid"))
+_fts = literal_column("books_fts")
+_WORD = re.compile(r"\w+")
+
+
+@event.listens_for(models.Book.__table__, "after_create")
+def _create_index(target, connection, **kw):
+    # Databases made with create_all (tests) get the index too; migrations
+    # create it in production
+    if connection.dialect.name == "sqlite":
+        for statement in CREATE_STATEMENTS:
+            connection.execute(text(statement))
+
+
+@event.listens_for(models.Book.__table__, "before_drop")
+def _drop_index(target, connection, **kw):
+    if connection.dialect.name == "sqlite":
+        for statement in DROP_STATEMENTS:
+            connection.execute(text(statement))
+
+
+def is_available(db: Session) -> bool:
+    """Check whether the database has the full-text index."""
+    if db.get_bind().dialect.name != "sqlite":
+        return False
+    return db.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'books_fts'")
+    ).first() is not None
+
+
+def match_expression(column_name: str, value: str) -> str | None:
+    """
+    Build an FTS5 query matching every word of ``value`` as a prefix in one column.
+
+    Returns:
+        The query, or None if ``value`` has no words to search for
+    """
+    words = _WORD.findall(value)
+    if not words:
+        return None
+    terms = " ".join(f'"{word}"*' for word in words)
+    return f"{column_name} : ({terms})"
+
+
+def filter_books(
+    db: Session,
+    query: Query,
+    title_filter: str | None = None,
+    author_filter: str | None = None,
+    notes_filter: str | None = None,
+) -> tuple[Query, ColumnElement | None]:
+    """
+    Apply the title, author and notes filters to a query for books.
+
+    Args:
+        db: Database session
+        query: Query for ``models.Book`` or for its columns
+        title_filter: Words the title has to contain
+        author_filter: Words the author has to contain
+        notes_filter: Words the notes have to contain
+
+    Returns:
+        The filtered query, and the BM25 rank of each book (lower is a better
+        match) when the full-text index was used, else None
+    """
+    filters = {"title": title_filter, "author": author_filter, "notes": notes_filter}
+    filters = {name: value for name, value in filters.items() if value}
+    if not filters:
+        return query, None
+
+    use_index = is_available(db)
+    matches = []
+    for name, value in filters.items():
+        expression = match_expression(name, value) if use_index else None
+        if expression:
+            matches.append(expression)
+        else:
+            query = query.filter(getattr(models.Book, name).ilike(f"%{value}%"))
+    if not matches:
+        return query, None
+
+    query = query.join(books_fts, books_fts.c.rowid == models.Book.id).filter(
+        _fts.op("MATCH")(" AND ".join(matches))
+    )
+    return query, func.bm25(_fts, *RANK_WEIGHTS)
+
+
+def notes_snippets(db: Session, book_ids: list[int], notes_filter: str | None) -> dict[int, str]:
+    """
+    Get the passages of the books' notes matching the notes filter.
+
+    Returns:
+        Dictionary mapping book ids to a snippet with the matched words
+        between HIGHLIGHT_START and HIGHLIGHT_END; empty without the index
+    """
+    expression = match_expression("notes", notes_filter or "")
+    if not (book_ids and expression and is_available(db)):
+        return {}
+    snippet = func.snippet(_fts, 2, HIGHLIGHT_START, HIGHLIGHT_END, "…", SNIPPET_TOKENS)
+    rows = db.execute(
+        select(books_fts.c.rowid, snippet).where(
+            _fts.op("MATCH")(expression), books_fts.c.rowid.in_(book_ids)
+        )
+    )
+    return dict(rows.all())
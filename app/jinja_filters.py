@@ -2,6 +2,11 @@ import json
 from typing import Any
 
 from fastapi.templating import Jinja2Templates
+from markupsafe import Markup
+from markupsafe import escape
+
+from .fulltext import HIGHLIGHT_END
+from .fulltext import HIGHLIGHT_START
 
 
 def fromjson(value: str) -> dict[str, Any]:
@@ -12,6 +17,14 @@ def fromjson(value: str) -> dict[str, Any]:
         return {}
 
 
+def highlight(snippet: str) -> Markup:
+    """Escape a full-text snippet and mark its matched words with <mark>."""
+    return Markup(
+        str(escape(snippet)).replace(HIGHLIGHT_START, "<mark>").replace(HIGHLIGHT_END, "</mark>")
+    )
+
+
 def register_filters(templates: Jinja2Templates) -> None:
     """Register all custom filters with a Jinja2Templates instance."""
     templates.env.filters["fromjson"] = fromjson
+    templates.env.filters["highlight"] = highlight
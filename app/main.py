@@ -1,5 +1,6 @@
 import json
 import os
+from contextlib import asynccontextmanager
 
 from dotenv import load_dotenv
 from fastapi import Depends
@@ -12,6 +13,7 @@ from fastapi.responses import HTMLResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from pydantic import BaseModel
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 from starlette.middleware.sessions import SessionMiddleware
 
@@ -19,12 +21,16 @@ from starlette.middleware.sessions import SessionMiddleware
 from . import auth
 from . import auth_routes
 from . import book_routes
+from . import catalog
 from . import database
 from . import jinja_filters
 from . import models
 from . import roles
 from . import themes
 from .api import book_search
+from .api import covers
+from .services import enrichment
+from .services import openlibrary_service
 
 # Conditional imports based on features
 try:
@@ -40,9 +46,25 @@ from .auth import get_optional_current_user_sync
 # Load environment variables
 load_dotenv()
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Open shared resources on startup and release them on shutdown."""
+    await openlibrary_service.open_client()
+    # Tests run queued enrichment themselves
+    if os.getenv("TESTING") != "true":
+        enrichment.start_workers()
+    try:
+        yield
+    finally:
+        await enrichment.stop_workers()
+        await openlibrary_service.close_client()
+
+
 # Create the FastAPI app with custom docs URLs that we'll protect
 app = FastAPI(
     title="greatReads",
+    lifespan=lifespan,
     # We'll protect these routes with our middleware
     docs_url="/docs",
     redoc_url="/redoc",
@@ -184,6 +206,7 @@ app.include_router(book_routes.router)
 
 # Include API routers
 app.include_router(book_search.router)
+app.include_router(covers.router)
 
 # We don't need to create custom routes since we're using FastAPI's built-in routes
 # and protecting them with middleware
@@ -287,51 +310,47 @@ def home(
     author_filter: str | None = None,
     notes_filter: str | None = None,
     rating_filter: str | None = None,
+    genre_filter: str | None = None,
     db: Session = Depends(database.get_db)
 ):
     # Get current user from token cookie if available
     access_token = request.cookies.get("access_token")
     current_user = None
-    books = []
-
-    books_by_status = {}
+    status_counts = {}
+    row_urls = {}
+    genre_options = []
     if access_token:
         # Token is stored without Bearer prefix
         try:
             current_user = auth.get_optional_current_user_sync(access_token, db)
             if current_user:
-                # Get all user's books grouped by status
-                query = db.query(models.Book).filter(models.Book.user_id == current_user.id)
-
-                # Apply filters if provided
-                if title_filter:
-                    query = query.filter(models.Book.title.ilike(f"%{title_filter}%"))
-                if author_filter:
-                    query = query.filter(models.Book.author.ilike(f"%{author_filter}%"))
-                if notes_filter:
-                    query = query.filter(models.Book.notes.ilike(f"%{notes_filter}%"))
-                if rating_filter:
-                    # Convert to integer or handle None
-                    try:
-                        rating_value = int(rating_filter)
-                        if rating_value == 0:
-                            # Filter for books with no rating
-                            query = query.filter(models.Book.rating.is_(None))
-                        else:
-                            # Filter for books with specific rating
-                            query = query.filter(models.Book.rating == rating_value)
-                    except (ValueError, TypeError):
-                        # Invalid rating filter, ignore
-                        pass
-
-                # Execute query and order by updated_at
-                books = query.order_by(models.Book.updated_at.desc()).all()
-
-                # Group books by status
+                query, _ = book_routes.board_query(
+                    db,
+                    current_user,
+                    title_filter,
+                    author_filter,
+                    notes_filter,
+                    rating_filter,
+                    genre_filter,
+                )
+                status_counts = dict(
+                    query.with_entities(models.Book.status, func.count(models.Book.id))
+                    .group_by(models.Book.status)
+                    .all()
+                )
+
+                # Rows load their cards themselves, a page at a time
+                filters = {
+                    "title_filter": title_filter,
+                    "author_filter": author_filter,
+                    "notes_filter": notes_filter,
+                    "rating_filter": rating_filter,
+                    "genre_filter": genre_filter,
+                }
                 for status in models.BookStatus:
-                    status_books = [b for b in books if b.status == status]
-                    if status_books:
-                        books_by_status[status] = status_books
+                    if status_counts.get(status):
+                        row_urls[status] = book_routes.board_row_url(status, filters)
+                genre_options = catalog.genre_names(db, current_user.id)
         except Exception as e:
             # Invalid token, ignore and proceed as anonymous user
             print(f"Authentication error: {e}")
@@ -343,12 +362,15 @@ def home(
         "theme": theme,
         "current_theme": current_theme,
         "user": current_user,
-        "books_by_status": books_by_status,
+        "status_counts": status_counts,
+        "row_urls": row_urls,
         "book_statuses": list(models.BookStatus),
         "title_filter": title_filter,
         "author_filter": author_filter,
         "notes_filter": notes_filter,
         "rating_filter": rating_filter,
+        "genre_filter": genre_filter,
+        "genre_options": genre_options,
     }
 
     response = templates.TemplateResponse("index.html", context)
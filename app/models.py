@@ -7,6 +7,7 @@ from sqlalchemy import (
     DateTime,
     Enum as SQLEnum,
     ForeignKey,
+    Index,
     Integer,
     String,
     Text,
@@ -67,6 +68,14 @@ class User(Base):
 
 class Book(Base):
     __tablename__ = "books"
+    __table_args__ = (
+        # Home board rows and per-status counts
+        Index("ix_books_user_status_updated", "user_id", "status", "updated_at"),
+        # Book list, and anything else reading one user's shelf
+        Index("ix_books_user_created", "user_id", "created_at"),
+        # Reading statistics over completed books
+        Index("ix_books_user_status_completion", "user_id", "status", "completion_date"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String(255), nullable=False)
@@ -90,6 +99,71 @@ class Book(Base):
     genres = Column(JSON)  # Store multiple genres as a JSON array
     publication_date = Column(String(20))  # Using string to handle various date formats
     page_count = Column(Integer)
+    cover_id = Column(Integer)  # Open Library cover id, served via /covers/
+    cover_url = Column(String(255))  # Remote cover when there is no cover id
+    # Normalized from author by triggers on SQLite; see app/catalog.py
+    author_id = Column(Integer, index=True)
 
     # Relationships
     user = relationship("User", back_populates="books")
+    enrichment_job = relationship(
+        "EnrichmentJob", back_populates="book", uselist=False, cascade="all, delete-orphan"
+    )
+
+
+class OpenLibraryCacheEntry(Base):
+    __tablename__ = "openlibrary_cache"
+
+    resource_id = Column(String(255), primary_key=True)  # e.g. "works/OL82536W"
+    payload = Column(JSON)  # Parsed response, null when not found
+    found = Column(Boolean, nullable=False, default=True)
+    fetched_at = Column(DateTime, nullable=False)
+    expires_at = Column(DateTime, nullable=False)
+    etag = Column(String(255))
+    last_modified = Column(String(64))
+
+
+class EnrichmentJob(Base):
+    __tablename__ = "enrichment_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    book_id = Column(
+        Integer, ForeignKey("books.id", ondelete="CASCADE"), nullable=False, unique=True
+    )
+    status = Column(String(20), nullable=False, default="pending")  # pending, running, done, failed, not_found
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, nullable=False, index=True)
+    locked_until = Column(DateTime)  # A running job past this is picked up again
+    last_error = Column(Text)
+    created_at = Column(DateTime, nullable=False)
+    updated_at = Column(DateTime, nullable=False)
+
+    book = relationship("Book", back_populates="enrichment_job")
+
+
+# Authors and genres of the books, normalized out of Book.author and
+# Book.genres. The book form and the enrichment keep writing those columns;
+# triggers on books keep these tables in step (see app/catalog.py).
+class Author(Base):
+    __tablename__ = "authors"
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String(255), nullable=False, unique=True)
+
+
+class Genre(Base):
+    __tablename__ = "genres"
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String(255), nullable=False, unique=True)
+
+
+class BookGenre(Base):
+    __tablename__ = "book_genres"
+    __table_args__ = (
+        # Books of a genre; the primary key covers genres of a book
+        Index("ix_book_genres_genre_book", "genre_id", "book_id"),
+    )
+
+    book_id = Column(Integer, ForeignKey("books.id", ondelete="CASCADE"), primary_key=True)
+    genre_id = Column(Integer, ForeignKey("genres.id", ondelete="CASCADE"), primary_key=True)
@@ -0,0 +1,155 @@
+"""Keyset (cursor) pagination for ORM queries.
+
+A page is read with ``WHERE <sort key> comes after <last row's sort key>``
+and a LIMIT instead of an OFFSET, so every page costs the same however deep
+the client has scrolled, and rows added meanwhile neither repeat nor go
+missing. The cursor handed to the client is an opaque, url-safe token holding
+the last row's sort values and the name of the ordering they belong to.
+"""
+
+import base64
+import binascii
+import json
+import os
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any
+
+from sqlalchemy import and_
+from sqlalchemy import or_
+from sqlalchemy.orm import Query
+from sqlalchemy.sql.elements import ColumnElement
+
+# Books rendered per page of the book list and per row of the home board
+PAGE_SIZE = int(os.getenv("BOOKS_PAGE_SIZE", "48"))
+
+
+class InvalidCursor(ValueError):
+    """A cursor that was tampered with or belongs to another ordering."""
+
+
+@dataclass(frozen=True)
+class Ordering:
+    """
+    A named sort order usable for keyset pagination.
+
+    ``columns`` are (expression, descending) pairs. They have to make the
+    order total (end with a unique column such as the primary key) and must
+    not be NULL, since NULLs do not compare.
+    """
+
+    name: str
+    columns: tuple[tuple[ColumnElement, bool], ...]
+
+    def order_by(self) -> list[ColumnElement]:
+        return [column.desc() if descending else column.asc() for column, descending in self.columns]
+
+    def after(self, values: list[Any]) -> ColumnElement:
+        """
+        Condition matching the rows that sort after the given sort values.
+
+        Raises:
+            InvalidCursor: If there is not exactly one value per column
+        """
+        if len(values) != len(self.columns):
+            raise InvalidCursor("Cursor does not belong to this ordering")
+        clauses = []
+        for i, (column, descending) in enumerate(self.columns):
+            same_prefix = [
+                c == v for (c, _), v in zip(self.columns[:i], values[:i], strict=True)
+            ]
+            beyond = column < values[i] if descending else column > values[i]
+            clauses.append(and_(*same_prefix, beyond))
+        return or_(*clauses)
+
+
+@dataclass
+class Page:
+    """One page of results."""
+
+    items: list[Any]
+    # The sort values of each item, in the order of the ordering's columns
+    keys: list[tuple[Any, ...]]
+    # Sort values of the row before this page, None on the first page
+    after: tuple[Any, ...] | None
+    # Cursor for the next page, None on the last page
+    next_cursor: str | None
+
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"dt": value.isoformat()}
+    raise TypeError(f"Cannot put {type(value).__name__} in a cursor")
+
+
+def _decode_value(value: dict[str, Any]) -> Any:
+    if "dt" in value:
+        return datetime.fromisoformat(value["dt"])
+    return value
+
+
+def encode_cursor(ordering: Ordering, values: tuple[Any, ...]) -> str:
+    """Make the cursor pointing after a row with the given sort values."""
+    payload = json.dumps([ordering.name, list(values)], default=_encode_value, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(ordering: Ordering, cursor: str) -> tuple[Any, ...]:
+    """
+    Get the sort values out of a cursor.
+
+    Raises:
+        InvalidCursor: If the cursor is malformed or was made for another ordering
+    """
+    try:
+        payload = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        name, values = json.loads(payload, object_hook=_decode_value)
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError) as e:
+        raise InvalidCursor("Malformed cursor") from e
+    if name != ordering.name or not isinstance(values, list) or len(values) != len(ordering.columns):
+        raise InvalidCursor("Cursor does not belong to this ordering")
+    return tuple(values)
+
+
+def paginate(
+    query: Query,
+    ordering: Ordering,
+    cursor: str | None = None,
+    limit: int | None = None,
+    into: Callable[..., Any] | None = None,
+) -> Page:
+    """
+    Read one page of a query.
+
+    Args:
+        query: Query for a single entity or for columns, with any filters applied
+        ordering: Sort order of the pages
+        cursor: Cursor of the previous page, None for the first page
+        limit: Maximum number of items on the page (PAGE_SIZE if None)
+        into: Builds each item from the query's columns, for queries of
+            columns; items are the entities if None
+
+    Returns:
+        The page
+
+    Raises:
+        InvalidCursor: If the cursor cannot be used with this ordering
+    """
+    limit = limit or PAGE_SIZE
+    width = len(query.column_descriptions)
+    after = decode_cursor(ordering, cursor) if cursor else None
+    if after is not None:
+        query = query.filter(ordering.after(list(after)))
+    rows = (
+        query.add_columns(*(column for column, _ in ordering.columns))
+        .order_by(None)
+        .order_by(*ordering.order_by())
+        .limit(limit + 1)
+        .all()
+    )
+    page_rows = rows[:limit]
+    keys = [tuple(row[width:]) for row in page_rows]
+    next_cursor = encode_cursor(ordering, keys[-1]) if len(rows) > limit else None
+    items = [into(*row[:width]) if into else row[0] for row in page_rows]
+    return Page(items, keys, after, next_cursor)
@@ -0,0 +1,46 @@
+"""Lean read models for rendering many books at once.
+
+Book cards show a handful of columns. Loading whole ``Book`` instances for
+them also reads the notes and genres, and puts every row in the session's
+identity map. These queries select only the card columns, and each row
+becomes a small, slotted ``BookCard``; the notes are read when the book's
+modal or page opens.
+"""
+
+from dataclasses import dataclass
+from dataclasses import fields
+from datetime import datetime
+
+from sqlalchemy.orm import Query
+from sqlalchemy.orm import Session
+
+from . import models
+
+
+@dataclass(frozen=True, slots=True)
+class BookCard:
+    """What a book card shows, with the attribute names of ``models.Book``."""
+
+    id: int
+    title: str
+    author: str
+    status: models.BookStatus
+    rating: int | None
+    page_count: int | None
+    publication_date: str | None
+    cover_id: int | None
+    cover_url: str | None
+    created_at: datetime
+
+
+CARD_COLUMNS = tuple(getattr(models.Book, field.name) for field in fields(BookCard))
+
+
+def card_query(db: Session) -> Query:
+    """
+    Query the card columns of books.
+
+    Filter and order it on ``models.Book`` columns like a query for the
+    entity, and paginate it with ``into=BookCard``.
+    """
+    return db.query(*CARD_COLUMNS)
@@ -63,6 +63,11 @@ class BookUpdate(BookBase):
     rating: conint(ge=0, le=3) | None = None
 
 
+class IsbnImport(BaseModel):
+    isbns: list[str] = Field(..., min_length=1, max_length=500)
+    status: BookStatus = Field(default=BookStatus.TO_READ)
+
+
 class Book(BookBase):
     id: int
     user_id: int
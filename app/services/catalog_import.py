@@ -0,0 +1,240 @@
+"""Import Open Library bulk dump files into the local catalog.
+
+Dump files (https://openlibrary.org/developers/dumps) are gzipped TSV with
+one record per line: type, key, revision, last_modified and the record as
+JSON. Files are streamed line by line and written in batches, so memory
+stays bounded regardless of the dump size. After each batch the number of
+lines processed is committed together with the rows, so an interrupted
+import resumes where it stopped.
+"""
+
+import gzip
+import json
+import logging
+import sqlite3
+from collections.abc import Iterator
+from statistics import median
+from typing import Any
+
+from . import local_catalog
+from .edition_resolver import parse_page_count
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 5000
+
+
+def _text(value: Any) -> str | None:
+    """Open Library text fields are either strings or {"type", "value"} objects."""
+    if isinstance(value, dict):
+        return value.get("value")
+    if isinstance(value, str):
+        return value
+    return None
+
+
+def _first(items: Any) -> Any | None:
+    return items[0] if isinstance(items, list) and items else None
+
+
+def iter_dump(path: str, skip: int = 0) -> Iterator[tuple[str, str, dict[str, Any]]]:
+    """
+    Stream records from a dump file.
+
+    Args:
+        path: Path to a gzipped (or plain) dump file
+        skip: Number of leading lines to skip (already imported)
+
+    Yields:
+        (type, key, record) tuples; malformed lines are skipped
+    """
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        for line_number, line in enumerate(f):
+            if line_number < skip:
+                continue
+            parts = line.rstrip("\n").split("\t", 4)
+            if len(parts) != 5:
+                yield "", "", {}
+                continue
+            record_type, key, _revision, _last_modified, payload = parts
+            try:
+                record = json.loads(payload)
+            except json.JSONDecodeError:
+                record = {}
+            yield record_type, key, record
+
+
+def _author_row(key: str, record: dict[str, Any]) -> tuple | None:
+    name = record.get("name")
+    return (key, name) if name else None
+
+
+def _work_rows(key: str, record: dict[str, Any]) -> tuple[tuple | None, list[tuple]]:
+    title = record.get("title")
+    if not title:
+        return None, []
+    subjects = [s for s in record.get("subjects", []) if isinstance(s, str)][:10]
+    work = (
+        key,
+        title,
+        record.get("subtitle"),
+        record.get("first_publish_date"),
+        _text(record.get("description")),
+        json.dumps(subjects) if subjects else None,
+        _first(record.get("covers")),
+    )
+    authors = []
+    for position, entry in enumerate(record.get("authors", [])):
+        author = entry.get("author") if isinstance(entry, dict) else None
+        author_key = author.get("key") if isinstance(author, dict) else None
+        if author_key:
+            authors.append((key, position, author_key))
+    return work, authors
+
+
+def _edition_row(key: str, record: dict[str, Any]) -> tuple:
+    work = _first(record.get("works"))
+    return (
+        key,
+        work.get("key") if isinstance(work, dict) else None,
+        parse_page_count(record),
+        _first(record.get("isbn_13")) or _first(record.get("isbn_10")),
+        _first(record.get("publishers")),
+        record.get("publish_date"),
+        _first(record.get("covers")),
+    )
+
+
+def _write_batch(conn: sqlite3.Connection, batch: dict[str, list[tuple]]) -> None:
+    conn.executemany("INSERT OR REPLACE INTO authors VALUES (?, ?)", batch["authors"])
+    conn.executemany(
+        "INSERT OR REPLACE INTO works "
+        "(key, title, subtitle, first_publish_date, description, subjects, cover_id) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+        batch["works"],
+    )
+    conn.executemany("INSERT OR REPLACE INTO work_authors VALUES (?, ?, ?)", batch["work_authors"])
+    conn.executemany(
+        "INSERT OR REPLACE INTO editions VALUES (?, ?, ?, ?, ?, ?, ?)", batch["editions"]
+    )
+
+
+def import_dump(conn: sqlite3.Connection, path: str, batch_size: int = BATCH_SIZE) -> int:
+    """
+    Import one dump file, resuming after the last committed batch.
+
+    Args:
+        conn: Catalog connection (see ``local_catalog.connect``)
+        path: Path to the dump file
+        batch_size: Number of lines written per transaction
+
+    Returns:
+        Number of lines processed by this call
+    """
+    progress = conn.execute(
+        "SELECT lines_done, finished FROM import_progress WHERE path = ?", (path,)
+    ).fetchone()
+    if progress and progress["finished"]:
+        logger.info(f"{path} already imported, skipping")
+        return 0
+    lines_done = progress["lines_done"] if progress else 0
+    if lines_done:
+        logger.info(f"Resuming {path} after line {lines_done}")
+
+    def empty_batch() -> dict[str, list[tuple]]:
+        return {"authors": [], "works": [], "work_authors": [], "editions": []}
+
+    batch = empty_batch()
+    processed = 0
+    for record_type, key, record in iter_dump(path, skip=lines_done):
+        processed += 1
+        if record_type == "/type/author":
+            row = _author_row(key, record)
+            if row:
+                batch["authors"].append(row)
+        elif record_type == "/type/work":
+            work, authors = _work_rows(key, record)
+            if work:
+                batch["works"].append(work)
+                batch["work_authors"].extend(authors)
+        elif record_type == "/type/edition":
+            batch["editions"].append(_edition_row(key, record))
+
+        if processed % batch_size == 0:
+            with conn:
+                _write_batch(conn, batch)
+                _save_progress(conn, path, lines_done + processed)
+            batch = empty_batch()
+            logger.info(f"{path}: {lines_done + processed} lines imported")
+
+    with conn:
+        _write_batch(conn, batch)
+        _save_progress(conn, path, lines_done + processed, finished=True)
+    logger.info(f"{path}: finished after {lines_done + processed} lines")
+    return processed
+
+
+def _save_progress(conn: sqlite3.Connection, path: str, lines_done: int, finished: bool = False) -> None:
+    conn.execute(
+        "INSERT OR REPLACE INTO import_progress (path, lines_done, finished) VALUES (?, ?, ?)",
+        (path, lines_done, int(finished)),
+    )
+
+
+def finalize(conn: sqlite3.Connection, batch_size: int = BATCH_SIZE) -> None:
+    """
+    Precompute page counts per work and rebuild the full-text index.
+
+    Page counts are the median of the work's edition page counts. Editions are
+    read ordered by work, so only one work's editions are held at a time.
+    """
+    updates: list[tuple[int, str]] = []
+    current_work = None
+    pages: list[int] = []
+    rows = conn.execute(
+        "SELECT work_key, page_count FROM editions "
+        "WHERE work_key IS NOT NULL AND page_count IS NOT NULL ORDER BY work_key"
+    )
+    with conn:
+        for row in rows:
+            if row["work_key"] != current_work:
+                if pages:
+                    updates.append((int(median(pages)), current_work))
+                current_work, pages = row["work_key"], []
+            pages.append(row["page_count"])
+            if len(updates) >= batch_size:
+                conn.executemany("UPDATE works SET page_count = ? WHERE key = ?", updates)
+                updates = []
+        if pages:
+            updates.append((int(median(pages)), current_work))
+        conn.executemany("UPDATE works SET page_count = ? WHERE key = ?", updates)
+
+    with conn:
+        conn.execute("DELETE FROM works_fts")
+        conn.execute(
+            """
+            INSERT INTO works_fts (title, authors, key)
+            SELECT w.title || COALESCE(' ' || w.subtitle, ''),
+                   COALESCE((SELECT group_concat(a.name, char(10))
+                             FROM (SELECT a.name FROM work_authors wa
+                                   JOIN authors a ON a.key = wa.author_key
+                                   WHERE wa.work_key = w.key
+                                   ORDER BY wa.position) a), ''),
+                   w.key
+            FROM works w
+            """
+        )
+        conn.execute("INSERT INTO works_fts (works_fts) VALUES ('optimize')")
+    logger.info("Catalog finalized")
+
+
+def import_dumps(paths: list[str], catalog_path: str | None = None, batch_size: int = BATCH_SIZE) -> None:
+    """Import several dump files and finalize the catalog."""
+    conn = local_catalog.connect(catalog_path)
+    try:
+        for path in paths:
+            import_dump(conn, path, batch_size=batch_size)
+        finalize(conn, batch_size=batch_size)
+    finally:
+        conn.close()
@@ -0,0 +1,204 @@
+"""On-disk cache of Open Library cover images, served from our own origin.
+
+Each cover is downloaded from covers.openlibrary.org once and kept under
+``COVER_CACHE_DIR``. Only the large original is fetched; every size is
+derived from it with Pillow as a WebP thumbnail, including a tiny ``P``
+placeholder meant to be shown blurred while the real image loads.
+
+Cover ids never change content, so files are never revalidated and are
+served with immutable cache headers. Covers Open Library does not have are
+remembered in the Open Library cache for its negative TTL.
+
+Downloads have their own circuit breaker and rate limiter: a board page
+asks for dozens of covers at once, which should neither use up the search
+API's budget nor open its breaker when the covers host has trouble.
+"""
+
+import asyncio
+import hashlib
+import io
+import logging
+import os
+import tempfile
+from dataclasses import dataclass
+
+from PIL import Image
+
+from . import openlibrary_cache
+from . import openlibrary_service
+from .rate_limit import RateLimiter
+from .resilience import CircuitBreaker
+from .singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+COVERS_URL = "https://covers.openlibrary.org"
+
+data_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "data")
+
+COVER_CACHE_DIR = os.getenv("COVER_CACHE_DIR", os.path.join(data_dir, "covers"))
+
+# Thumbnail widths in pixels; "P" is the placeholder
+SIZES = {"P": 16, "S": 64, "M": 180, "L": 400}
+
+WEBP_QUALITY = int(os.getenv("COVER_WEBP_QUALITY", "80"))
+
+# Limits of covers.openlibrary.org, kept apart from the API's (see the
+# OPENLIBRARY_* settings in openlibrary_service)
+RATE_LIMIT = float(os.getenv("COVER_RATE_LIMIT", "20"))
+RATE_LIMIT_BURST = int(os.getenv("COVER_RATE_LIMIT_BURST", "50"))
+MAX_CONCURRENT_REQUESTS = int(os.getenv("COVER_MAX_CONCURRENT_REQUESTS", "8"))
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# Shown when Open Library has no image for a cover id
+PLACEHOLDER_SVG = (
+    '<svg xmlns="http://www.w3.org/2000/svg" width="180" height="270" viewBox="0 0 2 3">'
+    '<rect width="2" height="3" fill="#928374" fill-opacity="0.25"/></svg>'
+)
+
+# Downloads and resizes that are running right now
+in_flight = SingleFlight()
+
+breaker = CircuitBreaker(
+    "covers",
+    failure_threshold=openlibrary_service.BREAKER_FAILURE_THRESHOLD,
+    reset_timeout=openlibrary_service.BREAKER_RESET_TIMEOUT,
+)
+
+limiter = RateLimiter(
+    "covers",
+    openlibrary_service.RATE_LIMIT_PATH,
+    rate=RATE_LIMIT,
+    burst=RATE_LIMIT_BURST,
+    max_concurrent=MAX_CONCURRENT_REQUESTS,
+    lease_ttl=openlibrary_service.CONNECT_TIMEOUT + openlibrary_service.READ_TIMEOUT,
+)
+
+
+@dataclass
+class Cover:
+    """A cover image ready to be served."""
+
+    content: bytes
+    media_type: str
+
+    @property
+    def etag(self) -> str:
+        return '"' + hashlib.blake2b(self.content, digest_size=12).hexdigest() + '"'
+
+
+def _path(cover_id: int, name: str) -> str:
+    """Cover files are spread over 1000 directories by id."""
+    return os.path.join(COVER_CACHE_DIR, f"{cover_id % 1000:03d}", f"{cover_id}-{name}")
+
+
+def _read(path: str) -> bytes | None:
+    try:
+        with open(path, "rb") as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+def _write(path: str, content: bytes) -> None:
+    """Write a file atomically so readers never see a partial image."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def make_thumbnail(original: bytes, width: int) -> bytes:
+    """Resize an image to ``width`` pixels wide (never upscaled) and encode it as WebP."""
+    with Image.open(io.BytesIO(original)) as image:
+        image = image.convert("RGB")
+        image.thumbnail((width, width * 3))
+        out = io.BytesIO()
+        image.save(out, "WEBP", quality=WEBP_QUALITY if width > SIZES["P"] else 30)
+    return out.getvalue()
+
+
+async def get_cover(cover_id: int, size: str) -> Cover | None:
+    """
+    Get a cover image, downloading and resizing it on first use.
+
+    Args:
+        cover_id: Open Library cover id
+        size: One of ``SIZES``
+
+    Returns:
+        The cover, or None if Open Library has no image for this id
+
+    Raises:
+        httpx.HTTPError, UpstreamUnavailable: If the cover could not be
+            downloaded
+        PIL.UnidentifiedImageError: If the download was not an image
+    """
+    content = await asyncio.to_thread(_read, _path(cover_id, f"{size}.webp"))
+    if content is not None:
+        return Cover(content, "image/webp")
+
+    missing = await asyncio.to_thread(
+        openlibrary_cache.lookup, f"covers/{cover_id}"
+    )
+    if missing and missing.fresh and not missing.found:
+        return None
+
+    content = await in_flight.do(("thumbnail", cover_id, size), lambda: _make_variant(cover_id, size))
+    return Cover(content, "image/webp") if content is not None else None
+
+
+async def _make_variant(cover_id: int, size: str) -> bytes | None:
+    """Derive one thumbnail from the large original and store it."""
+    original = await _get_original(cover_id, "L")
+    if original is None:
+        return None
+    content = await asyncio.to_thread(make_thumbnail, original, SIZES[size])
+    await asyncio.to_thread(_write, _path(cover_id, f"{size}.webp"), content)
+    return content
+
+
+async def _get_original(cover_id: int, ol_size: str) -> bytes | None:
+    """Get one of Open Library's own sizes of a cover, from disk or upstream."""
+    path = _path(cover_id, f"{ol_size}.jpg")
+    content = await asyncio.to_thread(_read, path)
+    if content is not None:
+        return content
+    return await in_flight.do(("original", cover_id, ol_size), lambda: _download(cover_id, ol_size))
+
+
+async def _download(cover_id: int, ol_size: str) -> bytes | None:
+    url = f"{COVERS_URL}/b/id/{cover_id}-{ol_size}.jpg"
+    logger.debug(f"Downloading cover {url}")
+    # Without default=false Open Library answers missing covers with a 1x1 GIF
+    response = await openlibrary_service.guarded_get(
+        url,
+        circuit=breaker,
+        rate_limiter=limiter,
+        params={"default": "false"},
+        follow_redirects=True,
+    )
+    if response.status_code == 404:
+        await asyncio.to_thread(
+            openlibrary_cache.store,
+            f"covers/{cover_id}", None, found=False, ttl=openlibrary_cache.NEGATIVE_CACHE_TTL
+        )
+        return None
+    response.raise_for_status()
+    # Checked before it is kept, so a bad body is downloaded again next time
+    # rather than failing every thumbnail made from it
+    await asyncio.to_thread(_check_image, response.content)
+    await asyncio.to_thread(_write, _path(cover_id, f"{ol_size}.jpg"), response.content)
+    return response.content
+
+
+def _check_image(content: bytes) -> None:
+    """Raise PIL.UnidentifiedImageError unless ``content`` is an image."""
+    with Image.open(io.BytesIO(content)) as image:
+        image.verify()
@@ -0,0 +1,112 @@
+"""Pick the best edition of a work for search enrichment.
+
+Search hits are enriched from their editions: the cover edition and the
+first few edition keys of every hit are fetched together in one batched
+``api/books?bibkeys=`` request, and works with no usable candidate fall back
+to a single larger ``editions.json`` page. This module holds the selection
+logic; the HTTP calls live in ``openlibrary_service``.
+"""
+
+import re
+from typing import Any
+
+# Edition keys per search hit sent in the batched lookup
+CANDIDATES_PER_DOC = 4
+
+# Page counts outside this range are usually data-entry mistakes
+PLAUSIBLE_PAGES = range(20, 3001)
+
+_PAGES = re.compile(r"(\d+)\s*p(?:\.|ages)?")
+_NUMBER = re.compile(r"\d+")
+
+
+def parse_page_count(edition: dict[str, Any]) -> int | None:
+    """Get a page count from an edition's number_of_pages or pagination field."""
+    pages = edition.get("number_of_pages")
+    if isinstance(pages, int) and pages > 0:
+        return pages
+    pagination = edition.get("pagination")
+    if isinstance(pagination, str):
+        match = _PAGES.search(pagination)
+        if match:
+            return int(match.group(1))
+        match = _NUMBER.search(pagination)
+        if match:
+            return int(match.group(0))
+    return None
+
+
+def edition_key(edition: dict[str, Any]) -> str | None:
+    """Get the bare edition id (e.g. "OL123M") of an edition record."""
+    key = edition.get("key")
+    return key.rsplit("/", 1)[-1] if isinstance(key, str) else None
+
+
+def candidate_keys(doc: dict[str, Any]) -> list[str]:
+    """Get the edition keys worth checking for a search hit, cover edition first."""
+    keys = []
+    if doc.get("cover_edition_key"):
+        keys.append(doc["cover_edition_key"])
+    for key in doc.get("edition_key") or []:
+        if len(keys) >= CANDIDATES_PER_DOC:
+            break
+        if key not in keys:
+            keys.append(key)
+    return keys
+
+
+def score_edition(
+    edition: dict[str, Any], position: int, cover_key: str | None = None
+) -> float | None:
+    """
+    Score an edition as the source of a work's page count.
+
+    Editions without a page count are not candidates. Otherwise the cover
+    edition is preferred, then English editions, then editions with a
+    plausible page count, and earlier editions in Open Library's order win
+    ties.
+
+    Args:
+        edition: Edition record (from api/books or editions.json)
+        position: Position of the edition among the candidates
+        cover_key: The search hit's cover edition key
+
+    Returns:
+        The score, or None if the edition has no page count
+    """
+    pages = parse_page_count(edition)
+    if not pages:
+        return None
+    score = 0.0
+    if cover_key and edition_key(edition) == cover_key:
+        score += 4
+    languages = [lang.get("key") for lang in edition.get("languages") or [] if isinstance(lang, dict)]
+    if "/languages/eng" in languages:
+        score += 2
+    if pages in PLAUSIBLE_PAGES:
+        score += 2
+    return score - position * 0.01
+
+
+def pick_best(editions: list[dict[str, Any]], cover_key: str | None = None) -> dict[str, Any] | None:
+    """Get the highest scoring edition, or None if none has a page count."""
+    best, best_score = None, None
+    for position, edition in enumerate(editions):
+        score = score_edition(edition, position, cover_key)
+        if score is not None and (best_score is None or score > best_score):
+            best, best_score = edition, score
+    return best
+
+
+def edition_details(edition: dict[str, Any]) -> dict[str, Any]:
+    """Map the chosen edition to the detail fields merged into a search result."""
+    pages = parse_page_count(edition)
+    details: dict[str, Any] = {"number_of_pages": pages, "page_count": pages}
+    subjects = [
+        subject.get("name") if isinstance(subject, dict) else subject
+        for subject in edition.get("subjects") or []
+    ]
+    subjects = [subject for subject in subjects if isinstance(subject, str)]
+    if subjects:
+        details["subjects"] = list(dict.fromkeys(subjects))
+    return details
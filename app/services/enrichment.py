@@ -0,0 +1,391 @@
+"""Durable background queue that fills in book metadata from Open Library.
+
+Books added or edited without page count, genres or publication date get a
+row in ``enrichment_jobs``. A small pool of async workers, started by the
+application lifespan, claims due jobs, looks the book up through
+``openlibrary_service`` with background priority, and fills in whatever the
+book is still missing. Failed lookups are retried with exponential backoff
+until ``MAX_ATTEMPTS`` is reached, and so are lookups whose details came back
+incomplete. Books Open Library does not know, or whose best search result is
+a different book, are not retried.
+
+Jobs are claimed with a conditional UPDATE and a lease (``locked_until``), so
+several application workers can share the queue and a job held by a worker
+that died is picked up again once its lease runs out.
+"""
+
+import asyncio
+import logging
+import os
+import random
+import re
+import unicodedata
+from datetime import datetime
+from datetime import timedelta
+from typing import Any
+
+import httpx
+from sqlalchemy import and_
+from sqlalchemy import func
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+
+from .. import database
+from .. import models
+from . import openlibrary_service
+from .rate_limit import BACKGROUND
+from .rate_limit import use_priority
+from .resilience import Deadline
+from .resilience import UpstreamUnavailable
+
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+# Open Library does not know the book; not retried
+NOT_FOUND = "not_found"
+
+WORKERS = int(os.getenv("ENRICHMENT_WORKERS", "2"))
+POLL_INTERVAL = float(os.getenv("ENRICHMENT_POLL_INTERVAL", "5"))
+MAX_ATTEMPTS = int(os.getenv("ENRICHMENT_MAX_ATTEMPTS", "6"))
+RETRY_BASE_DELAY = float(os.getenv("ENRICHMENT_RETRY_BASE_DELAY", "30"))
+RETRY_MAX_DELAY = float(os.getenv("ENRICHMENT_RETRY_MAX_DELAY", "3600"))
+# Time one lookup may take; also how long a claimed job stays locked
+JOB_DEADLINE = float(os.getenv("ENRICHMENT_JOB_DEADLINE", "30"))
+
+# Number of genres stored, the same as the book form keeps
+MAX_GENRES = 5
+
+_WORD = re.compile(r"\w+")
+# Where a subtitle starts, as in "Dune: Deluxe Edition" or "Emma (Penguin Classics)"
+_SUBTITLE = re.compile(r"[:(\[]| - ")
+
+# Session factory used by the workers; tests point it at their own database
+session_factory = database.SessionLocal
+
+_workers: list[asyncio.Task] = []
+
+
+class IncompleteLookup(UpstreamUnavailable):
+    """A book was found, but Open Library could not give all of its details."""
+
+
+def needs_enrichment(book: models.Book) -> bool:
+    """Check whether a book is missing any of the metadata the queue fills in."""
+    return not (book.page_count and book.genres and book.publication_date)
+
+
+def enqueue(db: Session, book: models.Book, commit: bool = True) -> bool:
+    """
+    Queue a book for enrichment if it is missing metadata.
+
+    A book has at most one job; enqueueing it again makes that job due now
+    with a fresh set of attempts.
+
+    Args:
+        db: Database session
+        book: A saved (or at least flushed) book
+        commit: Whether to commit the session; False leaves the job in the
+            caller's transaction
+
+    Returns:
+        True if the book was queued
+    """
+    if not needs_enrichment(book):
+        return False
+    now = datetime.utcnow()
+    job = db.query(models.EnrichmentJob).filter(models.EnrichmentJob.book_id == book.id).first()
+    if job is None:
+        job = models.EnrichmentJob(book_id=book.id, created_at=now)
+        db.add(job)
+    job.status = PENDING
+    job.attempts = 0
+    job.next_attempt_at = now
+    job.locked_until = None
+    job.last_error = None
+    job.updated_at = now
+    if commit:
+        db.commit()
+    return True
+
+
+def claim_job() -> int | None:
+    """
+    Claim the next due job.
+
+    Returns:
+        The id of the claimed job, or None if no job is due
+    """
+    now = datetime.utcnow()
+    with session_factory() as db:
+        due = (
+            db.query(models.EnrichmentJob.id)
+            .filter(
+                or_(
+                    and_(
+                        models.EnrichmentJob.status == PENDING,
+                        models.EnrichmentJob.next_attempt_at <= now,
+                    ),
+                    and_(
+                        models.EnrichmentJob.status == RUNNING,
+                        models.EnrichmentJob.locked_until < now,
+                    ),
+                )
+            )
+            .order_by(models.EnrichmentJob.next_attempt_at)
+            .limit(WORKERS * 2)
+            .all()
+        )
+        for (job_id,) in due:
+            # Only one worker wins the update for a job
+            claimed = (
+                db.query(models.EnrichmentJob)
+                .filter(
+                    models.EnrichmentJob.id == job_id,
+                    or_(
+                        models.EnrichmentJob.status == PENDING,
+                        models.EnrichmentJob.locked_until < now,
+                    ),
+                )
+                .update(
+                    {
+                        "status": RUNNING,
+                        "locked_until": now + timedelta(seconds=JOB_DEADLINE * 2),
+                        "updated_at": now,
+                    },
+                    synchronize_session=False,
+                )
+            )
+            db.commit()
+            if claimed:
+                return job_id
+    return None
+
+
+def retry_delay(attempts: int) -> float:
+    """Seconds to wait before attempt ``attempts + 1``, with jitter."""
+    delay = min(RETRY_BASE_DELAY * 2 ** (attempts - 1), RETRY_MAX_DELAY)
+    return delay * random.uniform(0.5, 1.0)
+
+
+def metadata_from_result(result: dict[str, Any]) -> dict[str, Any]:
+    """Map a search result to the Book columns the queue fills in."""
+    metadata: dict[str, Any] = {}
+    page_count = result.get("page_count") or result.get("number_of_pages")
+    if page_count:
+        metadata["page_count"] = int(page_count)
+    subjects = [subject for subject in result.get("subjects") or [] if subject]
+    if subjects:
+        metadata["genres"] = subjects[:MAX_GENRES]
+    publication_date = result.get("publication_date") or result.get("first_publish_year")
+    if publication_date:
+        metadata["publication_date"] = str(publication_date)
+    if result.get("cover_id"):
+        metadata["cover_id"] = result["cover_id"]
+    return metadata
+
+
+def _words(text: str | None, min_length: int = 1) -> set[str]:
+    """The words of a title or name, casefolded and without accents."""
+    text = unicodedata.normalize("NFKD", (text or "").casefold())
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    return {word for word in _WORD.findall(text) if len(word) >= min_length}
+
+
+def matches_book(result: dict[str, Any], title: str, author: str) -> bool:
+    """
+    Check whether a search result is the book that was looked up.
+
+    The titles have to have the same words, leaving out a subtitle on either
+    side, and the authors have to share a word, which is usually the surname.
+    """
+    wanted, found = title, result.get("title") or ""
+    if not (
+        _words(wanted) == _words(found)
+        or _words(_SUBTITLE.split(wanted)[0]) == _words(_SUBTITLE.split(found)[0])
+    ):
+        return False
+    # Initials are left out; "J.R.R. Tolkien" and "J. R. R. Tolkien" share
+    # "tolkien", while "J. Smith" and "J. Doe" share nothing
+    wanted = _words(author, min_length=2)
+    return not wanted or bool(wanted & _words(result.get("author"), min_length=2))
+
+
+async def lookup_metadata(title: str, author: str) -> dict[str, Any]:
+    """
+    Look a book up on Open Library (or the local catalog).
+
+    Args:
+        title: Book title
+        author: Book author
+
+    Returns:
+        The metadata found, empty if the book was not found or the best
+        search result is a different book
+
+    Raises:
+        IncompleteLookup: If the book was found but its details could not be
+            fetched, so the lookup is worth retrying
+    """
+    with use_priority(BACKGROUND):
+        results = await openlibrary_service.search_books(
+            f"{title} {author}", limit=1, fetch_details=True, deadline=Deadline(JOB_DEADLINE)
+        )
+    if not results:
+        return {}
+    if not matches_book(results[0], title, author):
+        logger.info(f"Best match for {title!r} by {author!r} is {results[0].get('title')!r}, skipped")
+        return {}
+    if isinstance(results, openlibrary_service.PartialResults):
+        raise IncompleteLookup(f"Details of {title!r} could not be fetched")
+    return metadata_from_result(results[0])
+
+
+def load_job(job_id: int) -> tuple[str, str] | None:
+    """
+    Read what a claimed job needs to look its book up.
+
+    Jobs whose book is gone or no longer needs enrichment are marked done.
+
+    Args:
+        job_id: A job claimed with ``claim_job``
+
+    Returns:
+        The book's title and author, or None if there is nothing to look up
+    """
+    with session_factory() as db:
+        job = db.get(models.EnrichmentJob, job_id)
+        if job is None:
+            return None
+        book = job.book
+        if book is None or not needs_enrichment(book):
+            job.status = DONE
+            db.commit()
+            return None
+        return book.title, book.author
+
+
+def record_result(job_id: int, metadata: dict[str, Any], error: str | None) -> str:
+    """
+    Fill in the metadata found and move the job to its next status.
+
+    Only fields the book does not have yet are filled in, so values entered
+    by the user are never overwritten. An empty ``metadata`` without an
+    ``error`` means Open Library does not know the book, or only a different
+    one; the job then ends as ``NOT_FOUND`` instead of being retried.
+
+    Args:
+        job_id: A job claimed with ``claim_job``
+        metadata: Book columns to fill in
+        error: Why the lookup failed, None if it succeeded
+
+    Returns:
+        The new job status
+    """
+    with session_factory() as db:
+        job = db.get(models.EnrichmentJob, job_id)
+        if job is None or job.book is None:
+            return DONE
+        now = datetime.utcnow()
+        book = job.book
+        for field, value in metadata.items():
+            if not getattr(book, field):
+                setattr(book, field, value)
+        job.attempts += 1
+        job.locked_until = None
+        job.last_error = error
+        job.updated_at = now
+        if error is None:
+            job.status = DONE if metadata else NOT_FOUND
+        elif job.attempts >= MAX_ATTEMPTS:
+            job.status = FAILED
+            logger.warning(f"Giving up enriching book {book.id} after {job.attempts} attempts: {error}")
+        else:
+            job.status = PENDING
+            job.next_attempt_at = now + timedelta(seconds=retry_delay(job.attempts))
+        db.commit()
+        return job.status
+
+
+async def process_job(job_id: int) -> str:
+    """
+    Run one claimed job and record the outcome.
+
+    Args:
+        job_id: A job claimed with ``claim_job``
+
+    Returns:
+        The new job status
+    """
+    book = await asyncio.to_thread(load_job, job_id)
+    if book is None:
+        return DONE
+    title, author = book
+
+    try:
+        metadata, error = await lookup_metadata(title, author), None
+    except (httpx.HTTPError, UpstreamUnavailable) as e:
+        metadata, error = {}, f"{type(e).__name__}: {e}"
+
+    return await asyncio.to_thread(record_result, job_id, metadata, error)
+
+
+async def run_pending(limit: int | None = None) -> int:
+    """
+    Process due jobs until there are none left.
+
+    Args:
+        limit: Maximum number of jobs to process
+
+    Returns:
+        The number of jobs processed
+    """
+    processed = 0
+    while limit is None or processed < limit:
+        job_id = await asyncio.to_thread(claim_job)
+        if job_id is None:
+            break
+        await process_job(job_id)
+        processed += 1
+    return processed
+
+
+async def worker() -> None:
+    """Process jobs forever, sleeping while the queue is empty."""
+    while True:
+        try:
+            if not await run_pending():
+                await asyncio.sleep(POLL_INTERVAL)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.exception(f"Enrichment worker error: {e}")
+            await asyncio.sleep(POLL_INTERVAL)
+
+
+def start_workers(count: int | None = None) -> None:
+    """Start the worker pool. Called from the application lifespan."""
+    count = WORKERS if count is None else count
+    while len(_workers) < count:
+        _workers.append(asyncio.create_task(worker()))
+
+
+async def stop_workers() -> None:
+    """Cancel the worker pool; claimed jobs are retried once their lease expires."""
+    for task in _workers:
+        task.cancel()
+    await asyncio.gather(*_workers, return_exceptions=True)
+    _workers.clear()
+
+
+def get_stats() -> dict[str, Any]:
+    """Get the number of jobs per status and the running workers."""
+    with session_factory() as db:
+        counts = dict(
+            db.query(models.EnrichmentJob.status, func.count(models.EnrichmentJob.id))
+            .group_by(models.EnrichmentJob.status)
+            .all()
+        )
+    return {"jobs": counts, "workers": len(_workers)}
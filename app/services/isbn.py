@@ -0,0 +1,36 @@
+"""ISBN validation and normalization."""
+
+import re
+
+_SEPARATORS = re.compile(r"[\s-]")
+
+
+def normalize_isbn(raw: str) -> str | None:
+    """
+    Validate an ISBN-10 or ISBN-13 and convert it to ISBN-13.
+
+    Hyphens and spaces are ignored, so "0-261-10221-4" and "9780261102217"
+    normalize to the same value.
+
+    Args:
+        raw: The ISBN as entered or scanned
+
+    Returns:
+        The ISBN-13 digits, or None if ``raw`` is not a valid ISBN
+    """
+    isbn = _SEPARATORS.sub("", raw or "").upper()
+    if re.fullmatch(r"\d{9}[\dX]", isbn):
+        total = sum((10 - i) * (10 if c == "X" else int(c)) for i, c in enumerate(isbn))
+        if total % 11:
+            return None
+        return _with_isbn13_check_digit("978" + isbn[:9])
+    if re.fullmatch(r"97[89]\d{10}", isbn):
+        if _with_isbn13_check_digit(isbn[:12]) != isbn:
+            return None
+        return isbn
+    return None
+
+
+def _with_isbn13_check_digit(first12: str) -> str:
+    total = sum(int(c) * (3 if i % 2 else 1) for i, c in enumerate(first12))
+    return first12 + str((10 - total % 10) % 10)
@@ -0,0 +1,178 @@
+"""Local, offline Open Library catalog built from the bulk dump files.
+
+The catalog is a separate SQLite database (see ``catalog_import`` for how it
+is filled) with an FTS5 index over work titles and author names, plus page
+counts and subjects precomputed at import time. ``search_books`` uses it
+depending on ``OPENLIBRARY_SEARCH_MODE``:
+
+- ``remote`` (default): always ask openlibrary.org
+- ``local_first``: use the catalog, fall back to openlibrary.org on no results
+- ``local_only``: never leave the catalog
+"""
+
+import json
+import os
+import re
+import sqlite3
+from pathlib import Path
+from typing import Any
+
+data_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "data")
+
+CATALOG_PATH = os.getenv("OPENLIBRARY_CATALOG_PATH", os.path.join(data_dir, "openlibrary_catalog.db"))
+SEARCH_MODE = os.getenv("OPENLIBRARY_SEARCH_MODE", "remote")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS works (
+    key TEXT PRIMARY KEY,
+    title TEXT NOT NULL,
+    subtitle TEXT,
+    first_publish_date TEXT,
+    description TEXT,
+    subjects TEXT,
+    cover_id INTEGER,
+    page_count INTEGER
+);
+CREATE TABLE IF NOT EXISTS work_authors (
+    work_key TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    author_key TEXT NOT NULL,
+    PRIMARY KEY (work_key, position)
+);
+CREATE TABLE IF NOT EXISTS authors (
+    key TEXT PRIMARY KEY,
+    name TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS editions (
+    key TEXT PRIMARY KEY,
+    work_key TEXT,
+    page_count INTEGER,
+    isbn TEXT,
+    publisher TEXT,
+    publish_date TEXT,
+    cover_id INTEGER
+);
+CREATE INDEX IF NOT EXISTS ix_editions_work_key ON editions (work_key);
+CREATE TABLE IF NOT EXISTS import_progress (
+    path TEXT PRIMARY KEY,
+    lines_done INTEGER NOT NULL,
+    finished INTEGER NOT NULL DEFAULT 0
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS works_fts USING fts5(
+    title,
+    authors,
+    key UNINDEXED,
+    tokenize = 'unicode61 remove_diacritics 2'
+);
+"""
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+
+def connect(path: str | None = None) -> sqlite3.Connection:
+    """Open the catalog database for importing, creating the schema if needed."""
+    conn = sqlite3.connect(path or CATALOG_PATH)
+    conn.row_factory = sqlite3.Row
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def connect_read_only(path: str | None = None) -> sqlite3.Connection:
+    """Open an existing catalog database for searching, without write access."""
+    uri = f"{Path(path or CATALOG_PATH).resolve().as_uri()}?mode=ro"
+    conn = sqlite3.connect(uri, uri=True)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def is_available(path: str | None = None) -> bool:
+    """Check whether a catalog database exists at the configured path."""
+    return os.path.exists(path or CATALOG_PATH)
+
+
+def build_match_query(query: str) -> str | None:
+    """
+    Turn free text into an FTS5 MATCH expression.
+
+    Every word must match; the last word is treated as a prefix so that
+    typeahead queries like "harry po" still find "Harry Potter".
+    """
+    tokens = _TOKEN.findall(query.casefold())
+    if not tokens:
+        return None
+    terms = [f'"{token}"' for token in tokens]
+    terms[-1] += "*"
+    return " ".join(terms)
+
+
+def search(query: str, limit: int = 10, path: str | None = None) -> list[dict[str, Any]]:
+    """
+    Search the local catalog.
+
+    Args:
+        query: The search query
+        limit: Maximum number of results to return
+        path: Catalog database path (defaults to OPENLIBRARY_CATALOG_PATH)
+
+    Returns:
+        List of book data dictionaries in the same shape as ``search_books``
+    """
+    match = build_match_query(query)
+    if match is None:
+        return []
+
+    conn = connect_read_only(path)
+    try:
+        rows = conn.execute(
+            """
+            SELECT w.*, works_fts.authors AS author_names,
+                   (SELECT e.isbn FROM editions e
+                    WHERE e.work_key = w.key AND e.isbn IS NOT NULL LIMIT 1) AS isbn,
+                   (SELECT e.publisher FROM editions e
+                    WHERE e.work_key = w.key AND e.publisher IS NOT NULL LIMIT 1) AS publisher
+            FROM works_fts
+            JOIN works w ON w.key = works_fts.key
+            WHERE works_fts MATCH ?
+            ORDER BY bm25(works_fts, 10.0, 3.0)
+            LIMIT ?
+            """,
+            (match, limit),
+        ).fetchall()
+    finally:
+        conn.close()
+    return [_row_to_book(row) for row in rows]
+
+
+def _row_to_book(row: sqlite3.Row) -> dict[str, Any]:
+    """Map a catalog row to a book data dictionary."""
+    authors = [name for name in (row["author_names"] or "").split("\n") if name]
+    subjects = json.loads(row["subjects"]) if row["subjects"] else []
+    first_publish_year = None
+    if row["first_publish_date"]:
+        year = re.search(r"\d{4}", row["first_publish_date"])
+        first_publish_year = int(year.group(0)) if year else None
+
+    book = {
+        "title": row["title"],
+        "author": authors[0] if authors else "Unknown Author",
+        "first_publish_year": first_publish_year,
+        "key": row["key"],
+        "cover_id": row["cover_id"],
+        "isbn": row["isbn"],
+        "number_of_pages": row["page_count"],
+        "number_of_pages_median": row["page_count"],
+        "page_count": row["page_count"],
+        "publishers": [row["publisher"]] if row["publisher"] else [],
+        "subjects": subjects,
+        "language": None,
+        "olid": None,
+        "source": "local",
+    }
+    if row["description"]:
+        book["description"] = row["description"]
+    if row["first_publish_date"]:
+        book["publication_date"] = row["first_publish_date"]
+    if book["cover_id"]:
+        book["cover_url"] = f"https://covers.openlibrary.org/b/id/{book['cover_id']}-M.jpg"
+    book["ol_url"] = f"https://openlibrary.org{book['key']}"
+    return book
@@ -0,0 +1,246 @@
+"""Backfill missing page counts, genres and publication dates of existing books.
+
+Books are read in keyset-paged chunks (``id > last_id ORDER BY id``), looked
+up concurrently through ``openlibrary_service`` and written back with one
+batched UPDATE per chunk. After each chunk the last id and the counters are
+saved to a checkpoint file, so an interrupted run resumes where it stopped.
+The saved id never moves past a book whose lookup failed or came back
+incomplete, so the next run looks such books up again.
+
+New and edited books are handled by the enrichment queue (see
+``enrichment``); the backfill is for rows that existed before it.
+"""
+
+import asyncio
+import json
+import logging
+import math
+import os
+import time
+from dataclasses import asdict
+from dataclasses import dataclass
+from typing import Any
+
+import httpx
+from sqlalchemy import func
+from sqlalchemy import or_
+from sqlalchemy import update
+
+from .. import database
+from .. import models
+from . import enrichment
+from . import openlibrary_service
+from .enrichment import IncompleteLookup
+from .rate_limit import INTERACTIVE
+from .rate_limit import RateLimited
+from .rate_limit import RateLimiter
+from .resilience import UpstreamUnavailable
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 200
+CONCURRENCY = 4
+# Books looked up per second by one backfill run
+RATE = 2.0
+# Attempts per book when the shared Open Library limiter turns it away, or
+# turns away the detail lookups so the book's details come back incomplete
+RATE_LIMITED_ATTEMPTS = 5
+RATE_LIMITED_DELAY = 2.0
+
+# Session factory used for reads and writes; tests point it at their own database
+session_factory = database.SessionLocal
+
+
+@dataclass
+class Progress:
+    """Counters of a backfill run, saved in the checkpoint file."""
+
+    last_id: int = 0
+    scanned: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    failed: int = 0
+    upstream_calls: int = 0
+    elapsed: float = 0.0
+
+    def summary(self) -> str:
+        books_per_second = self.scanned / self.elapsed if self.elapsed else 0.0
+        calls_per_book = self.upstream_calls / self.scanned if self.scanned else 0.0
+        return (
+            f"{self.scanned} books scanned, {self.updated} updated, "
+            f"{self.unchanged} unchanged, {self.failed} failed in {self.elapsed:.1f}s "
+            f"({books_per_second:.2f} books/s, {calls_per_book:.2f} upstream calls per book)"
+        )
+
+
+def load_checkpoint(path: str) -> Progress:
+    """Load the progress of an earlier run, or start from the beginning."""
+    try:
+        with open(path) as f:
+            return Progress(**json.load(f))
+    except FileNotFoundError:
+        return Progress()
+
+
+def save_checkpoint(path: str, progress: Progress) -> None:
+    """Write the checkpoint atomically, so a kill never leaves half a file."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(asdict(progress), f)
+    os.replace(tmp_path, path)
+
+
+def fetch_chunk(last_id: int, size: int) -> list[dict[str, Any]]:
+    """Get the next chunk of books missing metadata, ordered by id."""
+    book = models.Book
+    with session_factory() as db:
+        rows = (
+            db.query(
+                book.id, book.title, book.author, book.page_count,
+                book.genres, book.publication_date, book.cover_id,
+            )
+            .filter(
+                book.id > last_id,
+                or_(
+                    book.page_count.is_(None),
+                    book.publication_date.is_(None),
+                    book.genres.is_(None),
+                    func.json_array_length(book.genres) == 0,
+                ),
+            )
+            .order_by(book.id)
+            .limit(size)
+            .all()
+        )
+    return [row._asdict() for row in rows]
+
+
+def write_updates(updates: list[dict[str, Any]], failed_ids: list[int]) -> None:
+    """
+    Write the results of a chunk.
+
+    Updates are applied as batched UPDATEs by primary key. Books whose lookup
+    failed are handed to the enrichment queue, which retries them with backoff;
+    the checkpoint also stays below them (see ``backfill``).
+    """
+    with session_factory() as db:
+        if updates:
+            db.execute(update(models.Book), updates)
+            db.commit()
+        for book in db.query(models.Book).filter(models.Book.id.in_(failed_ids)).all():
+            enrichment.enqueue(db, book)
+
+
+async def lookup(row: dict[str, Any], limiter: RateLimiter) -> dict[str, Any] | None:
+    """
+    Resolve one book, filling only the fields it is missing.
+
+    Returns:
+        The UPDATE parameters for the book (None if there is nothing to write)
+
+    Raises:
+        httpx.HTTPError, UpstreamUnavailable: If the lookup keeps failing or
+            its details keep coming back incomplete
+    """
+    for attempt in range(1, RATE_LIMITED_ATTEMPTS + 1):
+        # INTERACTIVE only makes the run's own limiter queue instead of failing
+        # fast; lookup_metadata itself runs with BACKGROUND priority against
+        # the limit shared with the app
+        async with limiter.slot(INTERACTIVE):
+            try:
+                metadata = await enrichment.lookup_metadata(row["title"], row["author"])
+                break
+            except (RateLimited, IncompleteLookup):
+                if attempt == RATE_LIMITED_ATTEMPTS:
+                    raise
+        await asyncio.sleep(RATE_LIMITED_DELAY * attempt)
+
+    values = {field: value for field, value in metadata.items() if not row.get(field)}
+    return {"id": row["id"], **values} if values else None
+
+
+async def backfill(
+    checkpoint_path: str,
+    chunk_size: int = CHUNK_SIZE,
+    concurrency: int = CONCURRENCY,
+    rate: float = RATE,
+    limit: int | None = None,
+) -> Progress:
+    """
+    Backfill metadata for all books missing some, resuming from the checkpoint.
+
+    The run goes through every book once; the checkpoint only advances up to
+    the first book whose lookup failed, so a later run retries it.
+
+    Args:
+        checkpoint_path: JSON file holding the progress of the run
+        chunk_size: Books read and written per chunk
+        concurrency: Books looked up at the same time
+        rate: Books looked up per second
+        limit: Stop after this many books (the checkpoint allows continuing later)
+
+    Returns:
+        The progress, including earlier runs resumed from the checkpoint
+    """
+    progress = load_checkpoint(checkpoint_path)
+    if progress.last_id:
+        logger.info(f"Resuming after book {progress.last_id}")
+    limiter = RateLimiter(
+        "backfill",
+        ":memory:",
+        rate=rate,
+        burst=concurrency,
+        max_concurrent=concurrency,
+        max_wait=math.inf,
+    )
+    calls_before = openlibrary_service.limiter.stats["acquired"]
+    started = time.monotonic() - progress.elapsed
+    scanned = 0
+    # Where this run reads next; progress.last_id stops at the first failure
+    cursor = progress.last_id
+    held = False
+
+    async def resolve(row: dict[str, Any]) -> dict[str, Any] | None | Exception:
+        try:
+            return await lookup(row, limiter)
+        except (httpx.HTTPError, UpstreamUnavailable) as e:
+            logger.warning(f"Lookup failed for book {row['id']}: {e}")
+            return e
+
+    while limit is None or scanned < limit:
+        size = chunk_size if limit is None else min(chunk_size, limit - scanned)
+        rows = await asyncio.to_thread(fetch_chunk, cursor, size)
+        if not rows:
+            break
+        results = await asyncio.gather(*(resolve(row) for row in rows))
+
+        updates = [result for result in results if isinstance(result, dict)]
+        failed_ids = [
+            row["id"] for row, result in zip(rows, results, strict=True)
+            if isinstance(result, Exception)
+        ]
+        await asyncio.to_thread(write_updates, updates, failed_ids)
+
+        calls = openlibrary_service.limiter.stats["acquired"]
+        cursor = rows[-1]["id"]
+        if failed_ids and not held:
+            held = True
+            done = [row["id"] for row in rows if row["id"] < failed_ids[0]]
+            progress.last_id = done[-1] if done else progress.last_id
+        elif not held:
+            progress.last_id = cursor
+        progress.scanned += len(rows)
+        progress.updated += len(updates)
+        progress.failed += len(failed_ids)
+        progress.unchanged += sum(result is None for result in results)
+        progress.upstream_calls += calls - calls_before
+        progress.elapsed = time.monotonic() - started
+        calls_before = calls
+        save_checkpoint(checkpoint_path, progress)
+        scanned += len(rows)
+        logger.info(f"Backfilled up to book {cursor}: {progress.summary()}")
+
+    if held:
+        logger.info(f"Failed books are looked up again from book {progress.last_id} on the next run")
+    return progress
@@ -0,0 +1,250 @@
+"""
+Persistent cache for Open Library responses, stored in the local database.
+
+The functions here block on the database; async code calls them through
+``asyncio.to_thread`` so the event loop keeps serving requests meanwhile.
+"""
+
+import logging
+import os
+from dataclasses import dataclass
+from datetime import datetime
+from datetime import timedelta
+from typing import Any
+
+from sqlalchemy import delete
+from sqlalchemy import func
+from sqlalchemy import insert
+
+from .. import database
+from .. import models
+
+logger = logging.getLogger(__name__)
+
+# Open Library metadata rarely changes, so entries stay fresh for a long time.
+# Misses (not found, or no page count yet) are retried much sooner.
+CACHE_TTL = timedelta(seconds=int(os.getenv("OPENLIBRARY_CACHE_TTL", str(30 * 24 * 3600))))
+NEGATIVE_CACHE_TTL = timedelta(
+    seconds=int(os.getenv("OPENLIBRARY_NEGATIVE_CACHE_TTL", str(24 * 3600)))
+)
+
+# Session factory used for cache reads and writes; tests point it at their own database
+session_factory = database.SessionLocal
+
+_stats = {
+    "hits": 0,
+    "misses": 0,
+    "stale": 0,
+    "revalidated": 0,
+    "stores": 0,
+    "errors": 0,
+}
+
+
+@dataclass
+class CacheEntry:
+    """A cached Open Library resource."""
+
+    payload: Any
+    found: bool
+    fresh: bool
+    etag: str | None = None
+    last_modified: str | None = None
+
+
+def lookup(resource_id: str) -> CacheEntry | None:
+    """
+    Look up a cached resource.
+
+    Args:
+        resource_id: Cache key, e.g. "works/OL82536W" or "books/OL13522117M"
+
+    Returns:
+        The cache entry (fresh or stale) or None if nothing is cached
+    """
+    try:
+        with session_factory() as db:
+            row = db.get(models.OpenLibraryCacheEntry, resource_id)
+            if row is None:
+                _stats["misses"] += 1
+                return None
+            fresh = row.expires_at > datetime.utcnow()
+            _stats["hits" if fresh else "stale"] += 1
+            return CacheEntry(
+                payload=row.payload,
+                found=row.found,
+                fresh=fresh,
+                etag=row.etag,
+                last_modified=row.last_modified,
+            )
+    except Exception as e:
+        _stats["errors"] += 1
+        logger.warning(f"Open Library cache lookup failed for {resource_id}: {e}")
+        return None
+
+
+def store(
+    resource_id: str,
+    payload: Any,
+    found: bool = True,
+    ttl: timedelta | None = None,
+    etag: str | None = None,
+    last_modified: str | None = None,
+) -> None:
+    """
+    Store a resource in the cache, replacing any previous entry.
+
+    Args:
+        resource_id: Cache key
+        payload: Parsed, JSON-serializable payload (None for not found)
+        found: Whether Open Library had the resource
+        ttl: How long the entry stays fresh (defaults to CACHE_TTL)
+        etag: ETag response header, used for revalidation
+        last_modified: Last-Modified response header, used for revalidation
+    """
+    now = datetime.utcnow()
+    try:
+        with session_factory() as db:
+            row = db.get(models.OpenLibraryCacheEntry, resource_id)
+            if row is None:
+                row = models.OpenLibraryCacheEntry(resource_id=resource_id)
+                db.add(row)
+            row.payload = payload
+            row.found = found
+            row.fetched_at = now
+            row.expires_at = now + (ttl or CACHE_TTL)
+            row.etag = etag
+            row.last_modified = last_modified
+            db.commit()
+            _stats["stores"] += 1
+    except Exception as e:
+        _stats["errors"] += 1
+        logger.warning(f"Open Library cache store failed for {resource_id}: {e}")
+
+
+def lookup_many(resource_ids: list[str]) -> dict[str, CacheEntry]:
+    """
+    Look up several cached resources with one query.
+
+    Args:
+        resource_ids: Cache keys
+
+    Returns:
+        Dictionary mapping each cached key to its entry (fresh or stale);
+        keys with nothing cached are left out
+    """
+    if not resource_ids:
+        return {}
+    now = datetime.utcnow()
+    try:
+        with session_factory() as db:
+            rows = db.query(models.OpenLibraryCacheEntry).filter(
+                models.OpenLibraryCacheEntry.resource_id.in_(resource_ids)
+            )
+            entries = {
+                row.resource_id: CacheEntry(
+                    payload=row.payload,
+                    found=row.found,
+                    fresh=row.expires_at > now,
+                    etag=row.etag,
+                    last_modified=row.last_modified,
+                )
+                for row in rows
+            }
+    except Exception as e:
+        _stats["errors"] += 1
+        logger.warning(f"Open Library cache lookup failed for {len(resource_ids)} keys: {e}")
+        return {}
+    fresh = sum(entry.fresh for entry in entries.values())
+    _stats["hits"] += fresh
+    _stats["stale"] += len(entries) - fresh
+    _stats["misses"] += len(set(resource_ids)) - len(entries)
+    return entries
+
+
+def store_many(entries: list[tuple[str, Any, bool, timedelta | None]]) -> None:
+    """
+    Store several resources in one transaction, replacing previous entries.
+
+    Args:
+        entries: ``(resource_id, payload, found, ttl)`` tuples, with the
+            same meaning as the arguments of ``store``
+    """
+    if not entries:
+        return
+    now = datetime.utcnow()
+    rows = {
+        resource_id: {
+            "resource_id": resource_id,
+            "payload": payload,
+            "found": found,
+            "fetched_at": now,
+            "expires_at": now + (ttl or CACHE_TTL),
+            "etag": None,
+            "last_modified": None,
+        }
+        for resource_id, payload, found, ttl in entries
+    }
+    try:
+        with session_factory() as db:
+            db.execute(
+                delete(models.OpenLibraryCacheEntry).where(
+                    models.OpenLibraryCacheEntry.resource_id.in_(rows)
+                )
+            )
+            db.execute(insert(models.OpenLibraryCacheEntry), list(rows.values()))
+            db.commit()
+            _stats["stores"] += len(rows)
+    except Exception as e:
+        _stats["errors"] += 1
+        logger.warning(f"Open Library cache store failed for {len(rows)} keys: {e}")
+
+
+def touch(resource_id: str, ttl: timedelta | None = None) -> None:
+    """Mark an entry as fresh again after a successful revalidation (304)."""
+    now = datetime.utcnow()
+    try:
+        with session_factory() as db:
+            row = db.get(models.OpenLibraryCacheEntry, resource_id)
+            if row is None:
+                return
+            row.fetched_at = now
+            row.expires_at = now + (ttl or CACHE_TTL)
+            db.commit()
+            _stats["revalidated"] += 1
+    except Exception as e:
+        _stats["errors"] += 1
+        logger.warning(f"Open Library cache touch failed for {resource_id}: {e}")
+
+
+def conditional_headers(entry: CacheEntry | None) -> dict[str, str]:
+    """Build If-None-Match/If-Modified-Since headers for revalidating a stale entry."""
+    headers = {}
+    if entry is None or not entry.found:
+        return headers
+    if entry.etag:
+        headers["If-None-Match"] = entry.etag
+    if entry.last_modified:
+        headers["If-Modified-Since"] = entry.last_modified
+    return headers
+
+
+def get_stats() -> dict[str, Any]:
+    """Get cache counters, plus the number of stored entries."""
+    stats = dict(_stats)
+    lookups = stats["hits"] + stats["misses"] + stats["stale"]
+    stats["hit_ratio"] = round(stats["hits"] / lookups, 3) if lookups else 0.0
+    try:
+        with session_factory() as db:
+            stats["entries"] = (
+                db.query(func.count(models.OpenLibraryCacheEntry.resource_id)).scalar() or 0
+            )
+    except Exception:
+        stats["entries"] = 0
+    return stats
+
+
+def reset_stats() -> None:
+    """Reset the cache counters."""
+    for key in _stats:
+        _stats[key] = 0
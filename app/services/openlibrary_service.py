@@ -1,126 +1,736 @@
 """Service for interacting with the Open Library API."""
 
+import asyncio
+import logging
+import os
+import re
+import sqlite3
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from datetime import timedelta
 from typing import Any
 
 import httpx
+import ijson
 
+from . import edition_resolver
+from . import local_catalog
+from . import openlibrary_cache
+from .providers import HedgedSearch
+from .providers import LocalCatalogProvider
+from .providers import MetadataProvider
+from .providers import ProviderResult
+from .rate_limit import RateLimiter
+from .resilience import CircuitBreaker
+from .resilience import Deadline
+from .resilience import DeadlineExceeded
+from .resilience import UpstreamUnavailable
+from .singleflight import SingleFlight
 
-async def search_books(query: str, limit: int = 10, fetch_details: bool = False) -> list[dict[str, Any]]:
+logger = logging.getLogger(__name__)
+
+# Point at a stand-in server (e.g. tests/fake_openlibrary.py) to work offline
+OPENLIBRARY_URL = os.getenv("OPENLIBRARY_BASE_URL", "https://openlibrary.org").rstrip("/")
+
+# Connection pool settings for the shared client. Keep-alive connections are
+# reused across requests, so the TCP/TLS handshake and the DNS lookup for
+# openlibrary.org only happen when the pool has to open a new connection.
+MAX_CONNECTIONS = int(os.getenv("OPENLIBRARY_MAX_CONNECTIONS", "20"))
+MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("OPENLIBRARY_MAX_KEEPALIVE_CONNECTIONS", "10"))
+KEEPALIVE_EXPIRY = float(os.getenv("OPENLIBRARY_KEEPALIVE_EXPIRY", "120"))
+CONNECT_TIMEOUT = float(os.getenv("OPENLIBRARY_CONNECT_TIMEOUT", "5"))
+READ_TIMEOUT = float(os.getenv("OPENLIBRARY_READ_TIMEOUT", "15"))
+HTTP2_ENABLED = os.getenv("OPENLIBRARY_HTTP2", "false").lower() == "true"
+
+# Fan-out settings for search_books(fetch_details=True)
+ENRICH_CONCURRENCY = int(os.getenv("OPENLIBRARY_ENRICH_CONCURRENCY", "5"))
+ENRICH_BUDGET = float(os.getenv("OPENLIBRARY_ENRICH_BUDGET", "10"))
+
+# Fields of a search.json doc used by doc_to_book and the edition resolver.
+# Everything else (all ISBNs, ids on other sites, ...) is left on the server.
+SEARCH_FIELDS = ",".join([
+    "key",
+    "title",
+    "author_name",
+    "first_publish_year",
+    "cover_i",
+    "cover_edition_key",
+    "edition_key",
+    "isbn",
+    "number_of_pages_median",
+    "publisher",
+    "subject",
+    "language",
+])
+
+# List fields of a search doc are cut to this length once parsed
+SEARCH_LIST_LIMIT = 10
+
+# Edition ids sent per api/books request, and editions scored per work when
+# none of a result's candidate editions has a page count
+BIBKEYS_PER_REQUEST = 50
+EDITIONS_PAGE_SIZE = 50
+
+# Seconds a caller waits on a request another caller already started
+SINGLEFLIGHT_TIMEOUT = float(os.getenv("OPENLIBRARY_SINGLEFLIGHT_TIMEOUT", "30"))
+
+# Time allowed for answering one search, shared by every upstream call it makes
+SEARCH_DEADLINE = float(os.getenv("OPENLIBRARY_SEARCH_DEADLINE", "8"))
+
+# Consecutive failures before Open Library calls fail fast, and for how long
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("OPENLIBRARY_BREAKER_FAILURES", "5"))
+BREAKER_RESET_TIMEOUT = float(os.getenv("OPENLIBRARY_BREAKER_RESET_TIMEOUT", "30"))
+
+# Outbound rate limit, shared by all workers using the same limiter database
+# (":memory:" limits each process on its own). OPENLIBRARY_RATE_LIMIT=0 only
+# limits concurrency.
+RATE_LIMIT = float(os.getenv("OPENLIBRARY_RATE_LIMIT", "5"))
+RATE_LIMIT_BURST = int(os.getenv("OPENLIBRARY_RATE_LIMIT_BURST", "10"))
+MAX_CONCURRENT_REQUESTS = int(os.getenv("OPENLIBRARY_MAX_CONCURRENT_REQUESTS", "8"))
+BACKGROUND_RESERVE = float(os.getenv("OPENLIBRARY_BACKGROUND_RESERVE", "0.5"))
+RATE_LIMIT_PATH = os.getenv(
+    "OPENLIBRARY_RATE_LIMIT_PATH", os.path.join(local_catalog.data_dir, "openlibrary_ratelimit.db")
+)
+
+# Searches still unanswered after this percentile of Open Library's recent
+# search latencies are also sent to the local catalog, if there is one
+HEDGE_PERCENTILE = float(os.getenv("OPENLIBRARY_HEDGE_PERCENTILE", "90"))
+HEDGE_MIN_DELAY = float(os.getenv("OPENLIBRARY_HEDGE_MIN_DELAY", "0.2"))
+HEDGE_DEFAULT_DELAY = float(os.getenv("OPENLIBRARY_HEDGE_DEFAULT_DELAY", "1.0"))
+
+# ISBN batches (of BIBKEYS_PER_REQUEST) requested at the same time, and the
+# time allowed for resolving one ISBN import
+ISBN_CONCURRENCY = int(os.getenv("OPENLIBRARY_ISBN_CONCURRENCY", "4"))
+ISBN_IMPORT_DEADLINE = float(os.getenv("OPENLIBRARY_ISBN_IMPORT_DEADLINE", "60"))
+
+# Identical work/edition lookups that are running right now
+in_flight = SingleFlight()
+
+breaker = CircuitBreaker(
+    "openlibrary",
+    failure_threshold=BREAKER_FAILURE_THRESHOLD,
+    reset_timeout=BREAKER_RESET_TIMEOUT,
+)
+
+limiter = RateLimiter(
+    "openlibrary",
+    RATE_LIMIT_PATH,
+    rate=RATE_LIMIT,
+    burst=RATE_LIMIT_BURST,
+    max_concurrent=MAX_CONCURRENT_REQUESTS,
+    background_reserve=BACKGROUND_RESERVE,
+    lease_ttl=CONNECT_TIMEOUT + READ_TIMEOUT,
+)
+
+_client: httpx.AsyncClient | None = None
+
+
+def _http2_available() -> bool:
+    """Check whether the optional h2 package needed for HTTP/2 is installed."""
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def create_client(transport: httpx.AsyncBaseTransport | None = None) -> httpx.AsyncClient:
+    """
+    Create an HTTP client configured for talking to Open Library.
+
+    Args:
+        transport: Optional transport override (used by tests)
+
+    Returns:
+        A new pooled AsyncClient
+    """
+    http2 = HTTP2_ENABLED and _http2_available()
+    if HTTP2_ENABLED and not http2:
+        logger.warning("OPENLIBRARY_HTTP2 is set but h2 is not installed, using HTTP/1.1")
+
+    return httpx.AsyncClient(
+        http2=http2,
+        transport=transport,
+        limits=httpx.Limits(
+            max_connections=MAX_CONNECTIONS,
+            max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=KEEPALIVE_EXPIRY,
+        ),
+        timeout=httpx.Timeout(READ_TIMEOUT, connect=CONNECT_TIMEOUT),
+        headers={"User-Agent": "greatReads/0.1 (book tracker)"},
+    )
+
+
+async def open_client(transport: httpx.AsyncBaseTransport | None = None) -> httpx.AsyncClient:
+    """Create the shared client. Called from the application lifespan."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = create_client(transport)
+    return _client
+
+
+async def close_client() -> None:
+    """Close the shared client and release its pooled connections."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def get_client() -> httpx.AsyncClient:
+    """
+    Get the shared Open Library client.
+
+    The client is normally created by the application lifespan; outside of it
+    (scripts, tests) it is created lazily on first use.
+    """
+    global _client
+    if _client is None or _client.is_closed:
+        _client = create_client()
+    return _client
+
+
+@asynccontextmanager
+async def _upstream(
+    deadline: Deadline | None = None,
+    circuit: CircuitBreaker | None = None,
+    rate_limiter: RateLimiter | None = None,
+) -> AsyncIterator[None]:
+    """
+    Guard one Open Library call with the circuit breaker, the rate limiter
+    and the deadline.
+
+    Transport errors and timeouts count as breaker failures; the block has to
+    report the response status itself with ``_record_status``. The call waits
+    for the rate limiter with the priority in ``rate_limit.current_priority``.
+    ``circuit`` and ``rate_limiter`` default to ``breaker`` and ``limiter``,
+    which guard the API; other Open Library hosts bring their own.
+
+    Raises:
+        CircuitOpenError: If the breaker is open
+        RateLimited: If the call cannot get through the rate limiter
+        DeadlineExceeded: If the deadline has passed or runs out during the call
+    """
+    circuit = circuit or breaker
+    rate_limiter = rate_limiter or limiter
+    if deadline:
+        deadline.timeout()
+    circuit.before_call()
+    async with rate_limiter.slot(deadline=deadline):
+        timeout = deadline.timeout(READ_TIMEOUT) if deadline else None
+        try:
+            async with asyncio.timeout(timeout):
+                yield
+        except TimeoutError as e:
+            circuit.record_failure(timeout=True)
+            raise DeadlineExceeded("Open Library call ran out of time") from e
+        except httpx.TimeoutException:
+            circuit.record_failure(timeout=True)
+            raise
+        except httpx.TransportError:
+            circuit.record_failure()
+            raise
+
+
+def _record_status(response: httpx.Response, circuit: CircuitBreaker | None = None) -> None:
+    """Count server errors and throttling as breaker failures."""
+    circuit = circuit or breaker
+    if _is_upstream_error(response):
+        circuit.record_failure()
+    else:
+        circuit.record_success()
+
+
+def _is_upstream_error(response: httpx.Response) -> bool:
+    """Whether a response is a server error or throttling rather than an answer."""
+    return response.status_code >= 500 or response.status_code == 429
+
+
+async def guarded_get(
+    url: str,
+    deadline: Deadline | None = None,
+    circuit: CircuitBreaker | None = None,
+    rate_limiter: RateLimiter | None = None,
+    **kwargs: Any,
+) -> httpx.Response:
+    """GET an Open Library URL through ``_upstream``."""
+    async with _upstream(deadline, circuit, rate_limiter):
+        response = await get_client().get(url, **kwargs)
+        _record_status(response, circuit)
+    return response
+
+
+def _wait_timeout(deadline: Deadline | None) -> float:
+    """How long to wait on a request another caller already started."""
+    if deadline is None:
+        return SINGLEFLIGHT_TIMEOUT
+    return min(SINGLEFLIGHT_TIMEOUT, deadline.timeout())
+
+
+async def search_books(
+    query: str,
+    limit: int = 10,
+    fetch_details: bool = False,
+    concurrency: int | None = None,
+    budget: float | None = None,
+    deadline: Deadline | None = None,
+) -> list[dict[str, Any]]:
     """
     Search for books using the Open Library API.
 
+    When Open Library is slow, the search is hedged with the local catalog
+    (see ``search_providers``); when it fails, times out or its circuit
+    breaker is open, the local catalog is searched instead if there is one.
+
     Args:
         query: The search query
         limit: Maximum number of results to return
         fetch_details: Whether to fetch detailed information for each book
+        concurrency: Maximum number of results enriched at the same time
+        budget: Total time in seconds allowed for fetching details
+        deadline: Time by which the whole search has to finish
+            (``SEARCH_DEADLINE`` from now if not given)
 
     Returns:
         List of book data dictionaries
+
+    Raises:
+        UpstreamUnavailable: If Open Library is unavailable and there is no
+            local catalog to fall back to
     """
     print(f"DEBUG: Searching for '{query}' with fetch_details={fetch_details}")
-    url = f"https://openlibrary.org/search.json?q={query}&limit={limit}"
-    async with httpx.AsyncClient() as client:
-        response = await client.get(url)
-        response.raise_for_status()
-        data = response.json()
-    books = []
-    for doc in data.get("docs", []):
-        # Extract relevant book information
-        book = {
-            "title": doc.get("title", "Unknown Title"),
-            "author": (doc.get("author_name", ["Unknown Author"])[0]
-                     if doc.get("author_name") else "Unknown Author"),
-            "first_publish_year": doc.get("first_publish_year"),
-            "key": doc.get("key"),  # Open Library ID
-            "cover_id": doc.get("cover_i"),
-            "isbn": get_first_item(doc.get("isbn", [])),
-            "number_of_pages": doc.get("number_of_pages") or doc.get("number_of_pages_median"),
-            "number_of_pages_median": doc.get("number_of_pages_median"),
-            "page_count": doc.get("number_of_pages") or doc.get("number_of_pages_median"),  # Additional field for compatibility
-            "publishers": doc.get("publisher", []),
-            "subjects": doc.get("subject", [])[:5] if doc.get("subject") else [],
-            "language": get_first_item(doc.get("language", [])),
-            "olid": get_first_item(doc.get("edition_key", [])),
-        }
-        # Add cover image URL if available
-        if book["cover_id"]:
-            book["cover_url"] = f"https://covers.openlibrary.org/b/id/{book['cover_id']}-M.jpg"
-        elif book["isbn"]:
-            book["cover_url"] = f"https://covers.openlibrary.org/b/isbn/{book['isbn']}-M.jpg"
-        elif book["olid"]:
-            book["cover_url"] = f"https://covers.openlibrary.org/b/olid/{book['olid']}-M.jpg"
-        # Add Open Library URL
-        if book["key"]:
-            book["ol_url"] = f"https://openlibrary.org{book['key']}"
-            
-        # Fetch detailed information if requested
-        if fetch_details:
-            try:
-                # Initialize variables
-                details = None
-                details_found = False
-                
-                # First try to get details from the cover edition if available
-                if "cover_edition_key" in doc and doc["cover_edition_key"]:
-                    cover_edition_id = f"books/{doc['cover_edition_key']}"
-                    print(f"DEBUG: Fetching details for cover edition {cover_edition_id}")
-                    details = await get_book_details(cover_edition_id)
-                    if details and (details.get("number_of_pages") or details.get("page_count")):
-                        # Update book with additional details
-                        book.update(details)
-                        print(f"DEBUG: Found page count in cover edition: {details.get('number_of_pages') or details.get('page_count')}")
-                        # We found what we need, no need to check other editions
-                        details_found = True
-                
-                # Then try other editions if no page count found yet
-                if not details_found and "edition_key" in doc and doc["edition_key"]:
-                    # Try up to 3 editions to find page count
-                    for edition_key in doc["edition_key"][:3]:  # Limit to first 3 editions
-                        edition_id = f"books/{edition_key}"
-                        print(f"DEBUG: Fetching details for edition {edition_id}")
-                        details = await get_book_details(edition_id)
-                        if details and (details.get("number_of_pages") or details.get("page_count")):
-                            # Update book with additional details
-                            book.update(details)
-                            print(f"DEBUG: Found page count in edition {edition_id}: {details.get('number_of_pages') or details.get('page_count')}")
-                            details_found = True
-                            break  # Stop once we find an edition with page count
-                
-                # Fallback to work details if no page count found yet
-                if book["key"] and not details_found:
-                    work_id = book["key"]
-                    print(f"DEBUG: Fetching details for work {work_id}")
-                    work_details = await get_book_details(work_id)
-                    if work_details:
-                        # Only update fields that aren't already set
-                        for key, value in work_details.items():
-                            if key not in book or not book[key]:
-                                book[key] = value
-                        
-                        # Check if we got page count from work details
-                        if work_details.get("number_of_pages") and not book.get("number_of_pages"):
-                            book["number_of_pages"] = work_details["number_of_pages"]
-                            book["page_count"] = work_details["number_of_pages"]
-                            print(f"DEBUG: Set page count from work details: {work_details['number_of_pages']}")
-                            details_found = True
-            except Exception as e:
-                print(f"Error fetching details: {e}")
-                
-        books.append(book)
+    local_books = await search_local_catalog(query, limit)
+    if local_books is not None:
+        # Catalog results already carry page counts and subjects
+        return local_books
+
+    deadline = deadline or Deadline(SEARCH_DEADLINE)
+    try:
+        result = await search_providers.search(query, limit, deadline=deadline)
+    except (httpx.HTTPError, UpstreamUnavailable) as e:
+        logger.warning(f"Open Library search failed: {e}")
+        local_books = await search_local_catalog(query, limit, fallback=True)
+        if local_books is not None:
+            return local_books
+        raise
+    books = result.books
+
+    # Fetch detailed information if requested (other providers' results
+    # already carry their details)
+    if fetch_details and result.docs is not None:
+        books = await enrich_books(
+            books, result.docs, concurrency=concurrency, budget=budget, deadline=deadline
+        )
     return books
 
 
+async def stream_search_books(
+    query: str,
+    limit: int = 10,
+    concurrency: int | None = None,
+    budget: float | None = None,
+    deadline: Deadline | None = None,
+) -> AsyncIterator[dict[str, Any]]:
+    """
+    Search for books and stream the enrichment as it arrives.
+
+    Yields a ``results`` event with the plain search hits first, then one
+    ``patch`` event per hit (with only the fields that changed) as soon as its
+    details resolve, and finally a ``done`` event. Hits that are not enriched
+    within the budget get no patch.
+
+    Args:
+        query: The search query
+        limit: Maximum number of results to return
+        concurrency: Maximum number of results enriched at the same time
+        budget: Total time in seconds allowed for fetching details
+        deadline: Time by which the whole search has to finish
+
+    Yields:
+        Event dictionaries with a ``type`` key
+    """
+    local_books = await search_local_catalog(query, limit)
+    if local_books is not None:
+        yield {"type": "results", "results": local_books}
+        yield {"type": "done"}
+        return
+
+    deadline = deadline or Deadline(SEARCH_DEADLINE)
+    try:
+        result = await search_providers.search(query, limit, deadline=deadline)
+    except (httpx.HTTPError, UpstreamUnavailable) as e:
+        logger.warning(f"Open Library search failed: {e}")
+        local_books = await search_local_catalog(query, limit, fallback=True)
+        if local_books is None:
+            raise
+        yield {"type": "results", "results": local_books}
+        yield {"type": "done"}
+        return
+    books = result.books
+    yield {"type": "results", "results": books}
+    if result.docs is None:
+        yield {"type": "done"}
+        return
+
+    async for index, enriched in iter_enriched(
+        books, result.docs, concurrency=concurrency, budget=budget, deadline=deadline
+    ):
+        patch = {
+            key: value for key, value in enriched.items()
+            if books[index].get(key) != value
+        }
+        if patch:
+            yield {"type": "patch", "index": index, "data": patch}
+    yield {"type": "done"}
+
+
+async def search_local_catalog(
+    query: str, limit: int = 10, fallback: bool = False
+) -> list[dict[str, Any]] | None:
+    """
+    Search the offline catalog when OPENLIBRARY_SEARCH_MODE allows it.
+
+    Args:
+        query: The search query
+        limit: Maximum number of results to return
+        fallback: Open Library is unavailable, so use the catalog whatever
+            the search mode is
+
+    Returns:
+        The local results, or None when the caller should ask Open Library
+    """
+    mode = "local_only" if fallback else local_catalog.SEARCH_MODE
+    if mode == "remote" or not local_catalog.is_available():
+        return None
+    try:
+        books = await asyncio.to_thread(local_catalog.search, query, limit)
+    except sqlite3.Error as e:
+        logger.warning(f"Local catalog search failed: {e}")
+        books = []
+    if books or mode == "local_only":
+        return books
+    return None
+
+
+async def fetch_search_docs(
+    query: str, limit: int = 10, deadline: Deadline | None = None
+) -> list[dict[str, Any]]:
+    """
+    Run a search against Open Library and return the raw result documents.
+
+    Only ``SEARCH_FIELDS`` are requested, and the response is parsed as it
+    streams in (see ``parse_search_docs``).
+
+    Args:
+        query: The search query
+        limit: Maximum number of results to return
+        deadline: Time by which the response has to be read
+
+    Returns:
+        List of search documents
+    """
+    params = {"q": query, "limit": limit, "fields": SEARCH_FIELDS}
+    async with _upstream(deadline):
+        async with get_client().stream(
+            "GET", f"{OPENLIBRARY_URL}/search.json", params=params
+        ) as response:
+            _record_status(response)
+            response.raise_for_status()
+            return await parse_search_docs(response.aiter_bytes())
+
+
+class OpenLibraryProvider(MetadataProvider):
+    """Open Library's search API, the primary metadata provider."""
+
+    name = "openlibrary"
+
+    async def search(
+        self, query: str, limit: int, deadline: Deadline | None = None
+    ) -> ProviderResult:
+        docs = await fetch_search_docs(query, limit, deadline=deadline)
+        return ProviderResult(self.name, [doc_to_book(doc) for doc in docs], docs)
+
+
+search_providers = HedgedSearch(
+    OpenLibraryProvider(),
+    LocalCatalogProvider(),
+    percentile=HEDGE_PERCENTILE,
+    min_delay=HEDGE_MIN_DELAY,
+    default_delay=HEDGE_DEFAULT_DELAY,
+)
+
+
+async def parse_search_docs(chunks: AsyncIterator[bytes]) -> list[dict[str, Any]]:
+    """
+    Parse the docs of a search.json response body.
+
+    The docs are decoded one at a time with ijson while the body is still
+    arriving and trimmed right away, so only one full doc is held in memory
+    at once.
+
+    Args:
+        chunks: The response body as an async iterator of byte chunks
+
+    Returns:
+        List of search documents with list fields cut to ``SEARCH_LIST_LIMIT``
+    """
+    docs = ijson.items(_ChunkReader(chunks), "docs.item", use_float=True)
+    return [_trim_doc(doc) async for doc in docs]
+
+
+def _trim_doc(doc: dict[str, Any]) -> dict[str, Any]:
+    """Cut the list fields of a search doc to the entries that are ever used."""
+    return {
+        key: value[:SEARCH_LIST_LIMIT] if isinstance(value, list) else value
+        for key, value in doc.items()
+    }
+
+
+class _ChunkReader:
+    """Async file-like wrapper over a byte chunk iterator, as ijson expects."""
+
+    def __init__(self, chunks: AsyncIterator[bytes]):
+        self._chunks = aiter(chunks)
+
+    async def read(self, size: int = -1) -> bytes:
+        # ijson probes the stream type with read(0); otherwise chunks are
+        # handed over whole, it only needs "empty means EOF"
+        if size == 0:
+            return b""
+        return await anext(self._chunks, b"")
+
+
+def doc_to_book(doc: dict[str, Any]) -> dict[str, Any]:
+    """Map an Open Library search document to a book data dictionary."""
+    # Extract relevant book information
+    book = {
+        "title": doc.get("title", "Unknown Title"),
+        "author": (doc.get("author_name", ["Unknown Author"])[0]
+                 if doc.get("author_name") else "Unknown Author"),
+        "first_publish_year": doc.get("first_publish_year"),
+        "key": doc.get("key"),  # Open Library ID
+        "cover_id": doc.get("cover_i"),
+        "isbn": get_first_item(doc.get("isbn", [])),
+        "number_of_pages": doc.get("number_of_pages") or doc.get("number_of_pages_median"),
+        "number_of_pages_median": doc.get("number_of_pages_median"),
+        "page_count": doc.get("number_of_pages") or doc.get("number_of_pages_median"),  # Additional field for compatibility
+        "publishers": doc.get("publisher", []),
+        "subjects": doc.get("subject", [])[:5] if doc.get("subject") else [],
+        "language": get_first_item(doc.get("language", [])),
+        "olid": get_first_item(doc.get("edition_key", [])),
+    }
+    # Add cover image URL if available
+    if book["cover_id"]:
+        book["cover_url"] = f"https://covers.openlibrary.org/b/id/{book['cover_id']}-M.jpg"
+    elif book["isbn"]:
+        book["cover_url"] = f"https://covers.openlibrary.org/b/isbn/{book['isbn']}-M.jpg"
+    elif book["olid"]:
+        book["cover_url"] = f"https://covers.openlibrary.org/b/olid/{book['olid']}-M.jpg"
+    # Add Open Library URL
+    if book["key"]:
+        book["ol_url"] = f"{OPENLIBRARY_URL}{book['key']}"
+    return book
+
+
+class PartialResults(list):
+    """Search results some of which could not be enriched, in time or at all."""
+
+
+async def enrich_books(
+    books: list[dict[str, Any]],
+    docs: list[dict[str, Any]],
+    concurrency: int | None = None,
+    budget: float | None = None,
+    deadline: Deadline | None = None,
+) -> list[dict[str, Any]]:
+    """
+    Enrich search results concurrently.
+
+    At most ``concurrency`` results are enriched at once, and enrichment stops
+    after ``budget`` seconds. Results keep their original order; any result that
+    was not enriched in time, or whose lookup failed, is returned unchanged,
+    and the list is then a ``PartialResults`` so caches can tell it apart.
+
+    Args:
+        books: Book dictionaries built from the search documents
+        docs: The raw search documents, in the same order as ``books``
+        concurrency: Maximum number of results enriched at the same time
+        budget: Total time in seconds allowed for enrichment
+        deadline: Request deadline; enrichment also stops when it passes
+
+    Returns:
+        List of book data dictionaries in the original order
+    """
+    results = list(books)
+    async for index, enriched in iter_enriched(
+        books, docs, concurrency=concurrency, budget=budget, deadline=deadline
+    ):
+        results[index] = enriched
+    unenriched = sum(result is book for result, book in zip(results, books, strict=True))
+    if unenriched:
+        logger.info(f"{unenriched} results left unenriched")
+        return PartialResults(results)
+    return results
+
+
+async def iter_enriched(
+    books: list[dict[str, Any]],
+    docs: list[dict[str, Any]],
+    concurrency: int | None = None,
+    budget: float | None = None,
+    deadline: Deadline | None = None,
+) -> AsyncIterator[tuple[int, dict[str, Any]]]:
+    """
+    Resolve page counts and subjects for search results, yielding each as it resolves.
+
+    The candidate editions of all results are fetched together in one batched
+    lookup and the best edition per result is picked by
+    ``edition_resolver.pick_best``. Results with no usable candidate fall back
+    to one page of their work's editions, and then to the work itself; those
+    run concurrently, at most ``concurrency`` at a time. Nothing is yielded
+    for results not resolved within ``budget`` seconds or by ``deadline``, or
+    whose lookup failed.
+
+    Args:
+        books: Book dictionaries built from the search documents
+        docs: The raw search documents, in the same order as ``books``
+        concurrency: Maximum number of works looked up at the same time
+        budget: Total time in seconds allowed for enrichment
+        deadline: Request deadline the budget is capped at
+
+    Yields:
+        (index, enriched book) tuples in completion order
+    """
+    if not books:
+        return
+    budget = budget or ENRICH_BUDGET
+    deadline = deadline.within(budget) if deadline else Deadline(budget)
+
+    candidates = [edition_resolver.candidate_keys(doc) for doc in docs]
+    keys = list(dict.fromkeys(key for doc_keys in candidates for key in doc_keys))
+    editions: dict[str, dict[str, Any]] = {}
+    if keys:
+        try:
+            editions = await get_editions_by_keys(keys, deadline=deadline)
+        except DeadlineExceeded:
+            logger.info("Enrichment budget exhausted during batched edition lookup")
+            return
+        except (httpx.HTTPError, UpstreamUnavailable) as e:
+            logger.warning(f"Batched edition lookup failed: {e}")
+
+    unresolved = []
+    for index, (book, doc, doc_keys) in enumerate(zip(books, docs, candidates, strict=True)):
+        best = edition_resolver.pick_best(
+            [editions[key] for key in doc_keys if key in editions],
+            doc.get("cover_edition_key"),
+        )
+        if best:
+            yield index, {**book, **edition_resolver.edition_details(best)}
+        else:
+            unresolved.append(index)
+    if not unresolved:
+        return
+
+    semaphore = asyncio.Semaphore(concurrency or ENRICH_CONCURRENCY)
+
+    async def enrich_with_limit(index: int) -> dict[str, Any]:
+        async with semaphore:
+            return await enrich_from_work(books[index], deadline=deadline)
+
+    tasks = {asyncio.create_task(enrich_with_limit(index)): index for index in unresolved}
+    pending = set(tasks)
+    try:
+        while pending:
+            done, pending = await asyncio.wait(
+                pending,
+                timeout=deadline.remaining(),
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            if not done:
+                logger.info(f"Enrichment budget exhausted, {len(pending)} works not looked up")
+                break
+            for task in done:
+                if task.cancelled():
+                    continue
+                error = task.exception()
+                if error is not None:
+                    # Upstream failures were logged by enrich_from_work; either
+                    # way the result stays unenriched
+                    if not isinstance(error, (httpx.HTTPError, UpstreamUnavailable)):
+                        logger.error("Enrichment failed", exc_info=error)
+                    continue
+                yield tasks[task], task.result()
+    finally:
+        # Stop any enrichment still running once the budget is spent or the
+        # consumer goes away
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+
+async def enrich_from_work(book: dict[str, Any], deadline: Deadline | None = None) -> dict[str, Any]:
+    """
+    Fetch page count, subjects and description for a result from its work.
+
+    Used when none of the result's candidate editions had a page count: one
+    larger page of the work's editions is scored, and if that finds nothing
+    the work's own details fill in whatever the result is missing.
+
+    Args:
+        book: Book dictionary built from the search document
+        deadline: Time by which the lookups have to finish
+
+    Returns:
+        A new book dictionary with the details merged in
+
+    Raises:
+        httpx.HTTPError, UpstreamUnavailable: If the work could not be looked
+            up; callers leave the result unenriched
+    """
+    book = dict(book)
+    if not book.get("key"):
+        return book
+    try:
+        editions = await get_editions(
+            f"{book['key']}/editions", limit=EDITIONS_PAGE_SIZE, deadline=deadline
+        )
+        best = edition_resolver.pick_best((editions or {}).get("entries") or [])
+        if best:
+            book.update(edition_resolver.edition_details(best))
+            return book
+
+        logger.debug(f"Fetching details for work {book['key']}")
+        work_details = await get_book_details(book["key"], deadline=deadline)
+    except (httpx.HTTPError, UpstreamUnavailable) as e:
+        logger.warning(f"Error fetching details for {book['key']}: {e!r}")
+        raise
+    if work_details:
+        # Only update fields that aren't already set
+        for key, value in work_details.items():
+            if key not in book or not book[key]:
+                book[key] = value
+    return book
+
+
 def get_first_item(items: list[Any]) -> Any | None:
     """Get the first item from a list if it exists."""
     return items[0] if items else None
 
 
-async def get_book_details(resource_id: str) -> dict[str, Any] | None:
+async def get_book_details(
+    resource_id: str, deadline: Deadline | None = None
+) -> dict[str, Any] | None:
     """
     Get detailed information for a book from the Open Library API.
     
+    Concurrent calls for the same resource share a single upstream request.
+    If Open Library cannot be reached in time, an expired cache entry is
+    served rather than nothing.
+
     Args:
         resource_id: The Open Library resource ID (e.g., "works/OL82536W" or "books/OL13522117M")
+        deadline: Time by which the lookup has to finish
         
     Returns:
         Dictionary with detailed book information or None if not found
@@ -128,215 +738,574 @@ async def get_book_details(resource_id: str) -> dict[str, Any] | None:
     # Remove leading slash if present
     if resource_id.startswith("/"):
         resource_id = resource_id[1:]
-    
+
+    return await in_flight.do(
+        ("details", resource_id),
+        lambda: _fetch_book_details(resource_id, deadline),
+        timeout=_wait_timeout(deadline),
+    )
+
+
+async def _fetch_book_details(
+    resource_id: str, deadline: Deadline | None = None
+) -> dict[str, Any] | None:
+    """Fetch and parse a work or edition, going through the persistent cache."""
+    # Serve from the persistent cache when the entry is still fresh
+    cached = await asyncio.to_thread(openlibrary_cache.lookup, resource_id)
+    if cached and cached.fresh:
+        return cached.payload if cached.found else None
+
     is_book_edition = "books/" in resource_id
-    url = f"https://openlibrary.org/{resource_id}.json"
+    url = f"{OPENLIBRARY_URL}/{resource_id}.json"
     print(f"DEBUG: Fetching details from {url}")
+
+    try:
+        response = await guarded_get(
+            url, deadline, headers=openlibrary_cache.conditional_headers(cached)
+        )
+    except (httpx.HTTPError, UpstreamUnavailable):
+        if cached:
+            # Better stale than nothing while Open Library is unavailable
+            return cached.payload if cached.found else None
+        raise
+    if response.status_code == 304 and cached:
+        # Unchanged upstream, keep serving what we have
+        await asyncio.to_thread(
+            openlibrary_cache.touch, resource_id, _details_ttl(cached.payload)
+        )
+        return cached.payload
+    if response.status_code == 404:
+        await asyncio.to_thread(
+            openlibrary_cache.store,
+            resource_id, None, found=False, ttl=openlibrary_cache.NEGATIVE_CACHE_TTL
+        )
+        return None
+    if _is_upstream_error(response):
+        if cached:
+            return cached.payload if cached.found else None
+        raise UpstreamUnavailable(
+            f"Open Library answered {response.status_code} for {resource_id}"
+        )
+    if response.status_code != 200:
+        return None
+
+    details = await extract_details(response.json(), is_book_edition, deadline)
+    await asyncio.to_thread(
+        openlibrary_cache.store,
+        resource_id,
+        details,
+        ttl=_details_ttl(details),
+        etag=response.headers.get("etag"),
+        last_modified=response.headers.get("last-modified"),
+    )
+    return details
+
+
+def _details_ttl(details: dict[str, Any] | None) -> timedelta:
+    """Details without a page count are cached for a shorter time."""
+    if details and details.get("page_count"):
+        return openlibrary_cache.CACHE_TTL
+    return openlibrary_cache.NEGATIVE_CACHE_TTL
+
+
+async def extract_details(
+    data: dict[str, Any], is_book_edition: bool, deadline: Deadline | None = None
+) -> dict[str, Any]:
+    """
+    Extract subjects, description, publication date and page count from a
+    work or edition document.
+
+    Args:
+        data: The parsed work or edition JSON
+        is_book_edition: Whether the document is an edition (books/...) rather than a work
+        deadline: Time by which the editions of a work have to be fetched
+
+    Returns:
+        Dictionary with detailed book information
+    """
+    # Extract relevant details
+    details = {}
     
-    async with httpx.AsyncClient() as client:
-        response = await client.get(url)
-        if response.status_code != 200:
-            return None
-            
-        data = response.json()
+    # Get subjects (genres) - collect from multiple fields for better coverage
+    subjects = []
+    # Main subjects list
+    if "subjects" in data:
+        subjects.extend(data.get("subjects", []))
         
-        # Extract relevant details
-        details = {}
+    # Subject places
+    if "subject_places" in data:
+        subjects.extend(data.get("subject_places", []))
         
-        # Get subjects (genres) - collect from multiple fields for better coverage
-        subjects = []
-        # Main subjects list
-        if "subjects" in data:
-            subjects.extend(data.get("subjects", []))
-            
-        # Subject places
-        if "subject_places" in data:
-            subjects.extend(data.get("subject_places", []))
-            
-        # Subject times
-        if "subject_times" in data:
-            subjects.extend(data.get("subject_times", []))
-            
-        # Subject people
-        if "subject_people" in data:
-            subjects.extend(data.get("subject_people", []))
-            
-        # Remove duplicates and store
-        if subjects:
-            details["subjects"] = list(dict.fromkeys(subjects))
-            
-        # Get description
-        description = data.get("description", {})
-        if isinstance(description, dict):
-            details["description"] = description.get("value", "")
-        elif isinstance(description, str):
-            details["description"] = description
-            
-        # Get publication date from first_publish_date
-        if "first_publish_date" in data:
-            details["publication_date"] = data["first_publish_date"]
-            
-        # Handle page count differently based on whether this is a work or an edition
-        page_count_found = False
+    # Subject times
+    if "subject_times" in data:
+        subjects.extend(data.get("subject_times", []))
         
-        # For editions (book endpoint), check pagination field directly
-        if is_book_edition:
-            # Check for pagination field which contains page count
-            pagination = data.get("pagination")
-            print(f"DEBUG: Direct pagination field: {pagination}")
-            
-            if pagination:
-                # Try to extract number from pagination string (e.g., "xii, 223 p.")
-                import re
-                # Look for patterns like "ix, 687 p." or "223 pages" or "223 p"
-                page_match = re.search(r'(\d+)\s*p(?:\.|ages)?', pagination)
+    # Subject people
+    if "subject_people" in data:
+        subjects.extend(data.get("subject_people", []))
+        
+    # Remove duplicates and store
+    if subjects:
+        details["subjects"] = list(dict.fromkeys(subjects))
+        
+    # Get description
+    description = data.get("description", {})
+    if isinstance(description, dict):
+        details["description"] = description.get("value", "")
+    elif isinstance(description, str):
+        details["description"] = description
+        
+    # Get publication date from first_publish_date
+    if "first_publish_date" in data:
+        details["publication_date"] = data["first_publish_date"]
+        
+    # Handle page count differently based on whether this is a work or an edition
+    page_count_found = False
+    
+    # For editions (book endpoint), check pagination field directly
+    if is_book_edition:
+        # Check for pagination field which contains page count
+        pagination = data.get("pagination")
+        print(f"DEBUG: Direct pagination field: {pagination}")
+        
+        if pagination:
+            # Try to extract number from pagination string (e.g., "xii, 223 p.")
+            import re
+            # Look for patterns like "ix, 687 p." or "223 pages" or "223 p"
+            page_match = re.search(r'(\d+)\s*p(?:\.|ages)?', pagination)
+            if page_match:
+                extracted_pages = page_match.group(1)
+                details["number_of_pages"] = int(extracted_pages)
+                details["page_count"] = int(extracted_pages)
+                print(f"DEBUG: Extracted page count from pagination: {extracted_pages}")
+                page_count_found = True
+            else:
+                # Fallback: just extract any number
+                page_match = re.search(r'\d+', pagination)
                 if page_match:
-                    extracted_pages = page_match.group(1)
+                    extracted_pages = page_match.group(0)
                     details["number_of_pages"] = int(extracted_pages)
                     details["page_count"] = int(extracted_pages)
-                    print(f"DEBUG: Extracted page count from pagination: {extracted_pages}")
-                    page_count_found = True
-                else:
-                    # Fallback: just extract any number
-                    page_match = re.search(r'\d+', pagination)
-                    if page_match:
-                        extracted_pages = page_match.group(0)
-                        details["number_of_pages"] = int(extracted_pages)
-                        details["page_count"] = int(extracted_pages)
-                        print(f"DEBUG: Extracted page count from pagination (fallback): {extracted_pages}")
-                        page_count_found = True
-            
-            # Also check direct number_of_pages field
-            if not page_count_found and "number_of_pages" in data:
-                page_count = data.get("number_of_pages")
-                if page_count:
-                    details["number_of_pages"] = page_count
-                    details["page_count"] = page_count
-                    print(f"DEBUG: Found page count in edition data: {page_count}")
+                    print(f"DEBUG: Extracted page count from pagination (fallback): {extracted_pages}")
                     page_count_found = True
         
-        # For works, check main data first, then fetch editions
-        else:
-            # First check if page count is in the main work data
-            if "number_of_pages" in data:
-                page_count = data.get("number_of_pages")
-                if page_count:
-                    details["number_of_pages"] = page_count
-                    details["page_count"] = page_count
-                    print(f"DEBUG: Found page count in main work data: {page_count}")
-                    page_count_found = True
+        # Also check direct number_of_pages field
+        if not page_count_found and "number_of_pages" in data:
+            page_count = data.get("number_of_pages")
+            if page_count:
+                details["number_of_pages"] = page_count
+                details["page_count"] = page_count
+                print(f"DEBUG: Found page count in edition data: {page_count}")
+                page_count_found = True
+    
+    # For works, check main data first, then fetch editions
+    else:
+        # First check if page count is in the main work data
+        if "number_of_pages" in data:
+            page_count = data.get("number_of_pages")
+            if page_count:
+                details["number_of_pages"] = page_count
+                details["page_count"] = page_count
+                print(f"DEBUG: Found page count in main work data: {page_count}")
+                page_count_found = True
+        
+        # Next check for page count in editions
+        if not page_count_found and "links" in data and "editions" in data.get("links", {}):
+            edition_url = data["links"]["editions"]
+            print(f"DEBUG: Fetching editions from {edition_url}")
+            edition_data = await get_editions(edition_url, deadline=deadline)
             
-            # Next check for page count in editions
-            if not page_count_found and "links" in data and "editions" in data.get("links", {}):
-                edition_url = data["links"]["editions"]
-                print(f"DEBUG: Fetching editions from {edition_url}")
-                edition_data = await get_editions(edition_url)
-                
-                if edition_data:
-                    print(f"DEBUG: Edition data keys: {list(edition_data.keys() if isinstance(edition_data, dict) else [])}")
+            if edition_data:
+                print(f"DEBUG: Edition data keys: {list(edition_data.keys() if isinstance(edition_data, dict) else [])}")
+            
+            if edition_data and "entries" in edition_data and edition_data["entries"]:
+                # Check multiple editions, not just the first one
+                for edition_index, edition in enumerate(edition_data["entries"][:3]):  # Check first 3 editions
+                    print(f"DEBUG: Edition {edition_index} keys: {list(edition.keys())}")
+                    
+                    # Try direct page count fields first
+                    page_count = edition.get("number_of_pages")
+                    print(f"DEBUG: number_of_pages from edition {edition_index}: {page_count}")
+                    
+                    if page_count:
+                        details["number_of_pages"] = page_count
+                        details["page_count"] = page_count  # Additional field for compatibility
+                        print(f"DEBUG: Set page_count to {page_count} from edition {edition_index}")
+                        page_count_found = True
+                        break  # Found what we need, stop checking editions
                 
-                if edition_data and "entries" in edition_data and edition_data["entries"]:
-                    # Check multiple editions, not just the first one
-                    for edition_index, edition in enumerate(edition_data["entries"][:3]):  # Check first 3 editions
-                        print(f"DEBUG: Edition {edition_index} keys: {list(edition.keys())}")
-                        
-                        # Try direct page count fields first
-                        page_count = edition.get("number_of_pages")
-                        print(f"DEBUG: number_of_pages from edition {edition_index}: {page_count}")
-                        
-                        if page_count:
-                            details["number_of_pages"] = page_count
-                            details["page_count"] = page_count  # Additional field for compatibility
-                            print(f"DEBUG: Set page_count to {page_count} from edition {edition_index}")
+                    # Check for pagination field which might contain page count
+                    pagination = edition.get("pagination")
+                    print(f"DEBUG: pagination field in edition {edition_index}: {pagination}")
+                    
+                    if pagination:
+                        # Try to extract number from pagination string (e.g., "xii, 223 p.")
+                        import re
+                        # Look for patterns like "ix, 687 p." or "223 pages" or "223 p"
+                        page_match = re.search(r'(\d+)\s*p(?:\.|ages)?', pagination)
+                        if page_match:
+                            extracted_pages = page_match.group(1)
+                            details["number_of_pages"] = int(extracted_pages)
+                            details["page_count"] = int(extracted_pages)
+                            print(f"DEBUG: Extracted page count from pagination: {extracted_pages}")
                             page_count_found = True
                             break  # Found what we need, stop checking editions
-                    
-                        # Check for pagination field which might contain page count
-                        pagination = edition.get("pagination")
-                        print(f"DEBUG: pagination field in edition {edition_index}: {pagination}")
-                        
-                        if pagination:
-                            # Try to extract number from pagination string (e.g., "xii, 223 p.")
-                            import re
-                            # Look for patterns like "ix, 687 p." or "223 pages" or "223 p"
-                            page_match = re.search(r'(\d+)\s*p(?:\.|ages)?', pagination)
-                            if page_match:
-                                extracted_pages = page_match.group(1)
-                                details["number_of_pages"] = int(extracted_pages)
-                                details["page_count"] = int(extracted_pages)
-                                print(f"DEBUG: Extracted page count from pagination: {extracted_pages}")
-                                page_count_found = True
-                                break  # Found what we need, stop checking editions
-                            else:
-                                # Fallback: just extract any number
-                                page_match = re.search(r'\d+', pagination)
-                                if page_match:
-                                    extracted_pages = page_match.group(0)
-                                    details["number_of_pages"] = int(extracted_pages)
-                                    details["page_count"] = int(extracted_pages)
-                                    print(f"DEBUG: Extracted page count from pagination (fallback): {extracted_pages}")
-                                    page_count_found = True
-                                    break  # Found what we need, stop checking editions
-                    
-                        # Check for physical_dimensions field which might contain page count
-                        physical_dimensions = edition.get("physical_dimensions")
-                        print(f"DEBUG: physical_dimensions field in edition {edition_index}: {physical_dimensions}")
-                        
-                        if physical_dimensions and not page_count_found:
-                            # Try to extract number from physical_dimensions string
-                            import re
-                            # Look for patterns like "223 p" or "223 pages"
-                            page_match = re.search(r'(\d+)\s*p(?:\.|ages)?', physical_dimensions)
+                        else:
+                            # Fallback: just extract any number
+                            page_match = re.search(r'\d+', pagination)
                             if page_match:
-                                extracted_pages = page_match.group(1)
+                                extracted_pages = page_match.group(0)
                                 details["number_of_pages"] = int(extracted_pages)
                                 details["page_count"] = int(extracted_pages)
-                                print(f"DEBUG: Extracted page count from physical_dimensions: {extracted_pages}")
+                                print(f"DEBUG: Extracted page count from pagination (fallback): {extracted_pages}")
                                 page_count_found = True
                                 break  # Found what we need, stop checking editions
                 
-                # If we still don't have page count, check for number_of_pages_median in the first edition
-                if not page_count_found and edition_data["entries"]:
-                    first_edition = edition_data["entries"][0]
-                    median_pages = first_edition.get("number_of_pages_median")
-                    print(f"DEBUG: number_of_pages_median: {median_pages}")
-                    if median_pages:
-                        details["number_of_pages"] = median_pages
-                        details["page_count"] = median_pages
-                        print(f"DEBUG: Set page_count to median value: {median_pages}")
-                        page_count_found = True
-        
-        # If we still don't have page count, check if it's in the number_of_pages_median field of the work
-        if not page_count_found and "number_of_pages_median" in data:
-            median_pages = data.get("number_of_pages_median")
-            if median_pages:
-                details["number_of_pages"] = median_pages
-                details["page_count"] = median_pages
-                print(f"DEBUG: Using work's number_of_pages_median as fallback: {median_pages}")
-                page_count_found = True
-        
-        if not page_count_found:
-            print("DEBUG: No page count found in any field")
-                
-        return details
+                    # Check for physical_dimensions field which might contain page count
+                    physical_dimensions = edition.get("physical_dimensions")
+                    print(f"DEBUG: physical_dimensions field in edition {edition_index}: {physical_dimensions}")
+                    
+                    if physical_dimensions and not page_count_found:
+                        # Try to extract number from physical_dimensions string
+                        import re
+                        # Look for patterns like "223 p" or "223 pages"
+                        page_match = re.search(r'(\d+)\s*p(?:\.|ages)?', physical_dimensions)
+                        if page_match:
+                            extracted_pages = page_match.group(1)
+                            details["number_of_pages"] = int(extracted_pages)
+                            details["page_count"] = int(extracted_pages)
+                            print(f"DEBUG: Extracted page count from physical_dimensions: {extracted_pages}")
+                            page_count_found = True
+                            break  # Found what we need, stop checking editions
+            
+            # If we still don't have page count, check for number_of_pages_median in the first edition
+            if not page_count_found and edition_data and edition_data.get("entries"):
+                first_edition = edition_data["entries"][0]
+                median_pages = first_edition.get("number_of_pages_median")
+                print(f"DEBUG: number_of_pages_median: {median_pages}")
+                if median_pages:
+                    details["number_of_pages"] = median_pages
+                    details["page_count"] = median_pages
+                    print(f"DEBUG: Set page_count to median value: {median_pages}")
+                    page_count_found = True
+    
+    # If we still don't have page count, check if it's in the number_of_pages_median field of the work
+    if not page_count_found and "number_of_pages_median" in data:
+        median_pages = data.get("number_of_pages_median")
+        if median_pages:
+            details["number_of_pages"] = median_pages
+            details["page_count"] = median_pages
+            print(f"DEBUG: Using work's number_of_pages_median as fallback: {median_pages}")
+            page_count_found = True
+    
+    if not page_count_found:
+        print("DEBUG: No page count found in any field")
+            
+    return details
+
+
+async def get_editions_by_keys(
+    keys: list[str], deadline: Deadline | None = None
+) -> dict[str, dict[str, Any]]:
+    """
+    Get several edition records at once.
+
+    Editions found in the persistent cache are not requested again; the rest
+    are fetched with the multi-key ``api/books?bibkeys=`` endpoint,
+    ``BIBKEYS_PER_REQUEST`` keys per request with the requests made
+    concurrently. Editions Open Library does not return are cached as
+    missing.
+
+    Args:
+        keys: Bare edition ids (e.g. "OL123M")
+        deadline: Time by which the requests have to finish
+
+    Returns:
+        Dictionary mapping each found edition id to its edition record
+    """
+    editions: dict[str, dict[str, Any]] = {}
+    missing = []
+    entries = await asyncio.to_thread(
+        openlibrary_cache.lookup_many, [f"api/books/{key}" for key in keys]
+    )
+    for key in keys:
+        cached = entries.get(f"api/books/{key}")
+        if cached and cached.fresh:
+            if cached.found:
+                editions[key] = cached.payload
+        else:
+            missing.append(key)
+
+    chunks = [
+        missing[i:i + BIBKEYS_PER_REQUEST]
+        for i in range(0, len(missing), BIBKEYS_PER_REQUEST)
+    ]
+    fetches = (_fetch_editions_by_keys(chunk, deadline) for chunk in chunks)
+    for fetched in await asyncio.gather(*fetches):
+        editions.update(fetched)
+    return editions
+
+
+async def _fetch_editions_by_keys(
+    keys: list[str], deadline: Deadline | None = None
+) -> dict[str, dict[str, Any]]:
+    """Fetch one batch of editions and store each in the persistent cache."""
+    logger.debug(f"Fetching {len(keys)} editions in one request")
+    response = await guarded_get(
+        f"{OPENLIBRARY_URL}/api/books",
+        deadline,
+        params={
+            "bibkeys": ",".join(f"OLID:{key}" for key in keys),
+            "format": "json",
+            "jscmd": "details",
+        },
+    )
+    response.raise_for_status()
+    data = response.json()
+
+    editions = {}
+    entries = []
+    for key in keys:
+        edition = (data.get(f"OLID:{key}") or {}).get("details")
+        if edition:
+            edition = {**edition, "key": f"/books/{key}"}
+            editions[key] = edition
+            pages = edition_resolver.parse_page_count(edition)
+            entries.append(
+                (f"api/books/{key}", edition, True, _details_ttl({"page_count": pages}))
+            )
+        else:
+            entries.append(
+                (f"api/books/{key}", None, False, openlibrary_cache.NEGATIVE_CACHE_TTL)
+            )
+    await asyncio.to_thread(openlibrary_cache.store_many, entries)
+    return editions
+
+
+async def get_books_by_isbn(
+    isbns: list[str], deadline: Deadline | None = None
+) -> dict[str, dict[str, Any] | None]:
+    """
+    Look books up by ISBN.
+
+    ISBNs found in the persistent cache are not requested again; the rest go
+    to the multi-key ``api/books?bibkeys=ISBN:...`` endpoint,
+    ``BIBKEYS_PER_REQUEST`` ISBNs per request and at most
+    ``ISBN_CONCURRENCY`` requests at a time. ISBNs Open Library does not
+    know are cached as missing.
+
+    Args:
+        isbns: Normalized ISBN-13s (see ``isbn.normalize_isbn``)
+        deadline: Time by which the lookups have to finish
+
+    Returns:
+        Dictionary mapping each ISBN to a book data dictionary in the
+        ``doc_to_book`` shape, or to None if Open Library has no such ISBN.
+        ISBNs whose lookup failed are left out.
+    """
+    books: dict[str, dict[str, Any] | None] = {}
+    missing = []
+    unique = list(dict.fromkeys(isbns))
+    entries = await asyncio.to_thread(
+        openlibrary_cache.lookup_many, [f"isbn/{isbn}" for isbn in unique]
+    )
+    for isbn in unique:
+        cached = entries.get(f"isbn/{isbn}")
+        if cached and cached.fresh:
+            books[isbn] = cached.payload if cached.found else None
+        else:
+            missing.append(isbn)
+
+    semaphore = asyncio.Semaphore(ISBN_CONCURRENCY)
+
+    async def fetch(chunk: list[str]) -> dict[str, dict[str, Any] | None]:
+        async with semaphore:
+            return await in_flight.do(
+                ("isbn", tuple(chunk)),
+                lambda: _fetch_books_by_isbn(chunk, deadline),
+                timeout=_wait_timeout(deadline),
+            )
+
+    chunks = [
+        missing[i:i + BIBKEYS_PER_REQUEST]
+        for i in range(0, len(missing), BIBKEYS_PER_REQUEST)
+    ]
+    results = await asyncio.gather(*(fetch(chunk) for chunk in chunks), return_exceptions=True)
+    for chunk, fetched in zip(chunks, results, strict=True):
+        if isinstance(fetched, Exception):
+            logger.warning(f"ISBN lookup failed for {len(chunk)} ISBNs: {fetched!r}")
+            continue
+        books.update(fetched)
+    return books
+
+
+async def get_book_by_isbn(
+    isbn: str, deadline: Deadline | None = None
+) -> dict[str, Any] | None:
+    """
+    Look one book up by ISBN.
 
+    Args:
+        isbn: A normalized ISBN-13
+        deadline: Time by which the lookup has to finish
 
-async def get_editions(editions_url: str) -> dict[str, Any] | None:
+    Returns:
+        Book data dictionary, or None if Open Library has no such ISBN
+
+    Raises:
+        UpstreamUnavailable: If Open Library could not be asked
+    """
+    books = await get_books_by_isbn([isbn], deadline)
+    if isbn not in books:
+        raise UpstreamUnavailable(f"ISBN {isbn} could not be looked up")
+    return books[isbn]
+
+
+async def _fetch_books_by_isbn(
+    isbns: list[str], deadline: Deadline | None = None
+) -> dict[str, dict[str, Any] | None]:
+    """Fetch one batch of ISBNs and store each in the persistent cache."""
+    logger.debug(f"Fetching {len(isbns)} ISBNs in one request")
+    response = await guarded_get(
+        f"{OPENLIBRARY_URL}/api/books",
+        deadline,
+        params={
+            "bibkeys": ",".join(f"ISBN:{isbn}" for isbn in isbns),
+            "format": "json",
+            "jscmd": "data",
+        },
+    )
+    response.raise_for_status()
+    data = response.json()
+
+    books: dict[str, dict[str, Any] | None] = {}
+    entries = []
+    for isbn in isbns:
+        record = data.get(f"ISBN:{isbn}")
+        if record:
+            book = books[isbn] = isbn_record_to_book(isbn, record)
+            entries.append((f"isbn/{isbn}", book, True, _details_ttl(book)))
+        else:
+            books[isbn] = None
+            entries.append((f"isbn/{isbn}", None, False, openlibrary_cache.NEGATIVE_CACHE_TTL))
+    await asyncio.to_thread(openlibrary_cache.store_many, entries)
+    return books
+
+
+_COVER_ID = re.compile(r"/b/id/(\d+)-")
+
+
+def _names(items: list[dict[str, Any]] | None) -> list[str]:
+    """The names of a ``jscmd=data`` list of authors, publishers or subjects."""
+    return [item["name"] for item in items or [] if item.get("name")]
+
+
+def isbn_record_to_book(isbn: str, record: dict[str, Any]) -> dict[str, Any]:
+    """Map an ``api/books?jscmd=data`` record to a book data dictionary."""
+    authors = _names(record.get("authors"))
+    cover_match = _COVER_ID.search((record.get("cover") or {}).get("medium", ""))
+    page_count = edition_resolver.parse_page_count(record)
+    publish_date = record.get("publish_date")
+    year_match = re.search(r"\d{4}", publish_date or "")
+    title = record.get("title", "Unknown Title")
+    if record.get("subtitle"):
+        title = f"{title}: {record['subtitle']}"
+
+    book = {
+        "title": title,
+        "author": authors[0] if authors else "Unknown Author",
+        "first_publish_year": int(year_match.group(0)) if year_match else None,
+        "publication_date": publish_date,
+        "key": record.get("key"),
+        "cover_id": int(cover_match.group(1)) if cover_match else None,
+        "isbn": isbn,
+        "number_of_pages": page_count,
+        "page_count": page_count,
+        "publishers": _names(record.get("publishers")),
+        "subjects": _names(record.get("subjects"))[:SEARCH_LIST_LIMIT],
+        "olid": get_first_item((record.get("identifiers") or {}).get("openlibrary", [])),
+    }
+    if book["cover_id"]:
+        book["cover_url"] = f"https://covers.openlibrary.org/b/id/{book['cover_id']}-M.jpg"
+    else:
+        book["cover_url"] = f"https://covers.openlibrary.org/b/isbn/{isbn}-M.jpg"
+    if book["key"]:
+        book["ol_url"] = f"{OPENLIBRARY_URL}{book['key']}"
+    return book
+
+
+async def get_editions(
+    editions_url: str, limit: int | None = None, deadline: Deadline | None = None
+) -> dict[str, Any] | None:
     """
     Get editions information for a book.
     
     Args:
         editions_url: URL to the editions endpoint
+        limit: Number of editions to request (Open Library's default page if None)
+        deadline: Time by which the lookup has to finish
         
     Returns:
         Dictionary with editions information or None if not found
     """
+    return await in_flight.do(
+        ("editions", editions_url, limit),
+        lambda: _fetch_editions(editions_url, limit, deadline),
+        timeout=_wait_timeout(deadline),
+    )
+
+
+async def _fetch_editions(
+    editions_url: str, limit: int | None = None, deadline: Deadline | None = None
+) -> dict[str, Any] | None:
+    """Fetch an editions listing, going through the persistent cache."""
+    cache_key = editions_url.removeprefix(OPENLIBRARY_URL).removesuffix(".json").lstrip("/")
     if not editions_url.startswith("http"):
-        editions_url = f"https://openlibrary.org{editions_url}.json"
-        
-    async with httpx.AsyncClient() as client:
-        response = await client.get(editions_url)
-        if response.status_code != 200:
-            return None
-            
-        return response.json()
+        editions_url = f"{OPENLIBRARY_URL}{editions_url}.json"
+    params = {}
+    if limit:
+        cache_key = f"{cache_key}?limit={limit}"
+        params["limit"] = limit
+
+    cached = await asyncio.to_thread(openlibrary_cache.lookup, cache_key)
+    if cached and cached.fresh:
+        return cached.payload if cached.found else None
+
+    try:
+        response = await guarded_get(
+            editions_url,
+            deadline,
+            params=params,
+            headers=openlibrary_cache.conditional_headers(cached),
+        )
+    except (httpx.HTTPError, UpstreamUnavailable):
+        if cached:
+            return cached.payload if cached.found else None
+        raise
+    if response.status_code == 304 and cached:
+        await asyncio.to_thread(openlibrary_cache.touch, cache_key)
+        return cached.payload
+    if response.status_code == 404:
+        await asyncio.to_thread(
+            openlibrary_cache.store,
+            cache_key, None, found=False, ttl=openlibrary_cache.NEGATIVE_CACHE_TTL
+        )
+        return None
+    if _is_upstream_error(response):
+        if cached:
+            return cached.payload if cached.found else None
+        raise UpstreamUnavailable(
+            f"Open Library answered {response.status_code} for {cache_key}"
+        )
+    if response.status_code != 200:
+        return None
+
+    data = response.json()
+    await asyncio.to_thread(
+        openlibrary_cache.store,
+        cache_key,
+        data,
+        etag=response.headers.get("etag"),
+        last_modified=response.headers.get("last-modified"),
+    )
+    return data
@@ -0,0 +1,199 @@
+"""Book metadata providers and hedged searches across them.
+
+A provider answers a search with book dictionaries in the shape built by
+``openlibrary_service.doc_to_book``. Open Library is the primary provider
+(see ``openlibrary_service.OpenLibraryProvider``); the local catalog is the
+built-in secondary one, and any other source can be plugged in by
+subclassing ``MetadataProvider``.
+
+``HedgedSearch`` sends a search to the primary provider and, if it has not
+answered within a percentile of its recent latencies, sends the same search
+to the secondary one as well; whichever returns results first wins and the
+other call is cancelled. Hedging trades a little extra load on the secondary
+for a bounded tail latency when the primary is slow.
+"""
+
+import asyncio
+import logging
+import math
+import time
+from abc import ABC
+from abc import abstractmethod
+from collections import deque
+from dataclasses import dataclass
+from typing import Any
+
+from . import local_catalog
+from .resilience import Deadline
+from .resilience import DeadlineExceeded
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ProviderResult:
+    """The answer of one provider to a search."""
+
+    provider: str
+    books: list[dict[str, Any]]
+    # Raw search documents, for providers whose results can be enriched later
+    docs: list[dict[str, Any]] | None = None
+
+
+class MetadataProvider(ABC):
+    """A source of book search results."""
+
+    name = "provider"
+
+    def is_available(self) -> bool:
+        """Whether the provider can be asked at all (e.g. its data exists)."""
+        return True
+
+    @abstractmethod
+    async def search(
+        self, query: str, limit: int, deadline: Deadline | None = None
+    ) -> ProviderResult:
+        """
+        Search the provider.
+
+        Args:
+            query: The search query
+            limit: Maximum number of results to return
+            deadline: Time by which the answer is needed
+
+        Returns:
+            The provider's results in the ``doc_to_book`` shape
+        """
+
+
+class LocalCatalogProvider(MetadataProvider):
+    """The offline catalog built from the Open Library dumps."""
+
+    name = "local_catalog"
+
+    def is_available(self) -> bool:
+        return local_catalog.is_available()
+
+    async def search(
+        self, query: str, limit: int, deadline: Deadline | None = None
+    ) -> ProviderResult:
+        books = await asyncio.to_thread(local_catalog.search, query, limit)
+        return ProviderResult(self.name, books)
+
+
+class LatencyTracker:
+    """Recent call latencies of a provider, for picking the hedge delay."""
+
+    def __init__(self, size: int = 200):
+        self.samples: deque[float] = deque(maxlen=size)
+
+    def record(self, seconds: float) -> None:
+        self.samples.append(seconds)
+
+    def percentile(self, percentile: float) -> float | None:
+        """The given percentile of the recorded latencies, None without samples."""
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        index = min(math.ceil(len(ordered) * percentile / 100) - 1, len(ordered) - 1)
+        return ordered[max(index, 0)]
+
+
+class HedgedSearch:
+    """
+    Search a primary provider, hedging slow calls with a secondary one.
+
+    The hedge is sent after the ``percentile`` latency of the primary's recent
+    successful calls, but never sooner than ``min_delay``; until
+    ``min_samples`` calls have been seen ``default_delay`` is used. A primary
+    that fails before the delay is hedged right away. Empty results from the
+    secondary do not win, since the primary may still find something.
+    """
+
+    def __init__(
+        self,
+        primary: MetadataProvider,
+        secondary: MetadataProvider | None = None,
+        percentile: float = 90.0,
+        min_delay: float = 0.2,
+        default_delay: float = 1.0,
+        min_samples: int = 20,
+    ):
+        self.primary = primary
+        self.secondary = secondary
+        self.percentile = percentile
+        self.min_delay = min_delay
+        self.default_delay = default_delay
+        self.min_samples = min_samples
+        self.latency = LatencyTracker()
+        self.stats = {"searches": 0, "hedged": 0, "secondary_wins": 0}
+
+    def hedge_delay(self) -> float:
+        """Seconds to wait for the primary before sending the hedge."""
+        if len(self.latency.samples) < self.min_samples:
+            return self.default_delay
+        return max(self.latency.percentile(self.percentile), self.min_delay)
+
+    async def _primary_search(
+        self, query: str, limit: int, deadline: Deadline | None
+    ) -> ProviderResult:
+        started = time.monotonic()
+        result = await self.primary.search(query, limit, deadline)
+        self.latency.record(time.monotonic() - started)
+        return result
+
+    async def search(
+        self, query: str, limit: int, deadline: Deadline | None = None
+    ) -> ProviderResult:
+        """
+        Search, hedging with the secondary provider when the primary is slow.
+
+        Returns:
+            The first usable result
+
+        Raises:
+            DeadlineExceeded: If neither provider answered in time
+            Exception: The primary's error, if no provider returned results
+        """
+        self.stats["searches"] += 1
+        primary = asyncio.ensure_future(self._primary_search(query, limit, deadline))
+        pending = {primary}
+        try:
+            done, _ = await asyncio.wait(pending, timeout=self.hedge_delay())
+            if (done and primary.exception() is None) or not (
+                self.secondary and self.secondary.is_available()
+            ):
+                return await primary
+
+            self.stats["hedged"] += 1
+            secondary = asyncio.ensure_future(self.secondary.search(query, limit, deadline))
+            pending = {primary, secondary}
+            while pending:
+                timeout = deadline.remaining() if deadline else None
+                done, pending = await asyncio.wait(
+                    pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    raise DeadlineExceeded("No metadata provider answered in time")
+                for task in done:
+                    if task.exception() is not None:
+                        logger.warning(f"Hedged search failed: {task.exception()}")
+                        continue
+                    result = task.result()
+                    if task is primary:
+                        return result
+                    if result.books:
+                        self.stats["secondary_wins"] += 1
+                        return result
+            if primary.exception() is not None:
+                raise primary.exception()
+            return primary.result()
+        finally:
+            # The losing call, or both when this search itself is cancelled
+            for task in pending:
+                if not task.done():
+                    task.cancel()
+
+    def get_stats(self) -> dict[str, Any]:
+        """Get the hedging counters and the current hedge delay."""
+        return {**self.stats, "hedge_delay": round(self.hedge_delay(), 3)}
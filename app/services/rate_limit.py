@@ -0,0 +1,258 @@
+"""Token-bucket rate limiting for outbound calls, shared between workers."""
+
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections.abc import AsyncIterator
+from collections.abc import Iterator
+from contextlib import asynccontextmanager
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any
+
+from .resilience import Deadline
+from .resilience import UpstreamUnavailable
+
+logger = logging.getLogger(__name__)
+
+INTERACTIVE = "interactive"
+BACKGROUND = "background"
+
+# Priority of the upstream calls made by the current task; tasks started from
+# it inherit the value
+current_priority: ContextVar[str] = ContextVar("current_priority", default=INTERACTIVE)
+
+# How long to wait before asking again when all connection slots are taken
+SLOT_POLL_INTERVAL = 0.05
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS buckets (
+    name TEXT PRIMARY KEY,
+    tokens REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS leases (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+"""
+
+
+class RateLimited(UpstreamUnavailable):
+    """The call was not made because the rate limit was reached."""
+
+
+@contextmanager
+def use_priority(priority: str) -> Iterator[None]:
+    """Make the upstream calls in the block with the given priority."""
+    token = current_priority.set(priority)
+    try:
+        yield
+    finally:
+        current_priority.reset(token)
+
+
+class RateLimiter:
+    """
+    Limit the request rate and the concurrent requests to one upstream.
+
+    The bucket holds up to ``burst`` tokens and refills at ``rate`` tokens per
+    second; every call takes one token and one of ``max_concurrent`` connection
+    slots (a lease, released when the call ends and expiring after
+    ``lease_ttl`` seconds in case a worker dies holding it).
+
+    The state lives in a small SQLite database and each acquire is a single
+    ``BEGIN IMMEDIATE`` transaction, so every worker process opening the same
+    file shares one bucket. With ``":memory:"`` the limiter is private to the
+    process.
+
+    Interactive calls queue until a token and a slot are free, for as long as
+    their deadline allows. Background calls never queue and may not dip into
+    the ``background_reserve`` share of the tokens and slots, so they cannot
+    starve searches; when refused they raise ``RateLimited`` and are expected
+    to retry later.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        path: str,
+        rate: float,
+        burst: int,
+        max_concurrent: int,
+        background_reserve: float = 0.5,
+        lease_ttl: float = 60.0,
+        max_wait: float = 10.0,
+    ):
+        self.name = name
+        self.path = path
+        self.rate = rate
+        self.burst = burst
+        self.max_concurrent = max_concurrent
+        self.background_reserve = background_reserve
+        self.lease_ttl = lease_ttl
+        self.max_wait = max_wait
+        self._conn: sqlite3.Connection | None = None
+        self._lock = threading.Lock()
+        self.stats = {"acquired": 0, "queued": 0, "rejected": 0}
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            if self.path != ":memory:":
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(
+                self.path, timeout=5, isolation_level=None, check_same_thread=False
+            )
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def try_acquire(self, priority: str = INTERACTIVE) -> tuple[str | None, float]:
+        """
+        Take a token and a connection slot if both are available.
+
+        Args:
+            priority: INTERACTIVE or BACKGROUND
+
+        Returns:
+            ``(lease_id, 0)`` on success, otherwise ``(None, seconds)`` with
+            the time after which asking again may succeed
+        """
+        reserve = self.background_reserve if priority == BACKGROUND else 0.0
+        min_tokens = self.burst * reserve
+        max_slots = max(int(self.max_concurrent * (1 - reserve)), 1)
+        now = time.time()
+
+        with self._lock:
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute(
+                    "DELETE FROM leases WHERE name = ? AND expires_at <= ?", (self.name, now)
+                )
+                row = conn.execute(
+                    "SELECT tokens, updated_at FROM buckets WHERE name = ?", (self.name,)
+                ).fetchone()
+                if row is None:
+                    tokens = float(self.burst)
+                else:
+                    tokens = min(self.burst, row[0] + max(now - row[1], 0) * self.rate)
+                (active,) = conn.execute(
+                    "SELECT COUNT(*) FROM leases WHERE name = ?", (self.name,)
+                ).fetchone()
+
+                lease_id = None
+                if self.rate > 0 and tokens - 1 < min_tokens:
+                    wait = (min_tokens + 1 - tokens) / self.rate
+                elif active >= max_slots:
+                    wait = SLOT_POLL_INTERVAL
+                else:
+                    lease_id = uuid.uuid4().hex
+                    wait = 0.0
+                    if self.rate > 0:
+                        tokens -= 1
+                    conn.execute(
+                        "INSERT INTO leases (id, name, expires_at) VALUES (?, ?, ?)",
+                        (lease_id, self.name, now + self.lease_ttl),
+                    )
+                conn.execute(
+                    "INSERT OR REPLACE INTO buckets (name, tokens, updated_at) VALUES (?, ?, ?)",
+                    (self.name, tokens, now),
+                )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return lease_id, wait
+
+    def release(self, lease_id: str) -> None:
+        """Give a connection slot back."""
+        with self._lock:
+            self._connect().execute("DELETE FROM leases WHERE id = ?", (lease_id,))
+
+    async def acquire(
+        self, priority: str | None = None, deadline: Deadline | None = None
+    ) -> str:
+        """
+        Wait for a token and a connection slot.
+
+        Args:
+            priority: INTERACTIVE or BACKGROUND, defaults to ``current_priority``
+            deadline: Interactive calls give up once waiting would overrun it
+
+        Returns:
+            The lease id to pass to ``release``
+
+        Raises:
+            RateLimited: If a background call is over the limit, or an
+                interactive call cannot get through in time
+        """
+        priority = priority or current_priority.get()
+        give_up_at = time.monotonic() + self.max_wait
+        if deadline is not None:
+            give_up_at = min(give_up_at, deadline.expires_at)
+
+        queued = False
+        while True:
+            attempt = asyncio.ensure_future(
+                asyncio.to_thread(self.try_acquire, priority)
+            )
+            try:
+                lease_id, wait = await asyncio.shield(attempt)
+            except asyncio.CancelledError:
+                # The thread runs to the end regardless; give back a lease it
+                # took after the caller stopped waiting for it
+                lease_id, _ = await attempt
+                if lease_id is not None:
+                    await asyncio.to_thread(self.release, lease_id)
+                raise
+            if lease_id is not None:
+                self.stats["acquired"] += 1
+                return lease_id
+            if priority == BACKGROUND or time.monotonic() + wait > give_up_at:
+                self.stats["rejected"] += 1
+                raise RateLimited(f"{self.name} rate limit reached ({priority})")
+            if not queued:
+                queued = True
+                self.stats["queued"] += 1
+            await asyncio.sleep(wait)
+
+    @asynccontextmanager
+    async def slot(
+        self, priority: str | None = None, deadline: Deadline | None = None
+    ) -> AsyncIterator[None]:
+        """Hold a token and a connection slot for the duration of the block."""
+        lease_id = await self.acquire(priority, deadline)
+        try:
+            yield
+        finally:
+            # Shielded so the release still finishes when the call is cancelled
+            # while waiting for it
+            await asyncio.shield(asyncio.to_thread(self.release, lease_id))
+
+    def reset(self) -> None:
+        """Refill the bucket, drop all leases and clear the counters."""
+        with self._lock:
+            conn = self._connect()
+            conn.execute("DELETE FROM buckets WHERE name = ?", (self.name,))
+            conn.execute("DELETE FROM leases WHERE name = ?", (self.name,))
+        self.stats = dict.fromkeys(self.stats, 0)
+
+    def get_stats(self) -> dict[str, Any]:
+        """Get the call counters and the connection slots in use."""
+        try:
+            with self._lock:
+                (active,) = self._connect().execute(
+                    "SELECT COUNT(*) FROM leases WHERE name = ? AND expires_at > ?",
+                    (self.name, time.time()),
+                ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"Could not read {self.name} rate limiter state: {e}")
+            active = None
+        return {**self.stats, "active": active}
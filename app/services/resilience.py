@@ -0,0 +1,141 @@
+"""Deadlines and a circuit breaker for calls to upstream services."""
+
+import logging
+import time
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+
+class UpstreamUnavailable(Exception):
+    """An upstream call was not made or not finished in time."""
+
+
+class DeadlineExceeded(UpstreamUnavailable):
+    """The time allowed for a request ran out."""
+
+
+class CircuitOpenError(UpstreamUnavailable):
+    """The circuit breaker is open, so the call was not attempted."""
+
+
+class Deadline:
+    """
+    A point in time by which a request has to be answered.
+
+    One deadline is created per incoming request and passed down to every
+    upstream call made for it, so the calls share one time budget instead of
+    each getting its own timeout.
+    """
+
+    def __init__(self, seconds: float):
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        """Seconds left, never negative."""
+        return max(self.expires_at - time.monotonic(), 0.0)
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() == 0
+
+    def within(self, seconds: float) -> "Deadline":
+        """Get a deadline ``seconds`` from now, but no later than this one."""
+        deadline = Deadline(seconds)
+        deadline.expires_at = min(deadline.expires_at, self.expires_at)
+        return deadline
+
+    def timeout(self, cap: float | None = None) -> float:
+        """
+        Get the timeout for the next call.
+
+        Args:
+            cap: Upper bound for a single call
+
+        Returns:
+            The remaining time, capped at ``cap``
+
+        Raises:
+            DeadlineExceeded: If no time is left
+        """
+        remaining = self.remaining()
+        if remaining == 0:
+            raise DeadlineExceeded("Deadline exceeded")
+        return min(remaining, cap) if cap is not None else remaining
+
+
+class CircuitBreaker:
+    """
+    Stop calling an upstream that keeps failing.
+
+    The breaker is closed while calls succeed. After ``failure_threshold``
+    consecutive failures (errors, timeouts, 5xx or 429 responses) it opens and
+    rejects calls right away with ``CircuitOpenError``. Once ``reset_timeout``
+    seconds have passed it is half-open: calls go through again, the first
+    success closes it and the first failure opens it for another period.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.consecutive_failures = 0
+        self.opened_at: float | None = None
+        self.stats = {"failures": 0, "timeouts": 0, "rejected": 0, "opened": 0}
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return self.CLOSED
+        if time.monotonic() - self.opened_at < self.reset_timeout:
+            return self.OPEN
+        return self.HALF_OPEN
+
+    def before_call(self) -> None:
+        """
+        Check that a call may be made.
+
+        Raises:
+            CircuitOpenError: If the breaker is open
+        """
+        if self.state == self.OPEN:
+            self.stats["rejected"] += 1
+            raise CircuitOpenError(f"{self.name} circuit is open")
+
+    def record_success(self) -> None:
+        if self.opened_at is not None:
+            logger.info(f"{self.name} circuit closed")
+        self.consecutive_failures = 0
+        self.opened_at = None
+
+    def record_failure(self, timeout: bool = False) -> None:
+        self.stats["failures"] += 1
+        if timeout:
+            self.stats["timeouts"] += 1
+        self.consecutive_failures += 1
+        if self.state == self.HALF_OPEN or (
+            self.opened_at is None and self.consecutive_failures >= self.failure_threshold
+        ):
+            logger.warning(
+                f"{self.name} circuit opened after {self.consecutive_failures} failures"
+            )
+            self.opened_at = time.monotonic()
+            self.stats["opened"] += 1
+
+    def reset(self) -> None:
+        """Close the breaker and clear the counters."""
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.stats = dict.fromkeys(self.stats, 0)
+
+    def get_stats(self) -> dict[str, Any]:
+        """Get the current state and failure counters."""
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            **self.stats,
+        }
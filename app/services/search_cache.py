@@ -0,0 +1,192 @@
+"""In-memory LRU/TTL cache in front of Open Library searches."""
+
+import asyncio
+import logging
+import os
+import re
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Any
+
+from . import openlibrary_service
+from .resilience import Deadline
+from .singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+SEARCH_CACHE_SIZE = int(os.getenv("SEARCH_CACHE_SIZE", "512"))
+SEARCH_CACHE_TTL = float(os.getenv("SEARCH_CACHE_TTL", "300"))
+# How long past the TTL an entry may still be served while it is refreshed
+SEARCH_CACHE_STALE_TTL = float(os.getenv("SEARCH_CACHE_STALE_TTL", "3600"))
+# Freshness TTL of results that were only partly enriched in time
+SEARCH_CACHE_PARTIAL_TTL = float(os.getenv("SEARCH_CACHE_PARTIAL_TTL", "15"))
+
+_WHITESPACE = re.compile(r"\s+")
+
+SearchKey = tuple[str, int, bool]
+
+
+def normalize_query(query: str) -> str:
+    """Casefold a query and collapse runs of whitespace."""
+    return _WHITESPACE.sub(" ", query.casefold()).strip()
+
+
+@dataclass
+class _Entry:
+    value: Any
+    stored_at: float
+    ttl: float
+
+
+class SearchCache:
+    """
+    LRU cache with a freshness TTL and a stale-while-revalidate window.
+
+    Entries younger than ``ttl`` are served as-is. Entries older than ``ttl``
+    but younger than ``ttl + stale_ttl`` are served immediately while a single
+    background task refreshes them. Anything older is fetched again inline,
+    and is still served if that fetch fails.
+
+    ``openlibrary_service.PartialResults`` are only fresh for ``partial_ttl``,
+    so searches that ran out of enrichment budget are soon tried again.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = SEARCH_CACHE_SIZE,
+        ttl: float = SEARCH_CACHE_TTL,
+        stale_ttl: float = SEARCH_CACHE_STALE_TTL,
+        partial_ttl: float = SEARCH_CACHE_PARTIAL_TTL,
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.partial_ttl = partial_ttl
+        self._entries: OrderedDict[Any, _Entry] = OrderedDict()
+        self._refreshing: dict[Any, asyncio.Task] = {}
+        self.stats = {
+            "hits": 0,
+            "stale_hits": 0,
+            "misses": 0,
+            "refreshes": 0,
+            "evictions": 0,
+            "served_on_error": 0,
+        }
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def set(self, key: Any, value: Any) -> None:
+        """Store a value and evict the least recently used entries if needed."""
+        partial = isinstance(value, openlibrary_service.PartialResults)
+        ttl = min(self.ttl, self.partial_ttl) if partial else self.ttl
+        self._entries[key] = _Entry(value=value, stored_at=time.monotonic(), ttl=ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def clear(self) -> None:
+        """Drop all entries."""
+        self._entries.clear()
+
+    async def get_or_fetch(self, key: Any, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Get a cached value, fetching it with ``fetch`` when missing or expired.
+
+        Args:
+            key: Cache key
+            fetch: Coroutine factory producing a fresh value
+
+        Returns:
+            The cached or freshly fetched value
+        """
+        entry = self._entries.get(key)
+        if entry is not None:
+            age = time.monotonic() - entry.stored_at
+            if age < entry.ttl:
+                self._entries.move_to_end(key)
+                self.stats["hits"] += 1
+                return entry.value
+            if age < entry.ttl + self.stale_ttl:
+                self._entries.move_to_end(key)
+                self.stats["stale_hits"] += 1
+                self._refresh_in_background(key, fetch)
+                return entry.value
+
+        self.stats["misses"] += 1
+        try:
+            value = await fetch()
+        except Exception:
+            if entry is None:
+                raise
+            self.stats["served_on_error"] += 1
+            return entry.value
+        self.set(key, value)
+        return value
+
+    def _refresh_in_background(self, key: Any, fetch: Callable[[], Awaitable[Any]]) -> None:
+        """Start a refresh for ``key`` unless one is already running."""
+        if key in self._refreshing:
+            return
+
+        async def refresh() -> None:
+            try:
+                self.set(key, await fetch())
+                self.stats["refreshes"] += 1
+            except Exception as e:
+                logger.warning(f"Background refresh failed for {key}: {e}")
+            finally:
+                self._refreshing.pop(key, None)
+
+        self._refreshing[key] = asyncio.create_task(refresh())
+
+    def get_stats(self) -> dict[str, Any]:
+        """Get cache counters and current size."""
+        return {**self.stats, "entries": len(self._entries), "max_entries": self.max_entries}
+
+
+search_cache = SearchCache()
+
+# Identical searches that are running right now
+searches_in_flight = SingleFlight()
+
+
+async def search_books(
+    query: str,
+    limit: int = 10,
+    fetch_details: bool = False,
+    deadline: Deadline | None = None,
+) -> list[dict[str, Any]]:
+    """
+    Search Open Library through the in-memory cache.
+
+    The cache key is the normalized query plus ``limit`` and ``fetch_details``,
+    so "Harry  Potter" and "harry potter" share one entry. Concurrent misses
+    for the same key share one upstream search.
+
+    Args:
+        query: The search query
+        limit: Maximum number of results to return
+        fetch_details: Whether to fetch detailed information for each book
+        deadline: Time by which the search has to finish
+
+    Returns:
+        List of book data dictionaries
+    """
+    normalized = normalize_query(query)
+    key: SearchKey = (normalized, limit, fetch_details)
+
+    async def fetch() -> list[dict[str, Any]]:
+        return await searches_in_flight.do(
+            key,
+            lambda: openlibrary_service.search_books(
+                normalized, limit, fetch_details, deadline=deadline
+            ),
+            timeout=openlibrary_service.SINGLEFLIGHT_TIMEOUT,
+        )
+
+    return await search_cache.get_or_fetch(key, fetch)
@@ -0,0 +1,95 @@
+"""Coalesce concurrent identical calls into a single in-flight call."""
+
+import asyncio
+from collections.abc import Awaitable
+from collections.abc import Callable
+from collections.abc import Hashable
+from typing import Any
+
+
+class SingleFlight:
+    """
+    Run at most one call per key at a time.
+
+    The first caller for a key starts the call; callers arriving while it is
+    running wait on the same task and receive the same result or exception.
+    Each caller can give its own timeout: a caller that times out stops
+    waiting, but the shared call keeps running for the others (and to warm
+    whatever cache it fills). A caller that is cancelled also stops waiting;
+    once every caller of a call has been cancelled, the call is cancelled too,
+    since nobody is left to use its result.
+
+    The shared call is whatever the first caller's ``fn`` does, so it runs
+    under that caller's limits: with a ``Deadline`` captured in ``fn``, a
+    later caller that joins it can get the ``DeadlineExceeded`` of the first
+    caller even though its own deadline had time left. A caller's
+    ``timeout`` only bounds how long it waits.
+    """
+
+    def __init__(self) -> None:
+        self._calls: dict[Hashable, asyncio.Task] = {}
+        self._waiters: dict[asyncio.Task, int] = {}
+        self.stats = {"calls": 0, "coalesced": 0, "timeouts": 0, "abandoned": 0}
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    async def do(
+        self,
+        key: Hashable,
+        fn: Callable[[], Awaitable[Any]],
+        timeout: float | None = None,
+    ) -> Any:
+        """
+        Run ``fn`` for ``key``, or join the call already running for it.
+
+        Args:
+            key: Identifies equivalent calls
+            fn: Coroutine factory, only invoked by the first caller (the
+                shared call runs under any deadline it captured)
+            timeout: Seconds this caller is willing to wait for the shared call
+
+        Returns:
+            The result of the shared call
+
+        Raises:
+            TimeoutError: If this caller's timeout expires first
+            Exception: Whatever the shared call raised
+        """
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda t: self._finish(key, t))
+            self.stats["calls"] += 1
+        else:
+            self.stats["coalesced"] += 1
+
+        self._waiters[task] = self._waiters.get(task, 0) + 1
+        try:
+            # Shield the shared task so one caller's timeout or cancellation
+            # does not cancel the call for everyone else
+            return await asyncio.wait_for(asyncio.shield(task), timeout)
+        except TimeoutError:
+            self.stats["timeouts"] += 1
+            raise
+        except asyncio.CancelledError:
+            if self._waiters[task] == 1 and not task.done():
+                self.stats["abandoned"] += 1
+                task.cancel()
+            raise
+        finally:
+            self._waiters[task] -= 1
+            if not self._waiters[task]:
+                del self._waiters[task]
+
+    def _finish(self, key: Hashable, task: asyncio.Task) -> None:
+        """Forget a finished call and mark its exception as retrieved."""
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if not task.cancelled():
+            task.exception()
+
+    def get_stats(self) -> dict[str, int]:
+        """Get call counters and the number of calls currently in flight."""
+        return {**self.stats, "in_flight": len(self._calls)}
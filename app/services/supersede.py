@@ -0,0 +1,87 @@
+"""Cancel request work nobody is waiting for any more."""
+
+import asyncio
+from collections.abc import Awaitable
+from collections.abc import Callable
+from collections.abc import Hashable
+from typing import Any
+from typing import TypeVar
+
+T = TypeVar("T")
+
+# How often the client connection is checked while work is running
+DISCONNECT_POLL_INTERVAL = 0.1
+
+
+class RequestCancelled(Exception):
+    """The work was cancelled because its result is no longer wanted."""
+
+
+class Supersede:
+    """
+    Keep only the newest call per key running.
+
+    Typeahead clients send a new request per keystroke. Starting a call for a
+    key cancels the previous call for the same key, and a call is also
+    cancelled as soon as its client disconnects. Cancellation reaches every
+    task the call awaits, so the upstream requests it started are dropped too
+    (see ``SingleFlight`` for calls shared with other requests).
+    """
+
+    def __init__(self) -> None:
+        self._tasks: dict[Hashable, asyncio.Task] = {}
+        self.stats = {"calls": 0, "superseded": 0, "disconnected": 0}
+
+    async def run(
+        self,
+        key: Hashable,
+        fn: Callable[[], Awaitable[T]],
+        is_disconnected: Callable[[], Awaitable[bool]] | None = None,
+    ) -> T:
+        """
+        Run ``fn`` for ``key``, cancelling the previous call for that key.
+
+        Args:
+            key: Identifies calls that replace each other (e.g. a session id)
+            fn: Coroutine factory doing the work
+            is_disconnected: Polled while the work runs; the work is cancelled
+                once it returns True
+
+        Returns:
+            The result of ``fn``
+
+        Raises:
+            RequestCancelled: If a newer call for the key or a disconnect
+                cancelled this one
+        """
+        previous = self._tasks.get(key)
+        if previous is not None and not previous.done():
+            self.stats["superseded"] += 1
+            previous.cancel()
+
+        task = asyncio.ensure_future(fn())
+        self._tasks[key] = task
+        self.stats["calls"] += 1
+        try:
+            while True:
+                done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_INTERVAL)
+                if done:
+                    break
+                if is_disconnected is not None and await is_disconnected():
+                    self.stats["disconnected"] += 1
+                    task.cancel()
+                    await asyncio.wait({task})
+                    break
+            if task.cancelled():
+                raise RequestCancelled("Request was cancelled")
+            return task.result()
+        finally:
+            if not task.done():
+                # This caller itself was cancelled
+                task.cancel()
+            if self._tasks.get(key) is task:
+                del self._tasks[key]
+
+    def get_stats(self) -> dict[str, Any]:
+        """Get call counters and the number of calls currently running."""
+        return {**self.stats, "running": len(self._tasks)}
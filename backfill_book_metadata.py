@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Script to fill in missing page counts, genres and publication dates of books.
+
+Looks up every book that is missing some of its metadata on Open Library (or
+in the local catalog) and fills in only the missing fields:
+
+    python backfill_book_metadata.py --concurrency 4 --rate 2
+
+Progress is saved after every chunk; kill the script at any time and run it
+again to continue. Use --restart to start over from the first book. Books
+whose lookup fails are handed to the app's enrichment queue for retries, and
+the next run starts again from the first of them.
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import sys
+
+# Set up logging
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    handlers=[logging.StreamHandler()]
+)
+
+# Add the current directory to the path so we can import the app modules
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.services import local_catalog
+from app.services import metadata_backfill
+from app.services import openlibrary_service
+
+
+async def run(args: argparse.Namespace) -> metadata_backfill.Progress:
+    try:
+        return await metadata_backfill.backfill(
+            args.checkpoint,
+            chunk_size=args.chunk_size,
+            concurrency=args.concurrency,
+            rate=args.rate,
+            limit=args.limit,
+        )
+    finally:
+        await openlibrary_service.close_client()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--checkpoint",
+        default=os.path.join(local_catalog.data_dir, "backfill_checkpoint.json"),
+        help="Progress file (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--restart", action="store_true", help="Ignore the checkpoint and start over"
+    )
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=metadata_backfill.CHUNK_SIZE,
+        help="Books read and written per chunk (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=metadata_backfill.CONCURRENCY,
+        help="Books looked up at the same time (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--rate",
+        type=float,
+        default=metadata_backfill.RATE,
+        help="Books looked up per second (default: %(default)s)",
+    )
+    parser.add_argument("--limit", type=int, help="Stop after this many books")
+    args = parser.parse_args()
+
+    if args.restart and os.path.exists(args.checkpoint):
+        os.remove(args.checkpoint)
+
+    progress = asyncio.run(run(args))
+    print(progress.summary())
+
+
+if __name__ == "__main__":
+    main()
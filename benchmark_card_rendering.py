@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Script to compare rendering book cards from ORM entities and from read models.
+
+Fills a scratch SQLite database with one user's library, then reads and
+renders it as the book list does, both ways:
+
+    python benchmark_card_rendering.py
+    python benchmark_card_rendering.py --books 10000 --notes-size 4000
+
+"entities" loads whole ``Book`` instances (the old path), "cards" selects
+the card columns into ``read_models.BookCard`` (the new path). For each it
+prints the time to read the rows, the time to render them, the peak memory
+of doing both and how many objects the session ended up holding.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from datetime import timedelta
+
+from fastapi.templating import Jinja2Templates
+from sqlalchemy import create_engine
+from sqlalchemy import insert
+from sqlalchemy.orm import sessionmaker
+
+# Add the current directory to the path so we can import the app modules
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app import models
+from app import read_models
+from app.book_routes import LIST_ORDERINGS
+from app.book_routes import group_page
+from app.jinja_filters import register_filters
+from app.pagination import paginate
+
+TEMPLATES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app", "templates")
+
+
+def fill(session_factory, books: int, notes_size: int) -> int:
+    """Create a user with ``books`` books and return the user's id."""
+    with session_factory() as db:
+        user = models.User(email="bench@example.com", hashed_password="x", created_at=datetime.now())
+        db.add(user)
+        db.flush()
+        start = datetime(2020, 1, 1)
+        notes = ("Notes on the plot, the characters and the prose. " * (notes_size // 50 + 1))[:notes_size]
+        statuses = list(models.BookStatus)
+        db.execute(insert(models.Book), [
+            {
+                "title": f"Title {n}",
+                "author": f"Author {n % 400}",
+                "status": statuses[n % len(statuses)],
+                "notes": notes,
+                "rating": n % 4,
+                "genres": ["Fiction", "Fantasy", "Adventure", "Classics"],
+                "publication_date": "1999",
+                "page_count": 320,
+                "cover_id": n,
+                "created_at": start + timedelta(minutes=n),
+                "updated_at": start + timedelta(minutes=n),
+                "user_id": user.id,
+            }
+            for n in range(books)
+        ])
+        db.commit()
+        return user.id
+
+
+def run(session_factory, template, user_id: int, books: int, lean: bool) -> tuple[float, float, int, int]:
+    """
+    Read and render the whole library as one page of the list.
+
+    Returns:
+        Milliseconds reading, milliseconds rendering, peak bytes and the
+        number of objects left in the session
+    """
+    with session_factory() as db:
+        query = read_models.card_query(db) if lean else db.query(models.Book)
+        query = query.filter(models.Book.user_id == user_id)
+        into = read_models.BookCard if lean else None
+
+        tracemalloc.start()
+        start = time.perf_counter()
+        page = paginate(query, LIST_ORDERINGS["author"], limit=books, into=into)
+        read = time.perf_counter()
+        template.render(groups=group_page(page), snippets={}, next_url=None)
+        rendered = time.perf_counter()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return (read - start) * 1000, (rendered - read) * 1000, peak, len(db.identity_map)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--books", type=int, default=10000, help="Books in the library (default: %(default)s)")
+    parser.add_argument("--notes-size", type=int, default=2000, help="Characters of notes per book (default: %(default)s)")
+    parser.add_argument("--rounds", type=int, default=3, help="Runs per variant (default: %(default)s)")
+    args = parser.parse_args()
+
+    templates = Jinja2Templates(directory=TEMPLATES_DIR)
+    register_filters(templates)
+    template = templates.get_template("books/list_page.html")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        models.Base.metadata.create_all(engine)
+        session_factory = sessionmaker(bind=engine)
+        user_id = fill(session_factory, args.books, args.notes_size)
+
+        print(f"{args.books} books, {args.notes_size} characters of notes each\n")
+        print(f"{'variant':<10}{'read ms':>12}{'render ms':>12}{'peak MiB':>12}{'in session':>12}")
+        for variant, lean in (("entities", False), ("cards", True)):
+            results = [run(session_factory, template, user_id, args.books, lean) for _ in range(args.rounds)]
+            read_ms, render_ms, peak, held = min(results)
+            print(f"{variant:<10}{read_ms:>12.1f}{render_ms:>12.1f}{peak / 2**20:>12.1f}{held:>12}")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
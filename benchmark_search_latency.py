@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Script to benchmark search latency and upstream fan-out against a fake Open Library.
+
+Runs searches with fetch_details through openlibrary_service against the
+stand-in server from tests/fake_openlibrary.py, mounted in-process, under a
+few upstream conditions:
+
+    python benchmark_search_latency.py
+    python benchmark_search_latency.py --scenario degraded --searches 50 --concurrency 10
+
+For every scenario it prints the search latency percentiles, the upstream
+requests per search, the peak number of concurrent upstream requests and how
+many searches failed. Every search is for a different query and each
+scenario starts with an empty Open Library cache, so lookups are cold. The rate limiter is private to the run and uses
+the configured limits unless --rate-limit is given.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import logging
+import os
+import statistics
+import sys
+import time
+
+import httpx
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+# Add the current directory to the path so we can import the app modules
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "tests"))
+
+from app.models import Base
+from app.services import local_catalog
+from app.services import openlibrary_cache
+from app.services import openlibrary_service
+from app.services.rate_limit import RateLimiter
+from fake_openlibrary import Faults
+from fake_openlibrary import FakeOpenLibrary
+
+SCENARIOS = {
+    "ideal": Faults(),
+    "realistic": Faults(latency=0.15, jitter=0.15, error_rate=0.01),
+    "slow": Faults(latency=0.8, jitter=0.8),
+    "degraded": Faults(latency=0.3, jitter=0.5, error_rate=0.1, throttle_rate=0.05),
+    "throttled": Faults(latency=0.1, jitter=0.05, max_rps=10),
+}
+
+
+def fresh_cache() -> None:
+    """Point the Open Library cache at an empty in-memory database."""
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(bind=engine)
+    openlibrary_cache.session_factory = sessionmaker(bind=engine)
+
+
+async def run_scenario(name: str, faults: Faults, args: argparse.Namespace) -> None:
+    fake = FakeOpenLibrary(faults, seed=0)
+    await openlibrary_service.close_client()
+    await openlibrary_service.open_client(httpx.ASGITransport(app=fake))
+    openlibrary_service.breaker.reset()
+    openlibrary_service.limiter = RateLimiter(
+        "openlibrary",
+        ":memory:",
+        rate=args.rate_limit,
+        burst=openlibrary_service.RATE_LIMIT_BURST,
+        max_concurrent=openlibrary_service.MAX_CONCURRENT_REQUESTS,
+    )
+    fresh_cache()
+
+    semaphore = asyncio.Semaphore(args.concurrency)
+    latencies: list[float] = []
+    failures = 0
+
+    async def one_search(n: int) -> None:
+        nonlocal failures
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                await openlibrary_service.search_books(
+                    f"benchmark query {n}", limit=args.limit, fetch_details=True
+                )
+            except Exception:
+                failures += 1
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    # Keep the service's debug output out of the table
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        await asyncio.gather(*(one_search(n) for n in range(args.searches)))
+    await openlibrary_service.close_client()
+
+    cuts = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+    print(
+        f"{name:<12}{cuts[49]:>10.0f}{cuts[94]:>10.0f}{cuts[98]:>10.0f}"
+        f"{fake.stats['requests'] / args.searches:>12.1f}"
+        f"{fake.stats['peak_in_flight']:>10}{failures:>10}"
+        f"{openlibrary_service.breaker.stats['opened']:>10}"
+    )
+
+
+async def run(args: argparse.Namespace) -> None:
+    # Only the fake upstream is searched, never a local catalog
+    local_catalog.CATALOG_PATH = os.path.join(local_catalog.data_dir, "no-such-catalog.db")
+    logging.disable(logging.WARNING)
+    openlibrary_service.OPENLIBRARY_URL = "http://openlibrary.test"
+    print(f"{args.searches} searches, {args.concurrency} at a time, {args.limit} results each\n")
+    print(
+        f"{'scenario':<12}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+        f"{'calls/srch':>12}{'peak':>10}{'failed':>10}{'trips':>10}"
+    )
+    names = args.scenario or list(SCENARIOS)
+    for name in names:
+        await run_scenario(name, SCENARIOS[name], args)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--scenario", action="append", choices=sorted(SCENARIOS), help="Scenario to run (default: all)"
+    )
+    parser.add_argument("--searches", type=int, default=30, help="Searches per scenario (default: %(default)s)")
+    parser.add_argument("--concurrency", type=int, default=5, help="Searches at a time (default: %(default)s)")
+    parser.add_argument("--limit", type=int, default=10, help="Results per search (default: %(default)s)")
+    parser.add_argument(
+        "--rate-limit",
+        type=float,
+        default=openlibrary_service.RATE_LIMIT,
+        help="Upstream requests per second, 0 for none (default: %(default)s)",
+    )
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Script to compare Open Library search payload sizes and parse costs.
+
+Record full and trimmed (``fields=``) search.json responses for a few
+queries, then benchmark them offline:
+
+    python benchmark_search_payloads.py --record "harry potter" "tolkien"
+    python benchmark_search_payloads.py
+
+For every recorded query it prints the bytes transferred, the parse time and
+the peak memory of parsing the full response with json.loads (the old path)
+against parsing the trimmed one with parse_search_docs (the new path).
+
+With no recordings it runs on a SYNTHETIC response built to look like a
+popular title's search; its rows are labelled as such and say nothing about
+real Open Library payloads.
+"""
+
+import argparse
+import asyncio
+import glob
+import json
+import os
+import re
+import sys
+import time
+import tracemalloc
+
+import httpx
+
+# Add the current directory to the path so we can import the app modules
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.services import openlibrary_service
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tests", "fixtures", "search_payloads")
+
+
+def record(queries: list[str], limit: int) -> None:
+    """Save the full and trimmed responses of each query to FIXTURES_DIR."""
+    os.makedirs(FIXTURES_DIR, exist_ok=True)
+    url = f"{openlibrary_service.OPENLIBRARY_URL}/search.json"
+    with httpx.Client(timeout=30) as client:
+        for query in queries:
+            slug = re.sub(r"\W+", "_", query.casefold()).strip("_")
+            for variant, extra in (("full", {}), ("trimmed", {"fields": openlibrary_service.SEARCH_FIELDS})):
+                response = client.get(url, params={"q": query, "limit": limit, **extra})
+                response.raise_for_status()
+                path = os.path.join(FIXTURES_DIR, f"{slug}.{variant}.json")
+                with open(path, "wb") as f:
+                    f.write(response.content)
+                print(f"Recorded {path} ({len(response.content)} bytes)")
+
+
+def synthetic_payloads(limit: int) -> dict[str, tuple[bytes, bytes]]:
+    """Build a full/trimmed pair shaped like a search for a popular title."""
+    fields = openlibrary_service.SEARCH_FIELDS.split(",")
+    docs = []
+    for n in range(limit):
+        docs.append({
+            "key": f"/works/OL{n}W",
+            "title": f"Popular Title {n}",
+            "author_name": ["Some Author"],
+            "first_publish_year": 1997,
+            "cover_i": 1000 + n,
+            "cover_edition_key": f"OL{n}0M",
+            "edition_key": [f"OL{n}{e}M" for e in range(400)],
+            "isbn": [f"978{n:03d}{e:07d}" for e in range(800)],
+            "publisher": [f"Publisher {p}" for p in range(150)],
+            "subject": [f"Subject {s}" for s in range(200)],
+            "language": ["eng", "fre", "ger", "spa"],
+            "number_of_pages_median": 320,
+            "id_goodreads": [str(e) for e in range(300)],
+            "id_librarything": [str(e) for e in range(100)],
+            "publish_date": [f"{e} January 2001" for e in range(200)],
+            "publish_place": [f"Place {e}" for e in range(100)],
+            "contributor": [f"Contributor {e}" for e in range(50)],
+            "ia": [f"ia_identifier_{e}" for e in range(100)],
+        })
+    full = {"numFound": limit, "start": 0, "docs": docs, "q": "popular"}
+    trimmed = {**full, "docs": [{k: v for k, v in doc.items() if k in fields} for doc in docs]}
+    return {"synthetic (not recorded)": (json.dumps(full).encode(), json.dumps(trimmed).encode())}
+
+
+def recorded_payloads() -> dict[str, tuple[bytes, bytes]]:
+    """Load the recorded full/trimmed pairs from FIXTURES_DIR."""
+    payloads = {}
+    for full_path in sorted(glob.glob(os.path.join(FIXTURES_DIR, "*.full.json"))):
+        trimmed_path = full_path.replace(".full.json", ".trimmed.json")
+        if not os.path.exists(trimmed_path):
+            continue
+        with open(full_path, "rb") as f, open(trimmed_path, "rb") as g:
+            payloads[os.path.basename(full_path).removesuffix(".full.json")] = (f.read(), g.read())
+    return payloads
+
+
+def measure(parse, rounds: int) -> tuple[float, int]:
+    """Return the mean parse time in ms and the peak memory in bytes of one parse."""
+    tracemalloc.start()
+    parse()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    start = time.perf_counter()
+    for _ in range(rounds):
+        parse()
+    return (time.perf_counter() - start) / rounds * 1000, peak
+
+
+def benchmark(payloads: dict[str, tuple[bytes, bytes]], rounds: int) -> None:
+    async def chunks(body: bytes):
+        # Roughly what httpx hands over per read
+        for start in range(0, len(body), 65536):
+            yield body[start:start + 65536]
+
+    print(f"{'query':<28}{'variant':<10}{'bytes':>12}{'parse ms':>12}{'peak KiB':>12}")
+    for name, (full, trimmed) in payloads.items():
+        results = {
+            "before": (len(full), *measure(lambda full=full: json.loads(full)["docs"], rounds)),
+            "after": (len(trimmed), *measure(
+                lambda trimmed=trimmed: asyncio.run(
+                    openlibrary_service.parse_search_docs(chunks(trimmed))
+                ),
+                rounds,
+            )),
+        }
+        for variant, (size, ms, peak) in results.items():
+            print(f"{name:<28}{variant:<10}{size:>12}{ms:>12.2f}{peak / 1024:>12.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--record", nargs="+", metavar="QUERY", help="Record responses for these queries")
+    parser.add_argument("--limit", type=int, default=20, help="Results per search (default: %(default)s)")
+    parser.add_argument("--rounds", type=int, default=20, help="Parses per measurement (default: %(default)s)")
+    args = parser.parse_args()
+
+    if args.record:
+        record(args.record, args.limit)
+        return
+
+    payloads = recorded_payloads()
+    if not payloads:
+        print(
+            f"No recordings in {FIXTURES_DIR}; the numbers below are for a SYNTHETIC\n"
+            "response, not recorded data. Record real ones with --record QUERY ...\n"
+        )
+        payloads = synthetic_payloads(args.limit)
+    benchmark(payloads, args.rounds)
+
+
+if __name__ == "__main__":
+    main()
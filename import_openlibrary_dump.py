@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Script to build the local Open Library catalog from bulk dump files.
+
+Download the authors, works and editions dumps from
+https://openlibrary.org/developers/dumps and pass them to this script:
+
+    python import_openlibrary_dump.py ol_dump_authors_latest.txt.gz \
+        ol_dump_works_latest.txt.gz ol_dump_editions_latest.txt.gz
+
+The import can be interrupted and re-run; it resumes after the last
+committed batch. Set OPENLIBRARY_SEARCH_MODE=local_first to use the catalog.
+"""
+
+import argparse
+import logging
+import os
+import sys
+
+# Set up logging
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    handlers=[logging.StreamHandler()]
+)
+
+# Add the current directory to the path so we can import the app modules
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.services import catalog_import
+from app.services import local_catalog
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("dumps", nargs="+", help="Open Library dump files (.txt.gz)")
+    parser.add_argument(
+        "--catalog",
+        default=local_catalog.CATALOG_PATH,
+        help="Catalog database to write (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=catalog_import.BATCH_SIZE,
+        help="Lines written per transaction (default: %(default)s)",
+    )
+    args = parser.parse_args()
+
+    catalog_import.import_dumps(args.dumps, catalog_path=args.catalog, batch_size=args.batch_size)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""add_enrichment_jobs
+
+Revision ID: 3f9a6c2b7d14
+Revises: 8c4f2a7d9e10
+Create Date: 2026-10-16 16:40:00.000000
+
+"""
+from collections.abc import Sequence
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f9a6c2b7d14'
+down_revision: str | None = '8c4f2a7d9e10'
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'enrichment_jobs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('book_id', sa.Integer(), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('next_attempt_at', sa.DateTime(), nullable=False),
+        sa.Column('locked_until', sa.DateTime(), nullable=True),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['book_id'], ['books.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('book_id'),
+    )
+    op.create_index(op.f('ix_enrichment_jobs_id'), 'enrichment_jobs', ['id'], unique=False)
+    op.create_index(
+        op.f('ix_enrichment_jobs_next_attempt_at'),
+        'enrichment_jobs',
+        ['next_attempt_at'],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_enrichment_jobs_next_attempt_at'), table_name='enrichment_jobs')
+    op.drop_index(op.f('ix_enrichment_jobs_id'), table_name='enrichment_jobs')
+    op.drop_table('enrichment_jobs')
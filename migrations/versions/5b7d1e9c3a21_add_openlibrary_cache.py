@@ -0,0 +1,38 @@
+"""add_openlibrary_cache
+
+Revision ID: 5b7d1e9c3a21
+Revises: update_book_genres
+Create Date: 2026-10-16 09:12:00.000000
+
+"""
+from collections.abc import Sequence
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b7d1e9c3a21'
+down_revision: str | None = 'update_book_genres'
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'openlibrary_cache',
+        sa.Column('resource_id', sa.String(length=255), nullable=False),
+        sa.Column('payload', sa.JSON(), nullable=True),
+        sa.Column('found', sa.Boolean(), nullable=False),
+        sa.Column('fetched_at', sa.DateTime(), nullable=False),
+        sa.Column('expires_at', sa.DateTime(), nullable=False),
+        sa.Column('etag', sa.String(length=255), nullable=True),
+        sa.Column('last_modified', sa.String(length=64), nullable=True),
+        sa.PrimaryKeyConstraint('resource_id'),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('openlibrary_cache')
@@ -0,0 +1,31 @@
+"""add_cover_to_books
+
+Revision ID: 8c4f2a7d9e10
+Revises: 5b7d1e9c3a21
+Create Date: 2026-10-16 14:05:00.000000
+
+"""
+from collections.abc import Sequence
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8c4f2a7d9e10'
+down_revision: str | None = '5b7d1e9c3a21'
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('books', sa.Column('cover_id', sa.Integer(), nullable=True))
+    op.add_column('books', sa.Column('cover_url', sa.String(length=255), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('books') as batch_op:
+        batch_op.drop_column('cover_url')
+        batch_op.drop_column('cover_id')
@@ -0,0 +1,71 @@
+"""add_books_fts
+
+Revision ID: b6e21d4c9f03
+Revises: 3f9a6c2b7d14
+Create Date: 2026-10-16 19:05:00.000000
+
+"""
+from collections.abc import Sequence
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b6e21d4c9f03'
+down_revision: str | None = '3f9a6c2b7d14'
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # FTS5 is SQLite only; other engines keep filtering with ILIKE
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    op.execute(
+        """
+        CREATE VIRTUAL TABLE books_fts USING fts5(
+            title, author, notes,
+            content='books', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2'
+        )
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER books_fts_insert AFTER INSERT ON books BEGIN
+            INSERT INTO books_fts(rowid, title, author, notes)
+            VALUES (new.id, new.title, new.author, new.notes);
+        END
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER books_fts_delete AFTER DELETE ON books BEGIN
+            INSERT INTO books_fts(books_fts, rowid, title, author, notes)
+            VALUES ('delete', old.id, old.title, old.author, old.notes);
+        END
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER books_fts_update AFTER UPDATE OF title, author, notes ON books BEGIN
+            INSERT INTO books_fts(books_fts, rowid, title, author, notes)
+            VALUES ('delete', old.id, old.title, old.author, old.notes);
+            INSERT INTO books_fts(rowid, title, author, notes)
+            VALUES (new.id, new.title, new.author, new.notes);
+        END
+        """
+    )
+    # Index the books that already exist
+    op.execute("INSERT INTO books_fts(books_fts) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    op.execute("DROP TRIGGER IF EXISTS books_fts_update")
+    op.execute("DROP TRIGGER IF EXISTS books_fts_delete")
+    op.execute("DROP TRIGGER IF EXISTS books_fts_insert")
+    op.execute("DROP TABLE IF EXISTS books_fts")
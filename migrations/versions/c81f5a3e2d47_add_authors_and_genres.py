@@ -0,0 +1,141 @@
+"""add_authors_and_genres
+
+Revision ID: c81f5a3e2d47
+Revises: e4a7c1d9b582
+Create Date: 2026-10-16 21:30:00.000000
+
+"""
+from collections.abc import Sequence
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c81f5a3e2d47'
+down_revision: str | None = 'e4a7c1d9b582'
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+# Books backfilled per statement, so no single statement holds the lock long
+BACKFILL_BATCH = 1000
+
+SYNC = """
+    INSERT OR IGNORE INTO genres(name)
+        SELECT trim(value) FROM json_each(CASE WHEN json_valid(new.genres) THEN new.genres END)
+        WHERE type = 'text' AND trim(value) != '';
+    INSERT OR IGNORE INTO book_genres(book_id, genre_id)
+        SELECT new.id, genres.id
+        FROM json_each(CASE WHEN json_valid(new.genres) THEN new.genres END) AS g
+        JOIN genres ON genres.name = trim(g.value)
+        WHERE g.type = 'text';
+    INSERT OR IGNORE INTO authors(name) SELECT trim(new.author) WHERE trim(new.author) != '';
+    UPDATE books SET author_id = (SELECT id FROM authors WHERE name = trim(new.author))
+        WHERE id = new.id;
+"""
+
+BACKFILL = [
+    """
+    INSERT OR IGNORE INTO genres(name)
+        SELECT trim(g.value)
+        FROM books, json_each(CASE WHEN json_valid(books.genres) THEN books.genres END) AS g
+        WHERE books.id > :start AND books.id <= :end
+          AND g.type = 'text' AND trim(g.value) != ''
+    """,
+    """
+    INSERT OR IGNORE INTO book_genres(book_id, genre_id)
+        SELECT books.id, genres.id
+        FROM books, json_each(CASE WHEN json_valid(books.genres) THEN books.genres END) AS g
+        JOIN genres ON genres.name = trim(g.value)
+        WHERE books.id > :start AND books.id <= :end AND g.type = 'text'
+    """,
+    """
+    INSERT OR IGNORE INTO authors(name)
+        SELECT trim(author) FROM books
+        WHERE id > :start AND id <= :end AND trim(author) != ''
+    """,
+    """
+    UPDATE books SET author_id = (SELECT id FROM authors WHERE name = trim(books.author))
+        WHERE id > :start AND id <= :end
+    """,
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'authors',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=255), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('name'),
+    )
+    op.create_table(
+        'genres',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=255), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('name'),
+    )
+    op.create_table(
+        'book_genres',
+        sa.Column('book_id', sa.Integer(), nullable=False),
+        sa.Column('genre_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['book_id'], ['books.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['genre_id'], ['genres.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('book_id', 'genre_id'),
+    )
+    op.create_index('ix_book_genres_genre_book', 'book_genres', ['genre_id', 'book_id'])
+    # Plain ADD COLUMN without a foreign key; batch mode would recreate books
+    # and lose its triggers
+    op.add_column('books', sa.Column('author_id', sa.Integer(), nullable=True))
+    op.create_index(op.f('ix_books_author_id'), 'books', ['author_id'], unique=False)
+
+    # The triggers and the backfill use SQLite's JSON functions; other engines
+    # filter genres on the JSON column
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    op.execute(
+        f"""
+        CREATE TRIGGER books_catalog_insert AFTER INSERT ON books BEGIN
+            {SYNC}
+        END
+        """
+    )
+    op.execute(
+        f"""
+        CREATE TRIGGER books_catalog_update AFTER UPDATE OF author, genres ON books BEGIN
+            DELETE FROM book_genres WHERE book_id = old.id;
+            {SYNC}
+        END
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER books_catalog_delete AFTER DELETE ON books BEGIN
+            DELETE FROM book_genres WHERE book_id = old.id;
+        END
+        """
+    )
+
+    # Fill the tables from the existing books, a range of ids at a time
+    bind = op.get_bind()
+    last_id = bind.execute(sa.text('SELECT coalesce(max(id), 0) FROM books')).scalar()
+    for start in range(0, last_id, BACKFILL_BATCH):
+        for statement in BACKFILL:
+            bind.execute(sa.text(statement), {'start': start, 'end': start + BACKFILL_BATCH})
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name == 'sqlite':
+        op.execute("DROP TRIGGER IF EXISTS books_catalog_delete")
+        op.execute("DROP TRIGGER IF EXISTS books_catalog_update")
+        op.execute("DROP TRIGGER IF EXISTS books_catalog_insert")
+    op.drop_index(op.f('ix_books_author_id'), table_name='books')
+    # SQLite can drop a plain column in place (3.35+)
+    op.drop_column('books', 'author_id')
+    op.drop_index('ix_book_genres_genre_book', table_name='book_genres')
+    op.drop_table('book_genres')
+    op.drop_table('genres')
+    op.drop_table('authors')
@@ -0,0 +1,35 @@
+"""add_books_access_path_indexes
+
+Revision ID: e4a7c1d9b582
+Revises: b6e21d4c9f03
+Create Date: 2026-10-16 20:10:00.000000
+
+"""
+from collections.abc import Sequence
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4a7c1d9b582'
+down_revision: str | None = 'b6e21d4c9f03'
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Plain CREATE INDEX; batch mode would recreate books and lose the
+    # books_fts triggers
+    op.create_index('ix_books_user_status_updated', 'books', ['user_id', 'status', 'updated_at'])
+    op.create_index('ix_books_user_created', 'books', ['user_id', 'created_at'])
+    op.create_index(
+        'ix_books_user_status_completion', 'books', ['user_id', 'status', 'completion_date']
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_books_user_status_completion', table_name='books')
+    op.drop_index('ix_books_user_created', table_name='books')
+    op.drop_index('ix_books_user_status_updated', table_name='books')
@@ -28,6 +28,7 @@ from app.database import SessionLocal
 from app.models import Book
 from app.models import BookStatus
 from app.models import User
+from app.services import enrichment
 
 # Import sample book data from populate_books.py
 from populate_books import SAMPLE_BOOKS
@@ -82,6 +83,7 @@ def create_random_books(user_id, num_books=30):
         now = datetime.utcnow()
 
         # Create and add books
+        books = []
         for book_data in enumerate(selected_books):
             # Randomly select a status
             status = random.choice(list(BookStatus))
@@ -125,11 +127,16 @@ def create_random_books(user_id, num_books=30):
             )
 
             db.add(book)
+            books.append(book)
             logger.info(f"Added book: {book.title} by {book.author} (Status: {book.status.value})")
 
         db.commit()
         logger.info(f"Successfully added {num_books} books to the demo user's library")
 
+        # The app's enrichment workers fill in page counts, genres and dates
+        queued = sum(enrichment.enqueue(db, book) for book in books)
+        logger.info(f"Queued {queued} books for metadata enrichment")
+
     except Exception as e:
         db.rollback()
         logger.error(f"Error adding books: {e}")
@@ -16,6 +16,8 @@ from app.main import app
 from app.models import Base  # Import Base from models and all models
 from app.models import User  # Import Base from models and all models
 from app.roles import ensure_default_roles_exist
+from app.services import openlibrary_service
+from app.services.rate_limit import RateLimiter
 
 # Create and configure test-specific templates
 test_templates = Jinja2Templates(directory="app/templates")
@@ -109,6 +111,20 @@ def client():
     return CustomTestClient(app)
 
 
+@pytest.fixture(autouse=True)
+def openlibrary_rate_limiter(monkeypatch):
+    """Give each test its own in-memory Open Library rate limiter."""
+    limiter = RateLimiter(
+        "openlibrary",
+        ":memory:",
+        rate=openlibrary_service.RATE_LIMIT,
+        burst=openlibrary_service.RATE_LIMIT_BURST,
+        max_concurrent=openlibrary_service.MAX_CONCURRENT_REQUESTS,
+    )
+    monkeypatch.setattr(openlibrary_service, "limiter", limiter)
+    return limiter
+
+
 @pytest.fixture
 def test_password():
     """Return a test password."""
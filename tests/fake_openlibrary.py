@@ -0,0 +1,311 @@
+"""
+Local stand-in for the Open Library API, for tests and offline benchmarks.
+
+Serves ``search.json``, ``works/{id}.json``, ``works/{id}/editions.json``,
+``books/{id}.json`` and ``api/books`` (by edition id, or by ISBN with
+``jscmd=data``) from JSON files under a fixtures directory laid out like the
+URL paths (``search/<query slug>.json``, ``works/OL1W.json``,
+``works/OL1W/editions.json``, ``books/OL1M.json``, ``isbn/<isbn>.json``).
+Anything without a fixture is generated deterministically from its key, so
+any query fans out to works and editions with plausible fields, and about a
+third of the editions have no page count, like the real data.
+
+Upstream conditions are set with ``Faults``: a latency with uniform jitter
+per response, the share of responses answered with a 500 or a 429, and a
+requests-per-second cap above which requests are throttled with 429.
+
+In tests, mount it on the service's client with ``httpx.ASGITransport``. To
+run it as a server and point the app at it:
+
+    FAKE_OL_LATENCY=0.2 uvicorn fake_openlibrary:app --app-dir tests --port 8081
+    OPENLIBRARY_BASE_URL=http://127.0.0.1:8081 uvicorn app.main:app
+"""
+import asyncio
+import json
+import os
+import random
+import re
+import time
+import zlib
+from dataclasses import dataclass
+from typing import Any
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "openlibrary")
+
+SUBJECTS = [
+    "Fiction", "Science fiction", "Fantasy", "History", "Biography", "Poetry",
+    "Mystery", "Romance", "Philosophy", "Travel", "Politics", "Adventure",
+]
+EDITIONS_PER_WORK = 8
+DEFAULT_SEARCH_LIMIT = 100
+
+
+@dataclass
+class Faults:
+    """Upstream conditions simulated by the fake server."""
+
+    latency: float = 0.0  # Seconds added to every response
+    jitter: float = 0.0  # Up to this many seconds added on top, uniformly
+    error_rate: float = 0.0  # Share of responses answered with 500
+    throttle_rate: float = 0.0  # Share of responses answered with 429
+    max_rps: float = 0.0  # Requests per second before answering 429 (0 = no cap)
+
+    @classmethod
+    def from_env(cls) -> "Faults":
+        return cls(
+            latency=float(os.getenv("FAKE_OL_LATENCY", "0")),
+            jitter=float(os.getenv("FAKE_OL_JITTER", "0")),
+            error_rate=float(os.getenv("FAKE_OL_ERROR_RATE", "0")),
+            throttle_rate=float(os.getenv("FAKE_OL_THROTTLE_RATE", "0")),
+            max_rps=float(os.getenv("FAKE_OL_MAX_RPS", "0")),
+        )
+
+
+def slugify(query: str) -> str:
+    return re.sub(r"\W+", "_", query.casefold()).strip("_")
+
+
+def _number(key: str) -> int:
+    """The numeric part of an Open Library id like OL123W."""
+    match = re.search(r"\d+", key)
+    return int(match.group(0)) if match else zlib.crc32(key.encode())
+
+
+def synthetic_edition(edition_id: str) -> dict[str, Any]:
+    n = _number(edition_id)
+    rng = random.Random(n)
+    work_id = f"OL{n // EDITIONS_PER_WORK}W"
+    edition: dict[str, Any] = {
+        "key": f"/books/{edition_id}",
+        "title": f"Book {n // EDITIONS_PER_WORK}",
+        "works": [{"key": f"/works/{work_id}"}],
+        "publish_date": str(rng.randint(1950, 2024)),
+        "publishers": [f"Publisher {rng.randint(1, 50)}"],
+        "languages": [{"key": "/languages/eng" if rng.random() < 0.7 else "/languages/fre"}],
+    }
+    if rng.random() > 0.35:
+        edition["number_of_pages"] = rng.randint(90, 900)
+    if rng.random() > 0.5:
+        edition["subjects"] = rng.sample(SUBJECTS, 2)
+    return edition
+
+
+def synthetic_work(work_id: str) -> dict[str, Any]:
+    n = _number(work_id)
+    rng = random.Random(n)
+    return {
+        "key": f"/works/{work_id}",
+        "title": f"Book {n}",
+        "subjects": rng.sample(SUBJECTS, 3),
+        "description": f"A synthetic description of book {n}.",
+        "first_publish_date": str(rng.randint(1900, 2020)),
+        "covers": [n],
+    }
+
+
+def synthetic_editions(work_id: str, limit: int) -> dict[str, Any]:
+    n = _number(work_id)
+    entries = [
+        synthetic_edition(f"OL{n * EDITIONS_PER_WORK + i}M")
+        for i in range(min(limit, EDITIONS_PER_WORK))
+    ]
+    return {"links": {"work": f"/works/{work_id}"}, "size": EDITIONS_PER_WORK, "entries": entries}
+
+
+def synthetic_isbn_record(isbn: str) -> dict[str, Any]:
+    """An ``api/books?jscmd=data`` record for an ISBN, built from a synthetic edition."""
+    n = int(isbn) % 10**7
+    edition = synthetic_edition(f"OL{n}M")
+    record: dict[str, Any] = {
+        "key": edition["key"],
+        "title": edition["title"],
+        "authors": [{"name": f"Author {n % 500 + 1}"}],
+        "publishers": [{"name": name} for name in edition["publishers"]],
+        "publish_date": edition["publish_date"],
+        "identifiers": {"isbn_13": [isbn], "openlibrary": [f"OL{n}M"]},
+        "cover": {"medium": f"https://covers.openlibrary.org/b/id/{n}-M.jpg"},
+    }
+    if "number_of_pages" in edition:
+        record["number_of_pages"] = edition["number_of_pages"]
+    if "subjects" in edition:
+        record["subjects"] = [{"name": name} for name in edition["subjects"]]
+    return record
+
+
+def synthetic_search(query: str, limit: int) -> dict[str, Any]:
+    base = zlib.crc32(slugify(query).encode()) % 1_000_000 * 100
+    docs = []
+    for i in range(limit):
+        n = base + i
+        rng = random.Random(n)
+        edition_keys = [f"OL{n * EDITIONS_PER_WORK + j}M" for j in range(EDITIONS_PER_WORK)]
+        docs.append({
+            "key": f"/works/OL{n}W",
+            "title": f"{query.title()} {i + 1}",
+            "author_name": [f"Author {rng.randint(1, 500)}"],
+            "first_publish_year": rng.randint(1900, 2020),
+            "cover_i": n,
+            "cover_edition_key": edition_keys[0],
+            "edition_key": edition_keys,
+            "edition_count": EDITIONS_PER_WORK,
+            "isbn": [f"978{rng.randint(10**9, 10**10 - 1)}"],
+            "publisher": [f"Publisher {rng.randint(1, 50)}"],
+            "subject": rng.sample(SUBJECTS, 4),
+            "language": ["eng"],
+            "ia": [f"book{n}00"],
+            "id_goodreads": [str(rng.randint(10**5, 10**7))],
+        })
+    return {"numFound": limit, "start": 0, "docs": docs}
+
+
+class FakeOpenLibrary:
+    """ASGI app imitating the parts of Open Library ``openlibrary_service`` uses."""
+
+    def __init__(
+        self,
+        faults: Faults | None = None,
+        fixtures_dir: str = FIXTURES_DIR,
+        seed: int | None = None,
+    ):
+        self.faults = faults or Faults()
+        self.fixtures_dir = fixtures_dir
+        # ISBNs answered as unknown to Open Library
+        self.missing_isbns: set[str] = set()
+        self.random = random.Random(seed)
+        self._window_start = 0.0
+        self._window_count = 0
+        self.in_flight = 0
+        self.stats: dict[str, Any] = {}
+        self.reset_stats()
+        self.app = Starlette(routes=[
+            Route("/search.json", self.search),
+            Route("/api/books", self.api_books),
+            Route("/works/{work_id}/editions.json", self.editions),
+            Route("/works/{work_id}.json", self.work),
+            Route("/books/{edition_id}.json", self.edition),
+        ])
+
+    async def __call__(self, scope, receive, send):
+        await self.app(scope, receive, send)
+
+    def reset_stats(self) -> None:
+        self.stats = {
+            "requests": 0,
+            "by_endpoint": {},
+            "errors": 0,
+            "throttled": 0,
+            "peak_in_flight": 0,
+        }
+
+    def _fixture(self, *parts: str) -> Any | None:
+        path = os.path.join(self.fixtures_dir, *parts)
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            return json.load(f)
+
+    def _over_rate(self) -> bool:
+        if not self.faults.max_rps:
+            return False
+        now = time.monotonic()
+        if now - self._window_start >= 1:
+            self._window_start, self._window_count = now, 0
+        self._window_count += 1
+        return self._window_count > self.faults.max_rps
+
+    async def _respond(self, endpoint: str, build) -> JSONResponse:
+        """Apply the configured faults, then answer with ``build()``."""
+        self.stats["requests"] += 1
+        self.stats["by_endpoint"][endpoint] = self.stats["by_endpoint"].get(endpoint, 0) + 1
+        self.in_flight += 1
+        self.stats["peak_in_flight"] = max(self.stats["peak_in_flight"], self.in_flight)
+        try:
+            delay = self.faults.latency + self.random.uniform(0, self.faults.jitter)
+            if delay:
+                await asyncio.sleep(delay)
+            roll = self.random.random()
+            if self._over_rate() or roll < self.faults.throttle_rate:
+                self.stats["throttled"] += 1
+                return JSONResponse({"error": "Too Many Requests"}, status_code=429)
+            if roll < self.faults.throttle_rate + self.faults.error_rate:
+                self.stats["errors"] += 1
+                return JSONResponse({"error": "Internal Server Error"}, status_code=500)
+            body = build()
+            if body is None:
+                return JSONResponse({"error": "notfound"}, status_code=404)
+            return JSONResponse(body)
+        finally:
+            self.in_flight -= 1
+
+    async def search(self, request: Request) -> JSONResponse:
+        query = request.query_params.get("q", "")
+        limit = int(request.query_params.get("limit", DEFAULT_SEARCH_LIMIT))
+        fields = request.query_params.get("fields")
+
+        def build():
+            data = self._fixture("search", f"{slugify(query)}.json") or synthetic_search(query, limit)
+            docs = data["docs"][:limit]
+            if fields and fields != "*":
+                wanted = fields.split(",")
+                docs = [{k: v for k, v in doc.items() if k in wanted} for doc in docs]
+            return {**data, "docs": docs}
+
+        return await self._respond("search", build)
+
+    async def work(self, request: Request) -> JSONResponse:
+        work_id = request.path_params["work_id"]
+        return await self._respond(
+            "works",
+            lambda: self._fixture("works", f"{work_id}.json") or synthetic_work(work_id),
+        )
+
+    async def editions(self, request: Request) -> JSONResponse:
+        work_id = request.path_params["work_id"]
+        limit = int(request.query_params.get("limit", 50))
+
+        def build():
+            data = self._fixture("works", work_id, "editions.json")
+            if data is None:
+                return synthetic_editions(work_id, limit)
+            return {**data, "entries": data["entries"][:limit]}
+
+        return await self._respond("editions", build)
+
+    def _edition(self, edition_id: str) -> dict[str, Any]:
+        return self._fixture("books", f"{edition_id}.json") or synthetic_edition(edition_id)
+
+    async def edition(self, request: Request) -> JSONResponse:
+        edition_id = request.path_params["edition_id"]
+        return await self._respond("books", lambda: self._edition(edition_id))
+
+    async def api_books(self, request: Request) -> JSONResponse:
+        bibkeys = [key for key in request.query_params.get("bibkeys", "").split(",") if key]
+
+        def build():
+            result = {}
+            for bibkey in bibkeys:
+                if bibkey.startswith("ISBN:"):
+                    isbn = bibkey.removeprefix("ISBN:")
+                    if isbn not in self.missing_isbns:
+                        result[bibkey] = (
+                            self._fixture("isbn", f"{isbn}.json") or synthetic_isbn_record(isbn)
+                        )
+                    continue
+                edition_id = bibkey.removeprefix("OLID:")
+                details = self._edition(edition_id)
+                result[bibkey] = {
+                    "bib_key": bibkey,
+                    "info_url": f"https://openlibrary.org/books/{edition_id}",
+                    "details": {k: v for k, v in details.items() if k != "key"},
+                }
+            return result
+
+        return await self._respond("api_books", build)
+
+
+app = FakeOpenLibrary(Faults.from_env(), os.getenv("FAKE_OL_FIXTURES", FIXTURES_DIR))
@@ -286,3 +286,21 @@ def test_unauthorized_access(client, test_book, moderator_headers, db):
     # Should return 403 Forbidden if the user doesn't have permission
     # or 404 Not Found if the app hides the existence of the book
     assert response.status_code in [403, 404]
+
+
+def test_update_book_keeps_cover_unless_sent(client, test_book, user_headers, db):
+    """The cover is only changed when the form sends the cover fields."""
+    data = {"title": "Test Book", "author": "Test Author", "status": "TO_READ"}
+    response = client.post(
+        f"/books/{test_book.id}",
+        data={**data, "cover_id": "123", "cover_url": ""},
+        headers=user_headers,
+    )
+    assert response.status_code == 303
+    db.refresh(test_book)
+    assert test_book.cover_id == 123
+    assert test_book.cover_url is None
+
+    client.post(f"/books/{test_book.id}", data=data, headers=user_headers)
+    db.refresh(test_book)
+    assert test_book.cover_id == 123
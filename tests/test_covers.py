@@ -0,0 +1,118 @@
+"""
+Test module for the cover image proxy and its on-disk cache.
+"""
+import io
+
+import httpx
+import pytest
+from PIL import Image
+from sqlalchemy.orm import sessionmaker
+
+from app.services import cover_cache
+from app.services import openlibrary_cache
+from app.services import openlibrary_service
+from app.services.rate_limit import RateLimiter
+
+
+def jpeg(width: int = 300, height: int = 450) -> bytes:
+    out = io.BytesIO()
+    Image.new("RGB", (width, height), "teal").save(out, "JPEG")
+    return out.getvalue()
+
+
+@pytest.fixture
+def covers_seen(db, tmp_path, monkeypatch):
+    """Serve covers from a mock transport into a temporary cache directory."""
+    monkeypatch.setattr(openlibrary_cache, "session_factory", sessionmaker(bind=db.get_bind()))
+    monkeypatch.setattr(cover_cache, "COVER_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(
+        cover_cache, "limiter", RateLimiter("covers", ":memory:", rate=0, burst=1, max_concurrent=8)
+    )
+    original = jpeg()
+    seen = []
+
+    def handler(request):
+        seen.append(request.url.path)
+        if request.url.path.startswith("/b/id/404-"):
+            return httpx.Response(404)
+        if request.url.path.startswith("/b/id/503-"):
+            return httpx.Response(503)
+        if request.url.path.startswith("/b/id/999-"):
+            return httpx.Response(200, content=b"<html>Maintenance</html>")
+        return httpx.Response(200, content=original)
+
+    monkeypatch.setattr(
+        openlibrary_service, "_client", httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    )
+    yield seen
+    cover_cache.breaker.reset()
+
+
+def test_cover_is_fetched_once_and_served_immutable(client, covers_seen):
+    """The first request downloads the cover; later ones are served from disk."""
+    first = client.get("/covers/123-M")
+    second = client.get("/covers/123-M")
+
+    assert first.status_code == 200
+    assert first.headers["content-type"] == "image/webp"
+    assert first.headers["cache-control"] == cover_cache.IMMUTABLE_CACHE_CONTROL
+    assert second.headers["etag"] == first.headers["etag"]
+    assert covers_seen == ["/b/id/123-L.jpg"]
+
+    not_modified = client.get("/covers/123-M", headers={"If-None-Match": first.headers["etag"]})
+    assert not_modified.status_code == 304
+
+
+def test_missing_cover_gets_placeholder(client, covers_seen):
+    """Covers Open Library does not have are answered with the placeholder, once."""
+    for _ in range(2):
+        response = client.get("/covers/404-S")
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("image/svg+xml")
+        assert "immutable" not in response.headers["cache-control"]
+    assert covers_seen == ["/b/id/404-L.jpg"]
+
+
+@pytest.mark.parametrize("cover_id", [503, 999])
+def test_failed_download_gets_uncached_placeholder(
+    client, covers_seen, openlibrary_rate_limiter, cover_id
+):
+    """Upstream errors and bodies that are not images fall back to the placeholder."""
+    for _ in range(2):
+        response = client.get(f"/covers/{cover_id}-M")
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("image/svg+xml")
+        assert response.headers["cache-control"] == "no-cache"
+    # Nothing bad was kept, and the API's own limits were not touched
+    assert covers_seen == [f"/b/id/{cover_id}-L.jpg"] * 2
+    assert openlibrary_rate_limiter.stats["acquired"] == 0
+    assert openlibrary_service.breaker.state == "closed"
+
+
+def test_open_cover_breaker_gets_placeholder(client, covers_seen):
+    """With the covers breaker open nothing is downloaded and no error escapes."""
+    for _ in range(cover_cache.breaker.failure_threshold):
+        cover_cache.breaker.record_failure()
+    response = client.get("/covers/123-M")
+    assert response.headers["cache-control"] == "no-cache"
+    assert covers_seen == []
+
+
+def test_unknown_size_is_not_found(client, covers_seen):
+    """Only the sizes in cover_cache.SIZES are served."""
+    assert client.get("/covers/123-XL").status_code == 404
+    assert covers_seen == []
+
+
+@pytest.mark.asyncio
+async def test_thumbnails_are_derived_from_one_original(covers_seen):
+    """Every size is a WebP resized from the single large download."""
+    small = await cover_cache.get_cover(7, "S")
+    placeholder = await cover_cache.get_cover(7, "P")
+
+    assert covers_seen == ["/b/id/7-L.jpg"]
+    assert small.media_type == "image/webp"
+    with Image.open(io.BytesIO(small.content)) as image:
+        assert image.size == (64, 96)
+    with Image.open(io.BytesIO(placeholder.content)) as image:
+        assert image.width == cover_cache.SIZES["P"]
@@ -0,0 +1,38 @@
+"""
+Test module for picking the best edition of a search hit.
+"""
+from app.services import edition_resolver
+
+
+def test_candidate_keys_put_cover_edition_first():
+    """The cover edition leads, duplicates are dropped and the list is capped."""
+    doc = {"cover_edition_key": "OL3M", "edition_key": ["OL1M", "OL2M", "OL3M", "OL4M", "OL5M"]}
+    assert edition_resolver.candidate_keys(doc) == ["OL3M", "OL1M", "OL2M", "OL4M"]
+
+
+def test_parse_page_count():
+    """Page counts come from number_of_pages or the pagination text."""
+    assert edition_resolver.parse_page_count({"number_of_pages": 320}) == 320
+    assert edition_resolver.parse_page_count({"pagination": "xii, 223 p."}) == 223
+    assert edition_resolver.parse_page_count({"pagination": "[12] leaves"}) == 12
+    assert edition_resolver.parse_page_count({"pagination": "unpaged"}) is None
+
+
+def test_pick_best_prefers_cover_then_english_then_plausible():
+    """Editions are ranked by cover, language and plausible page count."""
+    english = {"key": "/books/OL1M", "number_of_pages": 300, "languages": [{"key": "/languages/eng"}]}
+    french = {"key": "/books/OL2M", "number_of_pages": 310, "languages": [{"key": "/languages/fre"}]}
+    implausible = {"key": "/books/OL3M", "number_of_pages": 9999, "languages": [{"key": "/languages/eng"}]}
+    no_pages = {"key": "/books/OL4M"}
+
+    assert edition_resolver.pick_best([no_pages, french, implausible, english]) is english
+    assert edition_resolver.pick_best([english, french], cover_key="OL2M") is french
+    assert edition_resolver.pick_best([no_pages]) is None
+
+
+def test_edition_details_normalizes_subjects():
+    """Subjects given as objects or strings become a list of unique names."""
+    details = edition_resolver.edition_details(
+        {"number_of_pages": 120, "subjects": [{"name": "Fiction"}, "Fiction", "Poetry"]}
+    )
+    assert details == {"number_of_pages": 120, "page_count": 120, "subjects": ["Fiction", "Poetry"]}
@@ -0,0 +1,205 @@
+"""
+Test module for the background metadata enrichment queue.
+"""
+from datetime import datetime
+from datetime import timedelta
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from app.models import Book
+from app.models import BookStatus
+from app.models import EnrichmentJob
+from app.services import enrichment
+from app.services import openlibrary_service
+from app.services import rate_limit
+
+
+@pytest.fixture
+def queue_db(db, monkeypatch):
+    """Point the enrichment workers at the test database."""
+    monkeypatch.setattr(enrichment, "session_factory", sessionmaker(bind=db.get_bind()))
+    return db
+
+
+@pytest.fixture
+def lookups(monkeypatch):
+    """Answer Open Library searches with a fixed result and record them."""
+    seen = []
+
+    async def fake_search(query, limit, fetch_details, deadline=None):
+        seen.append((query, fetch_details, rate_limit.current_priority.get()))
+        return [{
+            "title": "Dune",
+            "author": "Frank Herbert",
+            "page_count": 412,
+            "subjects": ["Science fiction", "Deserts", "", "Politics"],
+            "first_publish_year": 1965,
+            "cover_id": 42,
+        }]
+
+    monkeypatch.setattr(openlibrary_service, "search_books", fake_search)
+    return seen
+
+
+def add_book(db, user, **fields):
+    now = datetime.utcnow()
+    book = Book(
+        title="Dune",
+        author="Frank Herbert",
+        status=BookStatus.TO_READ,
+        user_id=user.id,
+        created_at=now,
+        updated_at=now,
+        **fields,
+    )
+    db.add(book)
+    db.commit()
+    db.refresh(book)
+    return book
+
+
+def test_create_book_enqueues_missing_metadata(client, user_headers, db):
+    """Adding a book returns right away and leaves a pending job behind."""
+    response = client.post(
+        "/books/",
+        data={"title": "Dune", "author": "Frank Herbert", "status": "TO_READ"},
+        headers=user_headers,
+    )
+    assert response.status_code == 303
+
+    job = db.query(EnrichmentJob).one()
+    assert job.status == enrichment.PENDING
+    assert job.book.title == "Dune"
+
+
+def test_complete_book_is_not_enqueued(db, regular_user):
+    """Books that already have all metadata are not queued."""
+    book = add_book(
+        db, regular_user, page_count=100, genres=["Fiction"], publication_date="2001"
+    )
+    assert enrichment.enqueue(db, book) is False
+    assert db.query(EnrichmentJob).count() == 0
+
+
+@pytest.mark.asyncio
+async def test_worker_fills_only_missing_fields(queue_db, regular_user, lookups):
+    """The lookup runs in the background and never overwrites user input."""
+    book = add_book(queue_db, regular_user, page_count=500)
+    enrichment.enqueue(queue_db, book)
+
+    assert await enrichment.run_pending() == 1
+    queue_db.refresh(book)
+    assert book.page_count == 500
+    assert book.genres == ["Science fiction", "Deserts", "Politics"]
+    assert book.publication_date == "1965"
+    assert book.cover_id == 42
+    assert book.enrichment_job.status == enrichment.DONE
+    assert lookups == [("Dune Frank Herbert", True, rate_limit.BACKGROUND)]
+
+    assert await enrichment.run_pending() == 0
+
+
+@pytest.mark.asyncio
+async def test_failed_lookup_is_retried_with_backoff(queue_db, regular_user, monkeypatch):
+    """Failures push the job back and give up after MAX_ATTEMPTS."""
+    async def failing_search(query, limit, fetch_details, deadline=None):
+        raise rate_limit.RateLimited("limit reached")
+
+    monkeypatch.setattr(openlibrary_service, "search_books", failing_search)
+    monkeypatch.setattr(enrichment, "MAX_ATTEMPTS", 2)
+    book = add_book(queue_db, regular_user)
+    enrichment.enqueue(queue_db, book)
+
+    assert await enrichment.run_pending() == 1
+    job = queue_db.query(EnrichmentJob).one()
+    queue_db.refresh(job)
+    assert job.status == enrichment.PENDING
+    assert job.attempts == 1
+    assert job.next_attempt_at > datetime.utcnow()
+    assert "RateLimited" in job.last_error
+    # Not due yet
+    assert await enrichment.run_pending() == 0
+
+    job.next_attempt_at = datetime.utcnow() - timedelta(seconds=1)
+    queue_db.commit()
+    await enrichment.run_pending()
+    queue_db.refresh(job)
+    assert job.status == enrichment.FAILED
+    assert job.attempts == 2
+
+
+@pytest.mark.asyncio
+async def test_unknown_book_is_not_retried(queue_db, regular_user, monkeypatch):
+    """A book Open Library does not know ends the job instead of retrying it."""
+    async def empty_search(query, limit, fetch_details, deadline=None):
+        return []
+
+    monkeypatch.setattr(openlibrary_service, "search_books", empty_search)
+    book = add_book(queue_db, regular_user)
+    enrichment.enqueue(queue_db, book)
+
+    assert await enrichment.run_pending() == 1
+    job = queue_db.query(EnrichmentJob).one()
+    queue_db.refresh(job)
+    assert job.status == enrichment.NOT_FOUND
+    assert job.attempts == 1
+    assert await enrichment.run_pending() == 0
+
+
+def test_matches_book():
+    """Results match on title words and a shared author name, not on initials."""
+    hobbit = {"title": "The Hobbit: or There and Back Again", "author": "J. R. R. Tolkien"}
+    assert enrichment.matches_book(hobbit, "The Hobbit", "J.R.R. Tolkien")
+    assert enrichment.matches_book({"title": "Émile", "author": "Rousseau"}, "emile", "J.-J. Rousseau")
+    assert not enrichment.matches_book(hobbit, "The Silmarillion", "J.R.R. Tolkien")
+    assert not enrichment.matches_book({"title": "Dune Messiah", "author": "F. Herbert"}, "Dune", "Herbert")
+    assert not enrichment.matches_book({"title": "Dune", "author": "J. Doe"}, "Dune", "J. Smith")
+
+
+@pytest.mark.asyncio
+async def test_other_book_is_not_written(queue_db, regular_user, monkeypatch):
+    """A search whose best result is another book ends the job without changes."""
+    async def other_search(query, limit, fetch_details, deadline=None):
+        return [{"title": "Dune Messiah", "author": "Frank Herbert", "page_count": 256}]
+
+    monkeypatch.setattr(openlibrary_service, "search_books", other_search)
+    book = add_book(queue_db, regular_user)
+    enrichment.enqueue(queue_db, book)
+
+    assert await enrichment.run_pending() == 1
+    queue_db.refresh(book)
+    assert book.page_count is None
+    assert book.enrichment_job.status == enrichment.NOT_FOUND
+
+
+@pytest.mark.asyncio
+async def test_incomplete_details_are_retried(queue_db, regular_user, monkeypatch):
+    """Results whose details could not all be fetched are retried, not final."""
+    async def partial_search(query, limit, fetch_details, deadline=None):
+        return openlibrary_service.PartialResults([{"title": "Dune", "author": "Frank Herbert"}])
+
+    monkeypatch.setattr(openlibrary_service, "search_books", partial_search)
+    book = add_book(queue_db, regular_user)
+    enrichment.enqueue(queue_db, book)
+
+    assert await enrichment.run_pending() == 1
+    job = queue_db.query(EnrichmentJob).one()
+    queue_db.refresh(job)
+    assert job.status == enrichment.PENDING
+    assert "IncompleteLookup" in job.last_error
+    assert job.next_attempt_at > datetime.utcnow()
+
+
+@pytest.mark.asyncio
+async def test_expired_lease_is_claimed_again(queue_db, regular_user, lookups):
+    """A job left running by a dead worker is picked up once its lease expires."""
+    book = add_book(queue_db, regular_user)
+    enrichment.enqueue(queue_db, book)
+    job_id = enrichment.claim_job()
+    assert enrichment.claim_job() is None
+
+    job = queue_db.get(EnrichmentJob, job_id)
+    job.locked_until = datetime.utcnow() - timedelta(seconds=1)
+    queue_db.commit()
+    assert enrichment.claim_job() == job_id
@@ -0,0 +1,106 @@
+"""
+Test module running openlibrary_service against the local fake Open Library.
+"""
+import gzip
+import shutil
+from pathlib import Path
+
+import httpx
+import pytest
+import pytest_asyncio
+from sqlalchemy.orm import sessionmaker
+
+from app.services import catalog_import
+from app.services import local_catalog
+from app.services import openlibrary_cache
+from app.services import openlibrary_service
+from app.services.resilience import Deadline
+from app.services.resilience import DeadlineExceeded
+from fake_openlibrary import Faults
+from fake_openlibrary import FakeOpenLibrary
+
+FIXTURE_DUMP = Path(__file__).parent / "fixtures" / "ol_dump_sample.txt"
+
+
+@pytest_asyncio.fixture
+async def fake(db, tmp_path, monkeypatch):
+    """Point the service at a fake Open Library with a fresh cache."""
+    monkeypatch.setattr(openlibrary_cache, "session_factory", sessionmaker(bind=db.get_bind()))
+    monkeypatch.setattr(local_catalog, "CATALOG_PATH", str(tmp_path / "missing.db"))
+    monkeypatch.setattr(openlibrary_service, "OPENLIBRARY_URL", "http://openlibrary.test")
+    openlibrary_service.breaker.reset()
+    fake = FakeOpenLibrary(seed=1)
+    client = openlibrary_service.create_client(httpx.ASGITransport(app=fake))
+    monkeypatch.setattr(openlibrary_service, "_client", client)
+    yield fake
+    await client.aclose()
+    openlibrary_service.breaker.reset()
+
+
+@pytest.mark.asyncio
+async def test_search_with_details_uses_recorded_fixtures(fake):
+    """A recorded search resolves page counts through the batched edition lookup."""
+    books = await openlibrary_service.search_books("The Hobbit", limit=2, fetch_details=True)
+
+    assert [book["title"] for book in books] == ["The Hobbit", "The Hobbit Companion"]
+    assert books[0]["page_count"] == 300
+    assert fake.stats["by_endpoint"]["search"] == 1
+    assert fake.stats["by_endpoint"]["api_books"] == 1
+    # The companion's only edition has no page count, so its work's editions are read
+    assert fake.stats["by_endpoint"]["editions"] == 1
+
+
+@pytest.mark.asyncio
+async def test_unrecorded_queries_are_synthesized(fake):
+    """Any query returns deterministic results with the requested fields only."""
+    docs = await openlibrary_service.fetch_search_docs("anything at all", limit=5)
+    again = await openlibrary_service.fetch_search_docs("anything at all", limit=5)
+
+    assert len(docs) == 5
+    assert docs == again
+    assert "id_goodreads" not in docs[0]
+
+
+@pytest.mark.asyncio
+async def test_server_errors_open_the_breaker(fake):
+    """Failing responses count against the circuit breaker."""
+    fake.faults = Faults(error_rate=1.0)
+    for _ in range(openlibrary_service.BREAKER_FAILURE_THRESHOLD):
+        with pytest.raises(httpx.HTTPStatusError):
+            await openlibrary_service.search_books("dune")
+    assert openlibrary_service.breaker.state == "open"
+    assert fake.stats["errors"] == openlibrary_service.BREAKER_FAILURE_THRESHOLD
+
+
+@pytest.mark.asyncio
+async def test_throttling_and_latency(fake):
+    """Requests over the rate cap get 429s; slow responses hit the deadline."""
+    fake.faults = Faults(max_rps=1)
+    await openlibrary_service.fetch_search_docs("dune")
+    with pytest.raises(httpx.HTTPStatusError) as excinfo:
+        await openlibrary_service.fetch_search_docs("dune")
+    assert excinfo.value.response.status_code == 429
+    assert fake.stats["throttled"] == 1
+
+    fake.faults = Faults(latency=0.5)
+    with pytest.raises(DeadlineExceeded):
+        await openlibrary_service.fetch_search_docs("dune", deadline=Deadline(0.05))
+
+
+@pytest.mark.asyncio
+async def test_slow_search_is_hedged_with_the_local_catalog(fake, tmp_path, monkeypatch):
+    """When Open Library is slow, the local catalog's answer is used."""
+    dump = tmp_path / "dump.txt.gz"
+    with open(FIXTURE_DUMP, "rb") as src, gzip.open(dump, "wb") as dst:
+        shutil.copyfileobj(src, dst)
+    catalog = str(tmp_path / "catalog.db")
+    catalog_import.import_dumps([str(dump)], catalog_path=catalog)
+    monkeypatch.setattr(local_catalog, "CATALOG_PATH", catalog)
+    monkeypatch.setattr(openlibrary_service.search_providers, "default_delay", 0.05)
+
+    fake.faults = Faults(latency=2)
+    books = await openlibrary_service.search_books("earthsea", fetch_details=True)
+
+    assert [book["title"] for book in books] == ["A Wizard of Earthsea"]
+    assert books[0]["source"] == "local"
+    assert openlibrary_service.search_providers.stats["secondary_wins"] >= 1
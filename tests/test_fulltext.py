@@ -0,0 +1,90 @@
+"""
+Test module for full-text filtering of books.
+"""
+import re
+from datetime import datetime
+
+import pytest
+
+from app import fulltext
+from app.models import Book
+from app.models import BookStatus
+
+
+@pytest.fixture
+def shelf(db, regular_user):
+    """A few books with notes."""
+    now = datetime.utcnow()
+    books = [
+        Book(title="Dune", author="Frank Herbert", notes="Spice, sandworms and <b>politics</b>."),
+        Book(title="Dune Messiah", author="Frank Herbert", notes="Paul as emperor."),
+        Book(title="Children of Dune", author="Frank Herbert", notes=None),
+        Book(title="Émile", author="Jean-Jacques Rousseau", notes="On education; dune mentioned once."),
+        Book(title="The Left Hand of Darkness", author="Ursula K. Le Guin", notes="Politics on Gethen."),
+    ]
+    # Filler, so that the words above are rare enough to rank on
+    books += [Book(title=f"Filler {n}", author="Anonymous", notes="Nothing here.") for n in range(10)]
+    for book in books:
+        book.status = BookStatus.TO_READ
+        book.user_id = regular_user.id
+        book.created_at = book.updated_at = now
+    db.add_all(books)
+    db.commit()
+    return books
+
+
+def matching_ids(db, **filters):
+    query, rank = fulltext.filter_books(db, db.query(Book), **filters)
+    if rank is not None:
+        query = query.order_by(rank)
+    return [book.id for book in query]
+
+
+def test_index_follows_inserts_updates_and_deletes(db, shelf):
+    """The triggers keep books_fts in step with the books table."""
+    dune, messiah = shelf[0], shelf[1]
+    assert fulltext.is_available(db)
+    assert set(matching_ids(db, title_filter="dun")) == {shelf[0].id, shelf[1].id, shelf[2].id}
+    assert matching_ids(db, title_filter="emile") == [shelf[3].id]
+
+    messiah.title = "Messiah"
+    db.delete(dune)
+    db.commit()
+    assert matching_ids(db, title_filter="dune") == [shelf[2].id]
+    assert matching_ids(db, title_filter="messiah") == [messiah.id]
+
+
+def test_filters_are_ranked(db, shelf, regular_user):
+    """Every filter has to match; books matching more often rank first."""
+    now = datetime.utcnow()
+    once, twice = (
+        Book(title=f"Arrakis {n}", author="Herbert", notes=notes, status=BookStatus.TO_READ,
+             user_id=regular_user.id, created_at=now, updated_at=now)
+        for n, notes in enumerate(["Sandworms and spice.", "Sandworms, sandworms."])
+    )
+    db.add_all([once, twice])
+    db.commit()
+
+    assert matching_ids(db, notes_filter="sandworm") == [twice.id, once.id, shelf[0].id]
+    assert matching_ids(db, title_filter="dune", notes_filter="emperor") == [shelf[1].id]
+    # Nothing to search for in punctuation, so it is matched literally
+    assert matching_ids(db, title_filter="?!") == []
+
+
+def test_fallback_without_index(db, shelf, monkeypatch):
+    """Without the index the filters are plain substring matches."""
+    monkeypatch.setattr(fulltext, "is_available", lambda db: False)
+    query, rank = fulltext.filter_books(db, db.query(Book), title_filter="une mess")
+    assert rank is None
+    assert [book.id for book in query] == [shelf[1].id]
+    assert fulltext.notes_snippets(db, [shelf[0].id], "spice") == {}
+
+
+def test_list_shows_highlighted_notes(client, shelf, user_headers):
+    """Notes matches come with an escaped snippet, the match marked."""
+    response = client.get("/books/?notes_filter=politics", headers=user_headers)
+    assert response.status_code == 200
+    ids = [int(book_id) for book_id in re.findall(r'id="book-(\d+)"', response.text)]
+    assert sorted(ids) == sorted([shelf[0].id, shelf[4].id])
+    assert "&lt;b&gt;<mark>politics</mark>&lt;/b&gt;" in response.text
+    assert "<mark>Politics</mark> on Gethen." in response.text
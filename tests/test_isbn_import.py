@@ -0,0 +1,115 @@
+"""
+Test module for ISBN lookups and bulk ISBN imports.
+"""
+import httpx
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from app import models
+from app.services import local_catalog
+from app.services import openlibrary_cache
+from app.services import openlibrary_service
+from app.services.isbn import normalize_isbn
+from fake_openlibrary import FakeOpenLibrary
+
+HOBBIT_ISBN10 = "0-261-10221-4"
+HOBBIT_ISBN13 = "9780261102217"
+
+
+def isbn13(n: int) -> str:
+    """A valid ISBN-13 built from a running number."""
+    first12 = f"978{n:09d}"
+    total = sum(int(c) * (3 if i % 2 else 1) for i, c in enumerate(first12))
+    return first12 + str((10 - total % 10) % 10)
+
+
+@pytest.fixture
+def fake(db, tmp_path, monkeypatch):
+    """Point the service at a fake Open Library with a fresh cache."""
+    monkeypatch.setattr(openlibrary_cache, "session_factory", sessionmaker(bind=db.get_bind()))
+    monkeypatch.setattr(local_catalog, "CATALOG_PATH", str(tmp_path / "missing.db"))
+    monkeypatch.setattr(openlibrary_service, "OPENLIBRARY_URL", "http://openlibrary.test")
+    openlibrary_service.breaker.reset()
+    fake = FakeOpenLibrary(seed=1)
+    client = openlibrary_service.create_client(httpx.ASGITransport(app=fake))
+    monkeypatch.setattr(openlibrary_service, "_client", client)
+    yield fake
+    openlibrary_service.breaker.reset()
+
+
+def test_normalize_isbn():
+    """ISBN-10s become ISBN-13s; bad check digits are rejected."""
+    assert normalize_isbn(HOBBIT_ISBN10) == HOBBIT_ISBN13
+    assert normalize_isbn("978 0 261 10221 7") == HOBBIT_ISBN13
+    assert normalize_isbn("080442957x") == "9780804429573"
+    assert normalize_isbn("0261102215") is None
+    assert normalize_isbn("9780261102218") is None
+    assert normalize_isbn("not an isbn") is None
+
+
+def test_isbn_lookup_is_cached(client, fake):
+    """A lookup maps the jscmd=data record and is served from the cache afterwards."""
+    response = client.get(f"/api/books/isbn/{HOBBIT_ISBN10}")
+    assert response.status_code == 200
+    book = response.json()
+    assert book["title"] == "The Hobbit: or There and Back Again"
+    assert book["author"] == "J.R.R. Tolkien"
+    assert book["page_count"] == 300
+    assert book["cover_id"] == 8406786
+    assert book["isbn"] == HOBBIT_ISBN13
+
+    assert client.get(f"/api/books/isbn/{HOBBIT_ISBN13}").json() == book
+    assert fake.stats["by_endpoint"]["api_books"] == 1
+
+    assert client.get("/api/books/isbn/12345").status_code == 400
+    fake.missing_isbns.add(isbn13(1))
+    assert client.get(f"/api/books/isbn/{isbn13(1)}").status_code == 404
+
+
+def test_isbn_import_reports_each_isbn(client, fake, db, regular_user, user_headers):
+    """Found books are created in one go; the rest are reported, not failed."""
+    fake.missing_isbns.add(isbn13(2))
+    isbns = [HOBBIT_ISBN10, isbn13(1), "bogus", isbn13(2), HOBBIT_ISBN13]
+
+    response = client.post(
+        "/api/books/isbn/import",
+        json={"isbns": isbns, "status": "Currently Reading"},
+        headers=user_headers,
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert data["created"] == 2
+    assert [result["status"] for result in data["results"]] == [
+        "created", "created", "invalid", "not_found", "duplicate",
+    ]
+
+    books = db.query(models.Book).filter(models.Book.user_id == regular_user.id).all()
+    assert {book.id for book in books} == {result["book_id"] for result in data["results"][:2]}
+    hobbit = next(book for book in books if book.author == "J.R.R. Tolkien")
+    assert hobbit.status == models.BookStatus.READING
+    assert hobbit.page_count == 300
+    assert hobbit.genres == ["Fantasy fiction", "Middle Earth (Imaginary place)"]
+    assert hobbit.publication_date == "1995"
+    # Complete books are not queued; the others are
+    queued = {job.book_id for job in db.query(models.EnrichmentJob)}
+    assert hobbit.id not in queued
+    assert queued == {book.id for book in books if not (book.page_count and book.genres)}
+
+    # Importing the same shelf again only finds duplicates
+    again = client.post("/api/books/isbn/import", json={"isbns": isbns[:2]}, headers=user_headers)
+    assert [result["status"] for result in again.json()["results"]] == ["duplicate", "duplicate"]
+
+
+def test_isbn_import_batches_lookups(client, fake, user_headers):
+    """Hundreds of ISBNs take one upstream request per batch."""
+    isbns = [isbn13(n) for n in range(1, 121)]
+
+    response = client.post("/api/books/isbn/import", json={"isbns": isbns}, headers=user_headers)
+    assert response.status_code == 200
+    assert fake.stats["by_endpoint"]["api_books"] == 3
+    assert fake.stats["peak_in_flight"] <= openlibrary_service.ISBN_CONCURRENCY
+    statuses = {result["status"] for result in response.json()["results"]}
+    assert statuses <= {"created", "duplicate"}
+
+    assert client.post("/api/books/isbn/import", json={"isbns": []}, headers=user_headers).status_code == 422
+    assert client.post("/api/books/isbn/import", json={"isbns": isbns}).status_code == 401
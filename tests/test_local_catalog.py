@@ -0,0 +1,108 @@
+"""
+Test module for the local Open Library catalog and its dump importer.
+"""
+import gzip
+import shutil
+import sqlite3
+from pathlib import Path
+
+import pytest
+
+from app.services import catalog_import
+from app.services import local_catalog
+from app.services import openlibrary_service
+
+FIXTURE_DUMP = Path(__file__).parent / "fixtures" / "ol_dump_sample.txt"
+
+
+@pytest.fixture
+def dump_path(tmp_path):
+    """Gzip the fixture dump like the real Open Library dump files."""
+    path = tmp_path / "ol_dump_sample.txt.gz"
+    with open(FIXTURE_DUMP, "rb") as src, gzip.open(path, "wb") as dst:
+        shutil.copyfileobj(src, dst)
+    return str(path)
+
+
+@pytest.fixture
+def catalog_path(tmp_path, dump_path):
+    """Build a catalog from the fixture dump."""
+    path = str(tmp_path / "catalog.db")
+    catalog_import.import_dumps([dump_path], catalog_path=path, batch_size=3)
+    return path
+
+
+def test_parse_page_count():
+    """Page counts come from number_of_pages or the pagination string."""
+    assert catalog_import.parse_page_count({"number_of_pages": 120}) == 120
+    assert catalog_import.parse_page_count({"pagination": "xii, 223 p."}) == 223
+    assert catalog_import.parse_page_count({"pagination": "300"}) == 300
+    assert catalog_import.parse_page_count({}) is None
+
+
+def test_search_catalog(catalog_path):
+    """Works are found by title or author with precomputed page counts."""
+    books = local_catalog.search("earthsea", path=catalog_path)
+    assert [book["title"] for book in books] == ["A Wizard of Earthsea"]
+    book = books[0]
+    assert book["author"] == "Ursula K. Le Guin"
+    assert book["page_count"] == 191  # median of 183, 205 and 191
+    assert book["subjects"] == ["Fantasy", "Wizards", "Magic"]
+    assert book["isbn"] == "9780553383041"
+    assert book["first_publish_year"] == 1968
+
+    by_author = local_catalog.search("le guin", path=catalog_path)
+    assert {book["title"] for book in by_author} == {
+        "A Wizard of Earthsea",
+        "The Left Hand of Darkness",
+    }
+
+
+def test_search_prefix_matches_last_word(catalog_path):
+    """The last word is matched as a prefix for typeahead queries."""
+    assert [book["title"] for book in local_catalog.search("herb", path=catalog_path)] == ["Dune"]
+    assert local_catalog.search("   ", path=catalog_path) == []
+
+
+def test_search_opens_the_catalog_read_only(catalog_path, tmp_path):
+    """Searching neither writes to the catalog nor creates a missing one."""
+    conn = local_catalog.connect_read_only(catalog_path)
+    try:
+        with pytest.raises(sqlite3.OperationalError):
+            conn.execute("DELETE FROM works")
+    finally:
+        conn.close()
+
+    missing = tmp_path / "missing.db"
+    with pytest.raises(sqlite3.OperationalError):
+        local_catalog.search("dune", path=str(missing))
+    assert not missing.exists()
+
+
+def test_import_is_resumable(tmp_path, dump_path):
+    """A re-run skips finished files and resumes partial ones."""
+    path = str(tmp_path / "resume.db")
+    conn = local_catalog.connect(path)
+    try:
+        # Pretend a previous run committed the first four lines
+        catalog_import._save_progress(conn, dump_path, 4)
+        conn.commit()
+        assert catalog_import.import_dump(conn, dump_path, batch_size=2) == 7
+        assert conn.execute("SELECT count(*) FROM authors").fetchone()[0] == 0
+        assert conn.execute("SELECT count(*) FROM works").fetchone()[0] == 1
+        assert catalog_import.import_dump(conn, dump_path) == 0
+    finally:
+        conn.close()
+
+
+@pytest.mark.asyncio
+async def test_local_first_search_mode(catalog_path, monkeypatch):
+    """In local_first mode search_books answers from the catalog."""
+    monkeypatch.setattr(local_catalog, "CATALOG_PATH", catalog_path)
+    monkeypatch.setattr(local_catalog, "SEARCH_MODE", "local_first")
+
+    books = await openlibrary_service.search_books("dune", fetch_details=True)
+
+    assert [book["title"] for book in books] == ["Dune"]
+    assert books[0]["page_count"] == 412
+    assert books[0]["source"] == "local"
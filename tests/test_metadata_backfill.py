@@ -0,0 +1,136 @@
+"""
+Test module for the resumable book metadata backfill.
+"""
+from datetime import datetime
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from app.models import Book
+from app.models import BookStatus
+from app.models import EnrichmentJob
+from app.services import enrichment
+from app.services import metadata_backfill
+from app.services import openlibrary_service
+from app.services.resilience import CircuitOpenError
+
+
+@pytest.fixture
+def library(db, regular_user, monkeypatch):
+    """Five books missing metadata, one complete book, and the test database."""
+    factory = sessionmaker(bind=db.get_bind())
+    monkeypatch.setattr(metadata_backfill, "session_factory", factory)
+    monkeypatch.setattr(enrichment, "session_factory", factory)
+    now = datetime.utcnow()
+    for n in range(6):
+        complete = n == 3
+        db.add(Book(
+            title=f"Book {n}",
+            author="Author",
+            status=BookStatus.TO_READ,
+            user_id=regular_user.id,
+            created_at=now,
+            updated_at=now,
+            page_count=100 if complete else None,
+            genres=["Fiction"] if complete else [],
+            publication_date="2000" if complete or n == 5 else None,
+        ))
+    db.commit()
+    return db
+
+
+@pytest.fixture
+def lookups(monkeypatch, openlibrary_rate_limiter):
+    """Answer searches with one result per title, counting them as upstream calls."""
+    seen = []
+
+    async def fake_search(query, limit, fetch_details, deadline=None):
+        seen.append(query)
+        openlibrary_rate_limiter.stats["acquired"] += 2
+        if query.startswith("Book 4 "):
+            raise CircuitOpenError("openlibrary circuit is open")
+        return [{
+            "title": query.removesuffix(" Author"),
+            "author": "Author",
+            "page_count": 300,
+            "subjects": ["Poetry"],
+            "first_publish_year": 1999,
+        }]
+
+    monkeypatch.setattr(openlibrary_service, "search_books", fake_search)
+    return seen
+
+
+def books(db):
+    db.expire_all()
+    return {book.title: book for book in db.query(Book)}
+
+
+@pytest.mark.asyncio
+async def test_backfill_fills_missing_fields_and_reports(library, lookups, tmp_path):
+    """Missing fields are filled in, existing ones kept, failures queued."""
+    progress = await metadata_backfill.backfill(
+        str(tmp_path / "checkpoint.json"), chunk_size=2, concurrency=2, rate=1000
+    )
+
+    result = books(library)
+    assert result["Book 0"].page_count == 300
+    assert result["Book 0"].genres == ["Poetry"]
+    assert result["Book 0"].publication_date == "1999"
+    assert result["Book 5"].publication_date == "2000"
+    assert result["Book 3"].page_count == 100
+    assert result["Book 4"].page_count is None
+    assert library.query(EnrichmentJob).one().book_id == result["Book 4"].id
+
+    assert "Book 3 Author" not in lookups
+    assert (progress.scanned, progress.updated, progress.failed) == (5, 4, 1)
+    assert progress.upstream_calls == 10
+    assert "2.00 upstream calls per book" in progress.summary()
+
+
+@pytest.mark.asyncio
+async def test_backfill_resumes_from_checkpoint(library, lookups, tmp_path):
+    """A second run continues after the last book of the first one."""
+    checkpoint = str(tmp_path / "checkpoint.json")
+    first = await metadata_backfill.backfill(checkpoint, chunk_size=2, rate=1000, limit=2)
+    assert first.scanned == 2
+    assert metadata_backfill.load_checkpoint(checkpoint).last_id == first.last_id
+
+    second = await metadata_backfill.backfill(checkpoint, chunk_size=2, rate=1000)
+    assert second.scanned == 5
+    assert len(lookups) == 5
+
+
+@pytest.mark.asyncio
+async def test_failed_books_are_looked_up_again(library, lookups, tmp_path):
+    """The checkpoint stays before a failed book, so the next run retries it."""
+    checkpoint = str(tmp_path / "checkpoint.json")
+    await metadata_backfill.backfill(checkpoint, chunk_size=2, rate=1000)
+    assert metadata_backfill.load_checkpoint(checkpoint).last_id == books(library)["Book 2"].id
+
+    await metadata_backfill.backfill(checkpoint, chunk_size=2, rate=1000)
+    assert lookups.count("Book 4 Author") == 2
+    assert lookups.count("Book 5 Author") == 1
+
+
+@pytest.mark.asyncio
+async def test_incomplete_details_are_retried(library, lookups, tmp_path, monkeypatch):
+    """Details cut short by the shared limiter are retried rather than written."""
+    monkeypatch.setattr(metadata_backfill, "RATE_LIMITED_DELAY", 0)
+    full_search = openlibrary_service.search_books
+    attempts = []
+
+    async def flaky_search(query, limit, fetch_details, deadline=None):
+        results = await full_search(query, limit, fetch_details, deadline)
+        attempts.append(query)
+        if attempts.count(query) == 1:
+            return openlibrary_service.PartialResults([{"title": results[0]["title"], "author": "Author"}])
+        return results
+
+    monkeypatch.setattr(openlibrary_service, "search_books", flaky_search)
+    progress = await metadata_backfill.backfill(
+        str(tmp_path / "checkpoint.json"), chunk_size=2, rate=1000, limit=1
+    )
+    assert attempts == ["Book 0 Author", "Book 0 Author"]
+    assert progress.updated == 1
+    assert books(library)["Book 0"].page_count == 300
@@ -0,0 +1,375 @@
+"""
+Test module for the Open Library service, using a mocked HTTP transport.
+"""
+import asyncio
+import json
+
+from datetime import timedelta
+
+import httpx
+import pytest
+import pytest_asyncio
+from sqlalchemy.orm import sessionmaker
+
+from app.models import OpenLibraryCacheEntry
+from app.services import openlibrary_cache
+from app.services import local_catalog
+from app.services import openlibrary_service
+from app.services.resilience import CircuitOpenError
+from app.services.resilience import Deadline
+from app.services.resilience import DeadlineExceeded
+
+SEARCH_RESPONSE = {
+    "docs": [
+        {
+            "key": "/works/OL1W",
+            "title": "First Book",
+            "author_name": ["First Author"],
+            "first_publish_year": 1999,
+            "cover_edition_key": "OL1M",
+            "edition_key": ["OL1M", "OL2M"],
+        },
+        {
+            "key": "/works/OL2W",
+            "title": "Second Book",
+            "author_name": ["Second Author"],
+            "edition_key": ["OL3M"],
+        },
+    ]
+}
+
+RESOURCES = {
+    "/books/OL1M.json": {"pagination": "xii, 223 p.", "subjects": ["Fiction"]},
+    "/books/OL3M.json": {"number_of_pages": 150},
+    "/works/OL2W.json": {"subjects": ["Poetry"], "description": "A work"},
+}
+
+# Edition records served by the batched api/books endpoint
+EDITIONS = {
+    "OL1M": {"pagination": "xii, 223 p.", "subjects": ["Fiction"]},
+    "OL2M": {"number_of_pages": 180},
+    "OL3M": {"number_of_pages": 150},
+}
+
+
+def bibkeys_response(request: httpx.Request, editions: dict) -> httpx.Response:
+    """Answer an api/books request from a dict of edition records."""
+    keys = [key.removeprefix("OLID:") for key in request.url.params["bibkeys"].split(",")]
+    return httpx.Response(
+        200, json={f"OLID:{key}": {"details": editions[key]} for key in keys if key in editions}
+    )
+
+
+def openlibrary_handler(request: httpx.Request) -> httpx.Response:
+    """Serve canned Open Library responses."""
+    if request.url.path == "/search.json":
+        return httpx.Response(200, json=SEARCH_RESPONSE)
+    if request.url.path == "/api/books":
+        return bibkeys_response(request, EDITIONS)
+    if request.url.path in RESOURCES:
+        return httpx.Response(200, json=RESOURCES[request.url.path])
+    return httpx.Response(404)
+
+
+@pytest.fixture(autouse=True)
+def cache_db(db, monkeypatch):
+    """Point the Open Library cache at the test database."""
+    monkeypatch.setattr(openlibrary_cache, "session_factory", sessionmaker(bind=db.get_bind()))
+    openlibrary_cache.reset_stats()
+    openlibrary_service.breaker.reset()
+    yield db
+    openlibrary_service.breaker.reset()
+
+
+@pytest_asyncio.fixture
+async def requests_seen():
+    """Install a shared client backed by a mock transport and record requests."""
+    seen = []
+
+    def handler(request):
+        seen.append(request.url.path)
+        return openlibrary_handler(request)
+
+    await openlibrary_service.close_client()
+    await openlibrary_service.open_client(transport=httpx.MockTransport(handler))
+    yield seen
+    await openlibrary_service.close_client()
+
+
+@pytest.mark.asyncio
+async def test_shared_client_is_reused(requests_seen):
+    """Every call goes through the one client opened for the app."""
+    client = openlibrary_service.get_client()
+    await openlibrary_service.search_books("first", limit=2)
+    await openlibrary_service.get_book_details("books/OL1M")
+    assert openlibrary_service.get_client() is client
+    assert requests_seen == ["/search.json", "/books/OL1M.json"]
+
+
+@pytest.mark.asyncio
+async def test_close_client_releases_shared_client(requests_seen):
+    """Closing the client lets the next caller get a fresh one."""
+    client = openlibrary_service.get_client()
+    await openlibrary_service.close_client()
+    assert client.is_closed
+    assert openlibrary_service.get_client() is not client
+
+
+@pytest.mark.asyncio
+async def test_search_with_details(requests_seen):
+    """Detailed search merges edition and work details into each result."""
+    books = await openlibrary_service.search_books("first", limit=2, fetch_details=True)
+    assert [book["title"] for book in books] == ["First Book", "Second Book"]
+    assert books[0]["page_count"] == 223
+    assert books[0]["subjects"] == ["Fiction"]
+    assert books[1]["page_count"] == 150
+    # All candidate editions are resolved in a single batched request
+    assert requests_seen == ["/search.json", "/api/books"]
+
+
+@pytest.mark.asyncio
+async def test_unresolved_results_fall_back_to_work_editions(requests_seen):
+    """Results whose candidates have no page count get one editions page."""
+    without_ol3m = {key: value for key, value in EDITIONS.items() if key != "OL3M"}
+
+    async def handler(request):
+        requests_seen.append(request.url.path)
+        if request.url.path == "/api/books":
+            return bibkeys_response(request, without_ol3m)
+        if request.url.path == "/works/OL2W/editions.json":
+            assert request.url.params["limit"] == str(openlibrary_service.EDITIONS_PAGE_SIZE)
+            return httpx.Response(200, json={"entries": [
+                {"key": "/books/OL4M"},
+                {"key": "/books/OL5M", "number_of_pages": 5000},
+                {"key": "/books/OL6M", "number_of_pages": 210, "languages": [{"key": "/languages/eng"}]},
+            ]})
+        return openlibrary_handler(request)
+
+    await openlibrary_service.close_client()
+    await openlibrary_service.open_client(transport=httpx.MockTransport(handler))
+    books = await openlibrary_service.search_books("first", limit=2, fetch_details=True)
+
+    assert books[0]["page_count"] == 223
+    assert books[1]["page_count"] == 210
+    assert requests_seen == ["/search.json", "/api/books", "/works/OL2W/editions.json"]
+
+
+@pytest.mark.asyncio
+async def test_batched_editions_are_cached(requests_seen):
+    """Editions fetched in a batch, found or not, are not requested again."""
+    first = await openlibrary_service.get_editions_by_keys(["OL1M", "OL404M"])
+    second = await openlibrary_service.get_editions_by_keys(["OL1M", "OL404M"])
+    assert first == second
+    assert list(first) == ["OL1M"]
+    assert first["OL1M"]["key"] == "/books/OL1M"
+    assert requests_seen == ["/api/books"]
+    stats = openlibrary_cache.get_stats()
+    assert (stats["misses"], stats["stores"], stats["hits"]) == (2, 2, 2)
+
+
+@pytest.mark.asyncio
+async def test_enrichment_budget_keeps_order():
+    """Results enriched in time are merged; late ones come back unenriched."""
+    async def handler(request):
+        if request.url.path == "/search.json":
+            return httpx.Response(200, json=SEARCH_RESPONSE)
+        if request.url.path == "/api/books":
+            return bibkeys_response(request, {"OL3M": EDITIONS["OL3M"]})
+        if request.url.path.startswith("/works/OL1W"):
+            await asyncio.sleep(5)
+        return openlibrary_handler(request)
+
+    await openlibrary_service.close_client()
+    await openlibrary_service.open_client(transport=httpx.MockTransport(handler))
+    try:
+        books = await openlibrary_service.search_books(
+            "first", limit=2, fetch_details=True, concurrency=2, budget=0.2
+        )
+    finally:
+        await openlibrary_service.close_client()
+
+    assert [book["title"] for book in books] == ["First Book", "Second Book"]
+    assert books[0]["page_count"] is None
+    assert books[1]["page_count"] == 150
+    assert isinstance(books, openlibrary_service.PartialResults)
+
+
+@pytest.mark.asyncio
+async def test_failed_enrichment_is_partial():
+    """A result whose work lookup fails is left unenriched and marks the list partial."""
+    async def handler(request):
+        if request.url.path == "/api/books":
+            return bibkeys_response(request, {"OL3M": EDITIONS["OL3M"]})
+        if request.url.path.startswith("/works/OL1W"):
+            return httpx.Response(503)
+        return openlibrary_handler(request)
+
+    await openlibrary_service.close_client()
+    await openlibrary_service.open_client(transport=httpx.MockTransport(handler))
+    try:
+        books = await openlibrary_service.search_books("first", limit=2, fetch_details=True)
+    finally:
+        await openlibrary_service.close_client()
+
+    assert books[0]["page_count"] is None
+    assert books[1]["page_count"] == 150
+    assert isinstance(books, openlibrary_service.PartialResults)
+
+
+@pytest.mark.asyncio
+async def test_details_are_served_from_cache(requests_seen):
+    """A second lookup of the same resource does no network I/O."""
+    first = await openlibrary_service.get_book_details("books/OL1M")
+    second = await openlibrary_service.get_book_details("/books/OL1M")
+    assert first == second
+    assert first["page_count"] == 223
+    assert requests_seen == ["/books/OL1M.json"]
+    stats = openlibrary_cache.get_stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["entries"] == 1
+
+
+@pytest.mark.asyncio
+async def test_not_found_is_cached_with_short_ttl(requests_seen, cache_db):
+    """Missing resources are remembered, but only for the negative TTL."""
+    assert await openlibrary_service.get_book_details("books/OL404M") is None
+    assert await openlibrary_service.get_book_details("books/OL404M") is None
+    assert requests_seen == ["/books/OL404M.json"]
+
+    entry = cache_db.get(OpenLibraryCacheEntry, "books/OL404M")
+    assert entry.found is False
+    assert entry.expires_at - entry.fetched_at == openlibrary_cache.NEGATIVE_CACHE_TTL
+
+
+@pytest.mark.asyncio
+async def test_stale_entry_is_revalidated():
+    """Stale entries are revalidated with the stored ETag and kept on 304."""
+    conditional = []
+
+    def handler(request):
+        conditional.append(request.headers.get("if-none-match"))
+        if request.headers.get("if-none-match") == '"v1"':
+            return httpx.Response(304)
+        return httpx.Response(200, json={"number_of_pages": 99}, headers={"ETag": '"v1"'})
+
+    await openlibrary_service.close_client()
+    await openlibrary_service.open_client(transport=httpx.MockTransport(handler))
+    try:
+        details = await openlibrary_service.get_book_details("books/OL9M")
+        # Expire the entry so the next lookup has to revalidate
+        openlibrary_cache.touch("books/OL9M", ttl=timedelta(seconds=-1))
+        revalidated = await openlibrary_service.get_book_details("books/OL9M")
+    finally:
+        await openlibrary_service.close_client()
+
+    assert details == revalidated
+    assert revalidated["page_count"] == 99
+    assert conditional == [None, '"v1"']
+    assert openlibrary_cache.get_stats()["stale"] == 1
+
+
+@pytest.mark.asyncio
+async def test_stream_search_yields_hits_then_patches(requests_seen):
+    """Plain hits come first, followed by one patch per enriched hit."""
+    events = [
+        event async for event in openlibrary_service.stream_search_books("first", limit=2)
+    ]
+
+    assert events[0]["type"] == "results"
+    assert [book["title"] for book in events[0]["results"]] == ["First Book", "Second Book"]
+    assert events[0]["results"][0]["page_count"] is None
+
+    patches = {event["index"]: event["data"] for event in events if event["type"] == "patch"}
+    assert patches[0]["page_count"] == 223
+    assert patches[1]["page_count"] == 150
+    assert "title" not in patches[0]
+    assert events[-1] == {"type": "done"}
+
+
+@pytest.mark.asyncio
+async def test_search_requests_only_mapped_fields():
+    """search.json is asked for SEARCH_FIELDS only."""
+    params = []
+
+    def handler(request):
+        params.append(dict(request.url.params))
+        return httpx.Response(200, json=SEARCH_RESPONSE)
+
+    await openlibrary_service.close_client()
+    await openlibrary_service.open_client(transport=httpx.MockTransport(handler))
+    try:
+        await openlibrary_service.search_books("harry potter", limit=2)
+    finally:
+        await openlibrary_service.close_client()
+
+    assert params == [
+        {"q": "harry potter", "limit": "2", "fields": openlibrary_service.SEARCH_FIELDS}
+    ]
+
+
+@pytest.mark.asyncio
+async def test_parse_search_docs_trims_lists():
+    """Docs are parsed from chunks split mid-token, with long lists cut."""
+    doc = {"key": "/works/OL1W", "isbn": [str(n) for n in range(100)], "first_publish_year": 1999}
+    body = json.dumps({"numFound": 1, "docs": [doc], "q": "x"}).encode()
+
+    async def chunks():
+        for start in range(0, len(body), 16):
+            yield body[start:start + 16]
+
+    docs = await openlibrary_service.parse_search_docs(chunks())
+    assert docs == [{**doc, "isbn": doc["isbn"][:openlibrary_service.SEARCH_LIST_LIMIT]}]
+
+
+@pytest.mark.asyncio
+async def test_slow_search_is_bounded_by_deadline(monkeypatch, tmp_path):
+    """A hanging upstream search gives up at the deadline and counts a timeout."""
+    monkeypatch.setattr(local_catalog, "CATALOG_PATH", str(tmp_path / "missing.db"))
+
+    async def handler(request):
+        await asyncio.sleep(5)
+        return httpx.Response(200, json=SEARCH_RESPONSE)
+
+    await openlibrary_service.close_client()
+    await openlibrary_service.open_client(transport=httpx.MockTransport(handler))
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    try:
+        with pytest.raises(DeadlineExceeded):
+            await openlibrary_service.search_books("first", deadline=Deadline(0.2))
+    finally:
+        await openlibrary_service.close_client()
+
+    assert loop.time() - started < 1
+    assert openlibrary_service.breaker.get_stats()["timeouts"] == 1
+
+
+@pytest.mark.asyncio
+async def test_open_breaker_fails_fast_and_serves_cache(requests_seen, monkeypatch, tmp_path):
+    """While the breaker is open nothing is requested and cached details are served."""
+    monkeypatch.setattr(local_catalog, "CATALOG_PATH", str(tmp_path / "missing.db"))
+    details = await openlibrary_service.get_book_details("books/OL1M")
+    openlibrary_cache.touch("books/OL1M", ttl=timedelta(seconds=-1))
+    for _ in range(openlibrary_service.breaker.failure_threshold):
+        openlibrary_service.breaker.record_failure()
+
+    assert await openlibrary_service.get_book_details("books/OL1M") == details
+    with pytest.raises(CircuitOpenError):
+        await openlibrary_service.search_books("first")
+    assert requests_seen == ["/books/OL1M.json"]
+    assert openlibrary_service.breaker.get_stats()["rejected"] == 2
+
+
+@pytest.mark.asyncio
+async def test_failed_search_falls_back_to_local_catalog(requests_seen, monkeypatch):
+    """When Open Library is unavailable the local catalog answers, whatever the mode."""
+    monkeypatch.setattr(local_catalog, "SEARCH_MODE", "remote")
+    monkeypatch.setattr(local_catalog, "is_available", lambda path=None: True)
+    monkeypatch.setattr(local_catalog, "search", lambda query, limit: [{"title": "Local Book"}])
+    for _ in range(openlibrary_service.breaker.failure_threshold):
+        openlibrary_service.breaker.record_failure()
+
+    books = await openlibrary_service.search_books("first")
+    assert books == [{"title": "Local Book"}]
+    assert requests_seen == []
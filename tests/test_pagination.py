@@ -0,0 +1,158 @@
+"""
+Test module for cursor-paginated book lists.
+"""
+import re
+from datetime import datetime
+from datetime import timedelta
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from app import database
+from app import pagination
+from app import read_models
+from app.book_routes import LIST_ORDERINGS
+from app.models import Book
+from app.models import BookStatus
+from app.pagination import InvalidCursor
+
+HTMX = {"HX-Request": "true"}
+
+
+@pytest.fixture
+def library(db, regular_user, monkeypatch):
+    """Eleven books, three per page."""
+    monkeypatch.setattr(pagination, "PAGE_SIZE", 3)
+    start = datetime(2024, 1, 1)
+    titles = ["Anathem", "Accelerando", "Armada", "Abaddon's Gate", "Babel",
+              "Blindsight", "Beloved", "Circe", "1984", "Dune", "'Salem's Lot"]
+    books = []
+    for i, title in enumerate(titles):
+        book = Book(
+            title=title,
+            author=f"Author {i % 2}",
+            status=BookStatus.TO_READ if i % 3 else BookStatus.COMPLETED,
+            user_id=regular_user.id,
+            created_at=start + timedelta(days=i),
+            updated_at=start + timedelta(days=i),
+        )
+        books.append(book)
+    db.add_all(books)
+    db.commit()
+    return books
+
+
+def card_ids(html):
+    return [int(book_id) for book_id in re.findall(r'id="book-(\d+)"', html)]
+
+
+def next_url(html):
+    match = re.search(r'hx-get="([^"]+)" hx-trigger="(?:revealed|intersect once)"', html)
+    return match.group(1).replace("&amp;", "&") if match else None
+
+
+@pytest.mark.parametrize("group_by", ["alphabetical", "author"])
+def test_list_pages_cover_every_book_once(client, library, user_headers, group_by):
+    """Scrolling through the pages yields each book once, in group order."""
+    response = client.get(f"/books/?group_by={group_by}", headers=user_headers)
+    assert response.status_code == 200
+    html = response.text
+    seen = card_ids(html)
+    assert len(seen) == 3
+    url = next_url(html)
+    while url:
+        page = client.get(url, headers={**user_headers, **HTMX})
+        assert page.status_code == 200
+        assert "<html" not in page.text
+        seen += card_ids(page.text)
+        html += page.text
+        url = next_url(page.text)
+
+    assert sorted(seen) == sorted(book.id for book in library)
+    counts = re.findall(r'text-theme-accent">\s*([^<]+?)\s*<span[^>]*>\((\d+)\)</span>', html)
+    headers = [header for header, _ in counts]
+    # Each header appears once, with the size of the whole group; groups cut
+    # by a page end continue out of band
+    assert len(headers) == len(set(headers))
+    if group_by == "alphabetical":
+        assert counts == [("A", "4"), ("B", "3"), ("C", "1"), ("D", "1"), ("#", "2")]
+        assert "hx-swap-oob" in html
+    else:
+        assert counts == [("Author 0", "6"), ("Author 1", "5")]
+
+
+def test_accented_titles_get_their_own_group(client, db, regular_user, user_headers):
+    """Titles starting with a non-ASCII letter are grouped under it, after Z."""
+    for title in ["Émile", "Zorba", "Eragon", "Øvre", "42"]:
+        db.add(Book(title=title, author="Author", status=BookStatus.TO_READ, user_id=regular_user.id))
+    db.commit()
+    html = client.get("/books/", headers=user_headers).text
+    counts = re.findall(r'text-theme-accent">\s*([^<]+?)\s*<span[^>]*>\((\d+)\)</span>', html)
+    assert counts == [("E", "1"), ("Z", "1"), ("É", "1"), ("Ø", "1"), ("#", "1")]
+
+
+def test_groups_are_newest_first(client, library, user_headers):
+    """Within a group, books keep the newest-first order across pages."""
+    html = client.get("/books/", headers=user_headers).text
+    url = next_url(html)
+    html += client.get(url, headers={**user_headers, **HTMX}).text
+    a_books = sorted((book for book in library if book.title.startswith("A")), key=lambda b: b.created_at)
+    assert card_ids(html)[:4] == [book.id for book in reversed(a_books)]
+
+
+def test_bad_cursors_are_rejected(client, library, user_headers):
+    """Tampered cursors and cursors of another grouping are a 400."""
+    assert client.get("/books/?cursor=not-a-cursor", headers=user_headers).status_code == 400
+
+    author_cursor = pagination.encode_cursor(LIST_ORDERINGS["author"], ("a", "A", datetime(2024, 1, 1), 1))
+    response = client.get(f"/books/?group_by=alphabetical&cursor={author_cursor}", headers=user_headers)
+    assert response.status_code == 400
+    with pytest.raises(InvalidCursor):
+        pagination.decode_cursor(LIST_ORDERINGS["alphabetical"], author_cursor)
+
+
+def test_cursor_with_wrong_number_of_values_is_rejected(client, library, user_headers):
+    """A cursor missing sort values is a 400, not a shorter condition."""
+    ordering = LIST_ORDERINGS["alphabetical"]
+    short_cursor = pagination.encode_cursor(ordering, ("a", "A"))
+    response = client.get(f"/books/?group_by=alphabetical&cursor={short_cursor}", headers=user_headers)
+    assert response.status_code == 400
+    with pytest.raises(InvalidCursor):
+        ordering.after(["a", "A"])
+
+
+def test_board_rows_load_in_pages(client, db, library, user_token, monkeypatch):
+    """The board page has only counts; each row loads its cards a page at a time."""
+    # The theme lookup opens its own session
+    monkeypatch.setattr(database, "SessionLocal", sessionmaker(bind=db.get_bind()))
+    client.cookies.set("access_token", user_token)
+    html = client.get("/").text
+    to_read = [book for book in library if book.status == BookStatus.TO_READ]
+
+    assert card_ids(html) == []
+    row_urls = re.findall(r'hx-get="(/books/board/[^"]+)" hx-trigger="revealed"', html)
+    assert [url.split("?")[0] for url in row_urls] == ["/books/board/TO_READ", "/books/board/COMPLETED"]
+    assert re.search(rf"\s{len(to_read)}\s*</span>", html)
+
+    url = row_urls[0]
+    seen = []
+    while url:
+        page = client.get(url)
+        assert page.status_code == 200
+        assert len(card_ids(page.text)) <= 3
+        seen += card_ids(page.text)
+        url = next_url(page.text)
+    assert seen == [book.id for book in reversed(to_read)]
+
+
+def test_cards_are_read_without_entities(db, library):
+    """Card pages select only the card columns and leave the session empty."""
+    newest_by_author_0 = [library[i].id for i in (10, 8, 6)]
+    db.expunge_all()
+    query = read_models.card_query(db)
+    assert "notes" not in str(query.statement)
+
+    page = pagination.paginate(query, LIST_ORDERINGS["author"], into=read_models.BookCard)
+    assert all(isinstance(card, read_models.BookCard) for card in page.items)
+    assert [card.id for card in page.items] == newest_by_author_0
+    assert len(db.identity_map) == 0
@@ -0,0 +1,112 @@
+"""
+Test module for metadata providers and hedged searches.
+"""
+import asyncio
+
+import pytest
+
+from app.services.providers import HedgedSearch
+from app.services.providers import LatencyTracker
+from app.services.providers import MetadataProvider
+from app.services.providers import ProviderResult
+
+
+class FakeProvider(MetadataProvider):
+    """Answers after a delay with fixed books, or raises."""
+
+    def __init__(self, name, delay=0.0, books=None, error=None):
+        self.name = name
+        self.delay = delay
+        self.books = [{"title": name}] if books is None else books
+        self.error = error
+        self.calls = 0
+        self.cancelled = 0
+
+    async def search(self, query, limit, deadline=None):
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if self.error:
+            raise self.error
+        return ProviderResult(self.name, self.books, docs=[])
+
+
+def test_provider_must_implement_search():
+    """A provider without a search method cannot be created."""
+    class Incomplete(MetadataProvider):
+        name = "incomplete"
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+@pytest.mark.asyncio
+async def test_fast_primary_is_not_hedged():
+    """A primary answering within the hedge delay is the only call made."""
+    secondary = FakeProvider("secondary")
+    search = HedgedSearch(FakeProvider("primary"), secondary, default_delay=0.5)
+
+    result = await search.search("dune", 5)
+    assert result.provider == "primary"
+    assert secondary.calls == 0
+    assert search.get_stats()["hedged"] == 0
+
+
+@pytest.mark.asyncio
+async def test_slow_primary_loses_to_secondary():
+    """A slow primary is hedged; the first answer wins and the loser is cancelled."""
+    primary = FakeProvider("primary", delay=5)
+    search = HedgedSearch(primary, FakeProvider("secondary", delay=0.01), default_delay=0.02)
+
+    result = await asyncio.wait_for(search.search("dune", 5), 1)
+    assert result.provider == "secondary"
+    assert result.docs == []
+    await asyncio.sleep(0)
+    assert primary.cancelled == 1
+    assert search.get_stats()["secondary_wins"] == 1
+
+
+@pytest.mark.asyncio
+async def test_empty_secondary_waits_for_primary():
+    """Nothing found by the secondary does not beat the primary."""
+    search = HedgedSearch(
+        FakeProvider("primary", delay=0.05), FakeProvider("secondary", books=[]), default_delay=0.01
+    )
+    result = await search.search("dune", 5)
+    assert result.provider == "primary"
+    assert search.get_stats()["hedged"] == 1
+
+
+@pytest.mark.asyncio
+async def test_failed_primary_is_hedged_right_away():
+    """An error from the primary sends the hedge without waiting out the delay."""
+    search = HedgedSearch(
+        FakeProvider("primary", error=RuntimeError("down")),
+        FakeProvider("secondary"),
+        default_delay=5,
+    )
+    result = await asyncio.wait_for(search.search("dune", 5), 1)
+    assert result.provider == "secondary"
+
+    search.secondary = FakeProvider("secondary", books=[])
+    with pytest.raises(RuntimeError):
+        await search.search("dune", 5)
+
+
+def test_hedge_delay_follows_the_latency_percentile():
+    """The delay is the configured percentile, floored at min_delay."""
+    tracker = LatencyTracker()
+    for ms in range(1, 101):
+        tracker.record(ms / 1000)
+    assert tracker.percentile(90) == 0.09
+    assert tracker.percentile(100) == 0.1
+
+    search = HedgedSearch(FakeProvider("primary"), percentile=95, min_delay=0.05, min_samples=10)
+    assert search.hedge_delay() == search.default_delay
+    search.latency = tracker
+    assert search.hedge_delay() == 0.095
+    search.min_delay = 0.5
+    assert search.hedge_delay() == 0.5
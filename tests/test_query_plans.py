@@ -0,0 +1,138 @@
+"""
+Test module checking that the queries on books are served by indexes.
+
+Each page below is requested while recording the SQL it runs; every
+statement reading ``books`` is then run through EXPLAIN QUERY PLAN, and a
+plan that scans the whole table fails the test.
+"""
+import re
+from datetime import datetime
+from datetime import timedelta
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.orm import sessionmaker
+
+from app import database
+from app import pagination
+from app.models import Book
+from app.models import BookStatus
+
+HTMX = {"HX-Request": "true"}
+
+# "SCAN books" is a full scan of the table, "SCAN books USING ... INDEX" a
+# full scan of an index; a MATCH on books_fts shows as "SCAN books_fts"
+FULL_SCAN = re.compile(r"\bSCAN books\b(?!_fts)")
+
+
+@pytest.fixture
+def library(db, regular_user, monkeypatch):
+    """Books in every status, more than a page of them."""
+    monkeypatch.setattr(pagination, "PAGE_SIZE", 2)
+    start = datetime(2024, 1, 1)
+    statuses = list(BookStatus)
+    books = []
+    # Three books of every status and rating
+    for i in range(45):
+        status = statuses[i % len(statuses)]
+        book = Book(
+            title=f"Book {i}",
+            author=f"Author {i % 3}",
+            status=status,
+            notes="Read on the train",
+            rating=i % 3 + 1,
+            genres=["Fiction", "Travel"] if i % 2 else ["Poetry"],
+            user_id=regular_user.id,
+            created_at=start + timedelta(days=i),
+            updated_at=start + timedelta(days=i),
+        )
+        if status == BookStatus.COMPLETED:
+            book.completion_date = start + timedelta(days=i + 3)
+        books.append(book)
+    db.add_all(books)
+    db.commit()
+    return books
+
+
+@pytest.fixture
+def statements(db):
+    """Record the SELECTs on books run through the test engine."""
+    recorded = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT") and re.search(r"\bbooks\b", statement):
+            recorded.append((statement, parameters))
+
+    engine = db.get_bind()
+    event.listen(engine, "before_cursor_execute", record)
+    yield recorded
+    event.remove(engine, "before_cursor_execute", record)
+
+
+def full_scans(db, statements):
+    """The statements whose plan scans all of books, with that plan."""
+    connection = db.connection()
+    scans = []
+    for statement, parameters in statements:
+        plan = [row[3] for row in connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)]
+        if any(FULL_SCAN.search(step) for step in plan):
+            scans.append((statement, plan))
+    return scans
+
+
+def next_url(html):
+    match = re.search(r'hx-get="([^"]+)" hx-trigger="(?:revealed|intersect once)"', html)
+    return match.group(1).replace("&amp;", "&") if match else None
+
+
+@pytest.fixture
+def logged_in(client, db, user_token, monkeypatch):
+    """Client with the session cookie the HTML pages read."""
+    # The theme lookup opens its own session
+    monkeypatch.setattr(database, "SessionLocal", sessionmaker(bind=db.get_bind()))
+    client.cookies.set("access_token", user_token)
+    return client
+
+
+@pytest.mark.parametrize(
+    "path",
+    ["/", "/?title_filter=book", "/?rating_filter=2", "/?genre_filter=Poetry"],
+)
+def test_home_board(logged_in, db, library, statements, path):
+    """The board's counts, and the first and further cards of a row."""
+    html = logged_in.get(path).text
+    url = next_url(html)
+    for _ in range(2):
+        response = logged_in.get(url)
+        assert response.status_code == 200
+        url = next_url(response.text)
+    assert statements
+    assert full_scans(db, statements) == []
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        "group_by=alphabetical",
+        "group_by=author",
+        "group_by=author&status_filter=COMPLETED",
+        "group_by=alphabetical&notes_filter=train&rating_filter=3",
+        "group_by=author&genre_filter=Travel",
+    ],
+)
+def test_book_list(client, db, library, user_headers, statements, query):
+    """Every page of the book list, grouped and filtered."""
+    url = f"/books/?{query}"
+    while url:
+        response = client.get(url, headers={**user_headers, **HTMX})
+        assert response.status_code == 200
+        url = next_url(response.text)
+    assert statements
+    assert full_scans(db, statements) == []
+
+
+def test_profile_analytics(logged_in, db, library, statements):
+    """The reading statistics, monthly chart and timeline on the profile."""
+    assert logged_in.get("/profile").status_code == 200
+    assert statements
+    assert full_scans(db, statements) == []
@@ -0,0 +1,120 @@
+"""
+Test module for the shared outbound rate limiter.
+"""
+import asyncio
+import threading
+
+import pytest
+
+from app.services import rate_limit
+from app.services.rate_limit import BACKGROUND
+from app.services.rate_limit import INTERACTIVE
+from app.services.rate_limit import RateLimited
+from app.services.rate_limit import RateLimiter
+from app.services.resilience import Deadline
+
+
+def test_bucket_is_shared_through_the_database(tmp_path):
+    """Two limiters on the same file (two workers) share one bucket."""
+    path = str(tmp_path / "limits.db")
+    first = RateLimiter("ol", path, rate=0.001, burst=3, max_concurrent=10)
+    second = RateLimiter("ol", path, rate=0.001, burst=3, max_concurrent=10)
+
+    assert first.try_acquire()[0] is not None
+    assert second.try_acquire()[0] is not None
+    assert first.try_acquire()[0] is not None
+    lease_id, wait = second.try_acquire()
+    assert lease_id is None
+    assert wait > 0
+
+
+def test_background_calls_leave_the_reserve_to_interactive_ones():
+    """Background calls stop at the reserve; interactive calls may use it."""
+    limiter = RateLimiter(
+        "ol", ":memory:", rate=0.001, burst=4, max_concurrent=10, background_reserve=0.5
+    )
+    assert limiter.try_acquire(BACKGROUND)[0] is not None
+    assert limiter.try_acquire(BACKGROUND)[0] is not None
+    assert limiter.try_acquire(BACKGROUND)[0] is None
+    assert limiter.try_acquire(INTERACTIVE)[0] is not None
+    assert limiter.try_acquire(INTERACTIVE)[0] is not None
+
+
+def test_connection_slots_are_released():
+    """Concurrent calls are capped and a released slot can be reused."""
+    limiter = RateLimiter("ol", ":memory:", rate=0, burst=1, max_concurrent=2)
+    first, _ = limiter.try_acquire()
+    assert limiter.try_acquire()[0] is not None
+    assert limiter.try_acquire() == (None, rate_limit.SLOT_POLL_INTERVAL)
+
+    limiter.release(first)
+    assert limiter.try_acquire()[0] is not None
+
+
+@pytest.mark.asyncio
+async def test_interactive_calls_queue_and_background_calls_fail_fast():
+    """Interactive callers wait for a token; background callers are refused."""
+    limiter = RateLimiter("ol", ":memory:", rate=50, burst=1, max_concurrent=10)
+    async with limiter.slot():
+        pass
+
+    with rate_limit.use_priority(BACKGROUND):
+        with pytest.raises(RateLimited):
+            await limiter.acquire()
+
+    await asyncio.wait_for(limiter.acquire(INTERACTIVE), 1)
+    assert limiter.get_stats()["queued"] == 1
+
+    with pytest.raises(RateLimited):
+        await limiter.acquire(INTERACTIVE, Deadline(0.001))
+    assert limiter.get_stats()["rejected"] == 2
+
+
+@pytest.mark.asyncio
+async def test_cancelled_call_releases_its_slot():
+    """A call cancelled inside the block still gives its slot back."""
+    limiter = RateLimiter("ol", ":memory:", rate=0, burst=1, max_concurrent=1)
+    entered = asyncio.Event()
+
+    async def call():
+        async with limiter.slot():
+            entered.set()
+            await asyncio.sleep(5)
+
+    task = asyncio.create_task(call())
+    await entered.wait()
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    assert limiter.try_acquire()[0] is not None
+
+
+@pytest.mark.asyncio
+async def test_lease_taken_after_cancellation_is_released(monkeypatch):
+    """A lease the thread takes after the caller was cancelled is given back."""
+    limiter = RateLimiter("ol", ":memory:", rate=0, burst=1, max_concurrent=1)
+    started = threading.Event()
+    proceed = threading.Event()
+    finished = threading.Event()
+    try_acquire = limiter.try_acquire
+
+    def slow_try_acquire(priority):
+        started.set()
+        proceed.wait(5)
+        try:
+            return try_acquire(priority)
+        finally:
+            finished.set()
+
+    monkeypatch.setattr(limiter, "try_acquire", slow_try_acquire)
+    task = asyncio.create_task(limiter.acquire())
+    await asyncio.to_thread(started.wait, 5)
+    task.cancel()
+    await asyncio.sleep(0)
+    proceed.set()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    await asyncio.to_thread(finished.wait, 5)
+    monkeypatch.undo()
+    assert limiter.get_stats()["active"] == 0
+    assert limiter.stats["acquired"] == 0
@@ -0,0 +1,63 @@
+"""
+Test module for request deadlines and the circuit breaker.
+"""
+import time
+
+import pytest
+
+from app.services.resilience import CircuitBreaker
+from app.services.resilience import CircuitOpenError
+from app.services.resilience import Deadline
+from app.services.resilience import DeadlineExceeded
+
+
+def test_deadline_timeout_is_capped_and_expires():
+    """Timeouts never exceed the cap or the time left, and run out."""
+    deadline = Deadline(10)
+    assert deadline.timeout(2) == 2
+    assert 9 < deadline.timeout() <= 10
+
+    assert deadline.within(1).remaining() <= 1
+    assert deadline.within(60).remaining() <= 10
+
+    expired = Deadline(0)
+    assert expired.expired
+    with pytest.raises(DeadlineExceeded):
+        expired.timeout(5)
+
+
+def test_breaker_opens_after_consecutive_failures():
+    """The breaker opens on the threshold and rejects calls while open."""
+    breaker = CircuitBreaker("test", failure_threshold=3, reset_timeout=60)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    breaker.record_failure(timeout=True)
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    stats = breaker.get_stats()
+    assert stats["state"] == "open"
+    assert stats["failures"] == 4
+    assert stats["timeouts"] == 1
+    assert stats["rejected"] == 1
+    assert stats["opened"] == 1
+
+
+def test_half_open_breaker_closes_on_success_and_reopens_on_failure():
+    """After the reset timeout one result decides the breaker's state."""
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=0.01)
+    breaker.record_failure()
+    time.sleep(0.02)
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+
+    time.sleep(0.02)
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.get_stats()["opened"] == 2
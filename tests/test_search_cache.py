@@ -0,0 +1,94 @@
+"""
+Test module for the in-memory search result cache.
+"""
+import asyncio
+
+import pytest
+
+from app.services import search_cache
+from app.services.search_cache import SearchCache
+from app.services.search_cache import normalize_query
+
+
+def test_normalize_query():
+    """Queries are casefolded and whitespace is collapsed."""
+    assert normalize_query("  Harry   POTTER\t") == "harry potter"
+    assert normalize_query("Straße") == normalize_query("STRASSE")
+
+
+def test_lru_eviction():
+    """The least recently used entry is evicted first."""
+    cache = SearchCache(max_entries=2, ttl=60, stale_ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.set("c", 3)
+    assert len(cache) == 2
+    assert cache.get_stats()["evictions"] == 1
+
+
+@pytest.mark.asyncio
+async def test_search_uses_normalized_key(monkeypatch):
+    """Equivalent queries share one cache entry and one upstream call."""
+    calls = []
+
+    async def fake_search(query, limit, fetch_details, deadline=None):
+        calls.append((query, limit, fetch_details))
+        return [{"title": query}]
+
+    monkeypatch.setattr(search_cache.openlibrary_service, "search_books", fake_search)
+    monkeypatch.setattr(search_cache, "search_cache", SearchCache())
+
+    first = await search_cache.search_books("Harry  Potter", 5)
+    second = await search_cache.search_books("harry potter", 5)
+    await search_cache.search_books("harry potter", 5, fetch_details=True)
+
+    assert first == second == [{"title": "harry potter"}]
+    assert calls == [("harry potter", 5, False), ("harry potter", 5, True)]
+
+
+@pytest.mark.asyncio
+async def test_stale_entry_served_while_refreshing():
+    """A stale entry is returned immediately and refreshed in the background."""
+    cache = SearchCache(max_entries=10, ttl=0, stale_ttl=60)
+    values = iter(["old", "new"])
+
+    async def fetch():
+        return next(values)
+
+    assert await cache.get_or_fetch("key", fetch) == "old"
+    assert await cache.get_or_fetch("key", fetch) == "old"
+    await asyncio.sleep(0)
+    await asyncio.sleep(0)
+    assert cache.get_stats()["refreshes"] == 1
+    assert cache.get_stats()["stale_hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_expired_entry_served_when_fetch_fails():
+    """An entry past the stale window is still better than an error."""
+    cache = SearchCache(max_entries=10, ttl=0, stale_ttl=0)
+    await cache.get_or_fetch("key", lambda: asyncio.sleep(0, result="old"))
+
+    async def failing_fetch():
+        raise RuntimeError("upstream down")
+
+    assert await cache.get_or_fetch("key", failing_fetch) == "old"
+    assert cache.get_stats()["served_on_error"] == 1
+    with pytest.raises(RuntimeError):
+        await cache.get_or_fetch("other", failing_fetch)
+
+
+@pytest.mark.asyncio
+async def test_partial_results_expire_sooner():
+    """Results cut short by the enrichment budget are fetched again soon."""
+    cache = SearchCache(max_entries=10, ttl=60, stale_ttl=0, partial_ttl=0)
+    partial = search_cache.openlibrary_service.PartialResults([{"title": "Dune"}])
+    values = iter([partial, [{"title": "Dune", "page_count": 412}]])
+
+    async def fetch():
+        return next(values)
+
+    assert await cache.get_or_fetch("key", fetch) is partial
+    assert await cache.get_or_fetch("key", fetch) == [{"title": "Dune", "page_count": 412}]
+    assert await cache.get_or_fetch("key", fetch) == [{"title": "Dune", "page_count": 412}]
+    assert cache.get_stats()["hits"] == 1
@@ -0,0 +1,108 @@
+"""
+Test module for single-flight request coalescing.
+"""
+import asyncio
+
+import pytest
+
+from app.services.singleflight import SingleFlight
+
+
+@pytest.mark.asyncio
+async def test_concurrent_callers_share_one_call():
+    """Callers for the same key get the result of a single call."""
+    flight = SingleFlight()
+    calls = 0
+
+    async def fetch():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return {"value": 42}
+
+    results = await asyncio.gather(*(flight.do("key", fetch) for _ in range(5)))
+
+    assert calls == 1
+    assert all(result is results[0] for result in results)
+    assert flight.get_stats() == {
+        "calls": 1, "coalesced": 4, "timeouts": 0, "abandoned": 0, "in_flight": 0
+    }
+
+
+@pytest.mark.asyncio
+async def test_exception_fans_out_to_all_callers():
+    """Every waiting caller receives the exception of the shared call."""
+    flight = SingleFlight()
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise ValueError("upstream failed")
+
+    results = await asyncio.gather(
+        *(flight.do("key", fail) for _ in range(3)), return_exceptions=True
+    )
+
+    assert all(isinstance(result, ValueError) for result in results)
+    assert len(flight) == 0
+
+
+@pytest.mark.asyncio
+async def test_timeout_only_affects_that_caller():
+    """A caller timing out does not cancel the call for the others."""
+    flight = SingleFlight()
+
+    async def slow():
+        await asyncio.sleep(0.05)
+        return "done"
+
+    patient = asyncio.create_task(flight.do("key", slow))
+    await asyncio.sleep(0)
+    with pytest.raises(TimeoutError):
+        await flight.do("key", slow, timeout=0.01)
+
+    assert await patient == "done"
+    assert flight.get_stats()["timeouts"] == 1
+
+
+@pytest.mark.asyncio
+async def test_new_call_after_completion():
+    """Once a call finishes, the next caller starts a new one."""
+    flight = SingleFlight()
+    counter = iter(range(10))
+
+    async def fetch():
+        return next(counter)
+
+    assert await flight.do("key", fetch) == 0
+    assert await flight.do("key", fetch) == 1
+
+
+@pytest.mark.asyncio
+async def test_call_cancelled_when_all_callers_are_cancelled():
+    """The shared call only stops once nobody is waiting for it."""
+    flight = SingleFlight()
+    started = asyncio.Event()
+    cancelled = asyncio.Event()
+
+    async def slow():
+        started.set()
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    first = asyncio.create_task(flight.do("key", slow))
+    second = asyncio.create_task(flight.do("key", slow))
+    await started.wait()
+
+    first.cancel()
+    await asyncio.gather(first, return_exceptions=True)
+    assert not cancelled.is_set()
+
+    second.cancel()
+    await asyncio.gather(second, return_exceptions=True)
+    await asyncio.wait_for(cancelled.wait(), 1)
+    assert flight.get_stats()["abandoned"] == 1
+    await asyncio.sleep(0)
+    assert len(flight) == 0
@@ -0,0 +1,92 @@
+"""
+Test module for cancelling superseded and abandoned requests.
+"""
+import asyncio
+
+import httpx
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from app.services import openlibrary_cache
+from app.services import openlibrary_service
+from app.services import search_cache
+from app.services.supersede import RequestCancelled
+from app.services.supersede import Supersede
+
+
+@pytest.mark.asyncio
+async def test_newer_call_cancels_previous_one():
+    """A second call for the same key cancels the first; other keys are untouched."""
+    calls = Supersede()
+
+    async def work(value, delay):
+        await asyncio.sleep(delay)
+        return value
+
+    first = asyncio.create_task(calls.run("session", lambda: work("first", 5)))
+    other = asyncio.create_task(calls.run("other", lambda: work("other", 0.05)))
+    await asyncio.sleep(0.01)
+    second = await calls.run("session", lambda: work("second", 0))
+
+    assert second == "second"
+    with pytest.raises(RequestCancelled):
+        await first
+    assert await other == "other"
+    assert calls.get_stats() == {"calls": 3, "superseded": 1, "disconnected": 0, "running": 0}
+
+
+@pytest.mark.asyncio
+async def test_disconnect_cancels_work():
+    """Work stops once the client is reported as disconnected."""
+    calls = Supersede()
+    cancelled = asyncio.Event()
+
+    async def work():
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    async def is_disconnected():
+        return True
+
+    with pytest.raises(RequestCancelled):
+        await calls.run("session", work, is_disconnected=is_disconnected)
+    assert cancelled.is_set()
+    assert calls.get_stats()["disconnected"] == 1
+
+
+@pytest.mark.asyncio
+async def test_superseded_search_cancels_upstream_request(db, monkeypatch):
+    """Cancelling a search reaches the Open Library request it was waiting on."""
+    monkeypatch.setattr(openlibrary_cache, "session_factory", sessionmaker(bind=db.get_bind()))
+    monkeypatch.setattr(search_cache, "search_cache", search_cache.SearchCache())
+    openlibrary_service.breaker.reset()
+    started = asyncio.Event()
+    upstream_cancelled = asyncio.Event()
+
+    async def handler(request):
+        started.set()
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            upstream_cancelled.set()
+            raise
+        return httpx.Response(200, json={"docs": []})
+
+    await openlibrary_service.close_client()
+    await openlibrary_service.open_client(transport=httpx.MockTransport(handler))
+    calls = Supersede()
+    try:
+        first = asyncio.create_task(
+            calls.run("session", lambda: search_cache.search_books("slow typeahead"))
+        )
+        await asyncio.wait_for(started.wait(), 1)
+        await calls.run("session", lambda: asyncio.sleep(0, result=[]))
+        with pytest.raises(RequestCancelled):
+            await first
+        await asyncio.wait_for(upstream_cancelled.wait(), 1)
+    finally:
+        await openlibrary_service.close_client()
+    assert len(search_cache.searches_in_flight) == 0